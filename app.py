@@ -42,6 +42,11 @@ login_manager.init_app(app)
 login_manager.login_view = 'login'
 migrate.init_app(app, db)
 scheduler.init_app(app)
+
+# Fork the article extraction processes while this process has no threads yet
+from scraper import scraper
+scraper.start()
+
 scheduler.start()
 
 # Create database tables
@@ -50,6 +55,10 @@ with app.app_context():
     db.create_all()
     logger.info("Database tables created successfully")
 
+    # Full-text search index and the triggers that maintain it
+    from search_index import search_index
+    search_index.install()
+
     # Create default admin if doesn't exist
     from werkzeug.security import generate_password_hash
     from models import User, Role
@@ -92,21 +101,49 @@ with app.app_context():
         logger.info("Default admin user created")
         logger.info("Default countries and categories created")
 
+# Rendered page cache; importing it also registers the news version listeners
+from page_cache import page_cache
+page_cache.init_app(app)
+
+# In debug mode, flag requests that run more SQL statements than their budget
+from query_budget import query_budget
+query_budget.init_app(app)
+
 # Load user for Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
     from models import User
     return User.query.get(int(user_id))
 
+# Every process (gunicorn workers, bot runners) schedules the jobs; the fetch
+# and translate work itself runs on the job workers (job_worker.py)
+from job_leases import job_leases
+job_leases.init_app(app)
+
 # Schedule news fetching task
-from news_fetcher import fetch_all_news
+from fetch_scheduler import fetch_scheduler
+fetch_scheduler.init_app(app)
 with app.app_context():
-    # Schedule news fetching every 30 minutes
+    # Queue a poll of whichever sources are due every minute; each source sets its own interval
     scheduler.add_job(
         id='fetch_news', 
-        func=fetch_all_news, 
+        func=fetch_scheduler.enqueue, 
         trigger='interval', 
-        minutes=30, 
+        minutes=1, 
         timezone=pytz.timezone('UTC')
     )
     logger.info("News fetching scheduler started")
+
+# Translations are queued as jobs; this sweep catches retries and expired claims
+from translation_pipeline import translation_pipeline
+translation_pipeline.init_app(app)
+with app.app_context():
+    # Queue the sweep of pending and retry-due translations every minute
+    scheduler.add_job(
+        id='translate_news',
+        func=translation_pipeline.enqueue_due,
+        trigger='interval',
+        minutes=1,
+        timezone=pytz.timezone('UTC')
+    )
+    logger.info("Translation pipeline scheduler started")
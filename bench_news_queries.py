@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+"""
+JBC News Listing Benchmark
+--------------------------
+Seeds a database with synthetic articles, requests every news listing page and
+checks each SQL query it runs against the news table: the query plan must read
+news through an index, and the query must stay within a latency budget. Exits
+non-zero when a check fails.
+
+    python bench_news_queries.py                      # 1,000,000 rows in a scratch SQLite file
+    python bench_news_queries.py --rows 200000 --budget-ms 20
+    python bench_news_queries.py --database postgresql://... --reuse
+
+Never point --database at a live database: the benchmark adds its articles to it.
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import tempfile
+import argparse
+import logging
+from sqlalchemy import event, func
+from datetime import datetime, timedelta
+from statistics import median
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+# Benchmark settings
+SEED_BATCH_SIZE = 10000
+BREAKING_RATE = 0.01
+UNPUBLISHED_RATE = 0.02
+STAFF_AUTHORED_RATE = 0.01
+ARCHIVE_DAYS = 730
+
+# Pages to request, with the filters each listing supports; deep_cursor continues
+# from an article in the middle of the archive
+ROUTES = [
+    '/',
+    '/news/category/{category_id}',
+    '/news/category/{category_id}?cursor={deep_cursor}',
+    '/news/country/{country_id}',
+    '/news/country/{country_id}?cursor={deep_cursor}',
+    '/news/{news_id}',
+    '/staff/dashboard',
+    '/staff/news',
+    '/staff/news?country={country_id}',
+    '/staff/news?category={category_id}',
+    '/staff/news?status=breaking',
+    '/staff/news?status=unpublished',
+    '/admin/dashboard',
+    '/admin/news',
+    '/admin/news?cursor={deep_cursor}',
+    '/admin/news?country={country_id}',
+    '/admin/news?category={category_id}',
+]
+
+NEWS_TABLE = re.compile(r'\bnews\b', re.IGNORECASE)
+SQLITE_TABLE_SCAN = re.compile(r'^SCAN (news|news_\d+)\b(?! USING)')
+
+def seed(engine, News, rows, country_ids, category_ids, author_id):
+    """Insert synthetic articles in batches, spread over the last ARCHIVE_DAYS days"""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    table = News.__table__
+    logger.info(f"Seeding {rows} articles")
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        for offset in range(0, rows, SEED_BATCH_SIZE):
+            batch = []
+            for n in range(offset, min(offset + SEED_BATCH_SIZE, rows)):
+                published_at = now - timedelta(seconds=rng.randrange(ARCHIVE_DAYS * 86400))
+                batch.append({
+                    'title': f"Benchmark article {n}",
+                    'summary': f"Synthetic summary for benchmark article {n}",
+                    'published_at': published_at,
+                    'updated_at': published_at,
+                    'category_id': rng.choice(category_ids),
+                    'country_id': rng.choice(country_ids),
+                    'is_breaking': rng.random() < BREAKING_RATE,
+                    'is_auto_generated': True,
+                    'is_published': rng.random() >= UNPUBLISHED_RATE,
+                    'created_by': author_id if rng.random() < STAFF_AUTHORED_RATE else None,
+                    'translation_status': 'done',
+                    'translation_attempts': 0
+                })
+            connection.execute(table.insert(), batch)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+    logger.info(f"Seeded {rows} articles in {time.perf_counter() - started:.1f}s")
+
+def capture_queries(engine, client, path):
+    """SELECT statements on the news table run while serving a page"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and NEWS_TABLE.search(statement):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return response.status_code, statements
+
+def plan_problems(engine, statement, parameters):
+    """Plan steps that read the news table without an index"""
+    dialect = engine.dialect.name
+    with engine.connect() as connection:
+        if dialect == 'sqlite':
+            plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            return [row[-1] for row in plan if SQLITE_TABLE_SCAN.match(row[-1])]
+        if dialect == 'postgresql':
+            plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+            problems = []
+            nodes = [plan[0]['Plan']]
+            while nodes:
+                node = nodes.pop()
+                if node.get('Node Type') == 'Seq Scan' and node.get('Relation Name') == 'news':
+                    problems.append(f"Seq Scan on news (filter: {node.get('Filter', 'none')})")
+                nodes.extend(node.get('Plans', []))
+            return problems
+    logger.warning(f"Cannot check query plans on {dialect}")
+    return []
+
+def time_query(engine, statement, parameters, repeat):
+    """Median wall time of a statement in milliseconds, after one warm-up run"""
+    timings = []
+    with engine.connect() as connection:
+        for attempt in range(repeat + 1):
+            started = time.perf_counter()
+            connection.exec_driver_sql(statement, parameters).all()
+            if attempt:
+                timings.append((time.perf_counter() - started) * 1000)
+    return median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check news listing query plans and latency")
+    parser.add_argument('--database', help="database URL (default: a scratch SQLite file)")
+    parser.add_argument('--rows', type=int, default=1000000, help="articles to seed")
+    parser.add_argument('--reuse', action='store_true', help="skip seeding when the database already has articles")
+    parser.add_argument('--budget-ms', type=float, default=50.0, help="slowest allowed query, median of the runs")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs of each query")
+    args = parser.parse_args()
+
+    # The app connects on import, so the database must be chosen first
+    os.environ['DATABASE_URL'] = args.database or f"sqlite:///{os.path.join(tempfile.gettempdir(), 'jbc_bench_news.db')}"
+
+    from app import app, db, scheduler
+    from models import News, Country, Category, User, Role
+    import routes  # registers the views
+    from keyset_pagination import Cursor
+
+    # Background fetches and translations would add load and articles of their own
+    scheduler.pause()
+
+    with app.app_context():
+        engine = db.engine
+        admin_id = User.query.filter_by(role=Role.ADMIN).first().id
+        country_ids = [country.id for country in Country.query.all()]
+        category_ids = [category.id for category in Category.query.all()]
+        existing = db.session.query(func.count(News.id)).scalar()
+        db.session.remove()
+        if not (args.reuse and existing):
+            seed(engine, News, args.rows, country_ids, category_ids, admin_id)
+
+        news_id = db.session.query(func.max(News.id)).filter(News.is_published == True).scalar()
+        middle = db.session.get(News, news_id // 2)
+        deep_cursor = Cursor([middle.published_at, middle.id], page=args.rows // 20).encode()
+        db.session.remove()
+
+    failures = 0
+    client = app.test_client()
+    with client.session_transaction() as session:
+        # Staff and admin pages need a login; the admin sees every listing
+        session['_user_id'] = str(admin_id)
+        session['_fresh'] = True
+
+    for route in ROUTES:
+        path = route.format(country_id=country_ids[0], category_id=category_ids[0], news_id=news_id, deep_cursor=deep_cursor)
+        status, statements = capture_queries(engine, client, path)
+        if status != 200:
+            logger.error(f"FAIL {path}: HTTP {status}")
+            failures += 1
+            continue
+        for statement, parameters in statements:
+            problems = plan_problems(engine, statement, parameters)
+            elapsed = time_query(engine, statement, parameters, args.repeat)
+            ok = not problems and elapsed <= args.budget_ms
+            summary = ' '.join(statement.split())[:100]
+            logger.info(f"{'ok  ' if ok else 'FAIL'} {path} {elapsed:8.2f}ms  {summary}")
+            for problem in problems:
+                logger.error(f"     {path}: {problem}")
+            if not ok:
+                failures += 1
+
+    if failures:
+        logger.error(f"{failures} checks failed (budget {args.budget_ms}ms)")
+        return 1
+    logger.info(f"All listing queries use indexes and run within {args.budget_ms}ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+import os
+import time
+import logging
+import struct
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from app import db
+from models import News, MINHASH_PERMUTATIONS
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# De-duplication settings
+DEDUP_WINDOW_DAYS = int(os.environ.get("DEDUP_WINDOW_DAYS", "7"))
+DEDUP_RELOAD_SECONDS = int(os.environ.get("DEDUP_RELOAD_SECONDS", "21600"))  # rebuild the window every 6 hours
+NEAR_DUP_THRESHOLD = float(os.environ.get("NEAR_DUP_THRESHOLD", "0.6"))  # estimated word overlap counted as the same story
+MINHASH_BAND_ROWS = 4  # 16 bands of 4: stories above ~0.5 overlap almost always share a band
+
+def unpack_minhash(minhash):
+    """Signature bytes (see News.compute_minhash) as a tuple of integers"""
+    return struct.unpack(f'>{MINHASH_PERMUTATIONS}I', minhash)
+
+class ArticleDeduplicator:
+    """In-memory set of recent article URLs and title hashes, backed by one IN query per batch"""
+
+    def __init__(self, window_days=DEDUP_WINDOW_DAYS, reload_seconds=DEDUP_RELOAD_SECONDS):
+        self.window_days = window_days
+        self.reload_seconds = reload_seconds
+        self.urls = set()
+        self.title_hashes = set()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Rebuild the in-memory window from recently published articles"""
+        since = datetime.utcnow() - timedelta(days=self.window_days)
+        rows = db.session.query(News.source_url, News.title_hash).filter(News.published_at >= since).all()
+        with self._lock:
+            self.urls = {url for url, _ in rows if url}
+            self.title_hashes = {title_hash for _, title_hash in rows if title_hash}
+            self._loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(rows)} recent articles into the de-duplication index")
+
+    def ensure_loaded(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.reload_seconds:
+            self.load()
+
+    def screen(self, articles):
+        """Return the articles in a batch that are new, reserving them so later batches skip them"""
+        self.ensure_loaded()
+
+        # Drop anything already in the window or repeated within the batch
+        candidates = []
+        batch_urls = set()
+        batch_hashes = set()
+        with self._lock:
+            for article in articles:
+                url = article.get('url')
+                title_hash = News.compute_title_hash(article.get('title'))
+                if (url and (url in self.urls or url in batch_urls)) or \
+                        (title_hash and (title_hash in self.title_hashes or title_hash in batch_hashes)):
+                    continue
+                if url:
+                    batch_urls.add(url)
+                if title_hash:
+                    batch_hashes.add(title_hash)
+                candidates.append((article, url, title_hash))
+
+        if not candidates:
+            return []
+
+        # One query for whatever is older than the window (or stored by another process)
+        conditions = []
+        if batch_urls:
+            conditions.append(News.source_url.in_(batch_urls))
+        if batch_hashes:
+            conditions.append(News.title_hash.in_(batch_hashes))
+        existing_urls = set()
+        existing_hashes = set()
+        if conditions:
+            for url, title_hash in db.session.query(News.source_url, News.title_hash).filter(or_(*conditions)).all():
+                existing_urls.add(url)
+                existing_hashes.add(title_hash)
+
+        new_articles = []
+        with self._lock:
+            self.urls.update(url for url in existing_urls if url)
+            self.title_hashes.update(title_hash for title_hash in existing_hashes if title_hash)
+            for article, url, title_hash in candidates:
+                if (url and url in existing_urls) or (title_hash and title_hash in existing_hashes):
+                    continue
+                if url:
+                    self.urls.add(url)
+                if title_hash:
+                    self.title_hashes.add(title_hash)
+                new_articles.append(article)
+
+        skipped = len(articles) - len(new_articles)
+        if skipped:
+            logger.debug(f"Skipped {skipped} of {len(articles)} articles as duplicates")
+        return new_articles
+
+    def forget(self, article):
+        """Release an article reserved by screen() that was not stored after all"""
+        with self._lock:
+            self.urls.discard(article.get('url'))
+            self.title_hashes.discard(News.compute_title_hash(article.get('title')))
+
+def minhash_similarity(a, b):
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+class StoryClusterIndex:
+    """MinHash-LSH index of recent signatures that groups rewrites of the same story
+
+    Signatures are split into bands of MINHASH_BAND_ROWS values; articles sharing
+    any whole band become candidates and are then checked against the similarity
+    threshold. Only cluster leads are indexed, so a cluster cannot drift away from
+    its first article.
+    """
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD, window_days=DEDUP_WINDOW_DAYS, reload_seconds=DEDUP_RELOAD_SECONDS):
+        self.threshold = threshold
+        self.window_days = window_days
+        self.reload_seconds = reload_seconds
+        self.band_count = MINHASH_PERMUTATIONS // MINHASH_BAND_ROWS
+        self.buckets = [{} for _ in range(self.band_count)]
+        self.size = 0
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _keys(self, signature):
+        return [signature[i * MINHASH_BAND_ROWS:(i + 1) * MINHASH_BAND_ROWS] for i in range(self.band_count)]
+
+    def _add(self, signature, lead):
+        # Caller holds the lock; lead is a stored news ID or an article dict from this run
+        entry = (signature, lead)
+        for bucket, key in zip(self.buckets, self._keys(signature)):
+            bucket.setdefault(key, []).append(entry)
+        self.size += 1
+
+    def _find(self, signature):
+        # Caller holds the lock
+        best = None
+        seen = set()
+        for bucket, key in zip(self.buckets, self._keys(signature)):
+            for candidate, lead in bucket.get(key, ()):
+                if id(candidate) in seen:
+                    continue
+                seen.add(id(candidate))
+                similarity = minhash_similarity(signature, candidate)
+                if similarity >= self.threshold and (best is None or similarity > best[0]):
+                    best = (similarity, lead)
+        return best[1] if best else None
+
+    def load(self):
+        """Rebuild the index from the signatures of recent cluster leads"""
+        since = datetime.utcnow() - timedelta(days=self.window_days)
+        rows = db.session.query(News.id, News.minhash).filter(
+            News.published_at >= since,
+            News.minhash.isnot(None),
+            News.cluster_lead_id.is_(None)
+        ).all()
+        with self._lock:
+            self.buckets = [{} for _ in range(self.band_count)]
+            self.size = 0
+            for news_id, minhash in rows:
+                self._add(unpack_minhash(minhash), news_id)
+            self._loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(rows)} story signatures into the clustering index")
+
+    def ensure_loaded(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.reload_seconds:
+            self.load()
+
+    def assign(self, articles):
+        """Sign articles and mark the ones that join an existing story
+
+        Sets article['minhash'] and, for followers, article['cluster_lead'] (a news ID,
+        or the lead's article dict while it is still being ingested). Returns the
+        number of followers.
+        """
+        self.ensure_loaded()
+        signed = [(article, News.compute_minhash(article.get('title'), article.get('description'))) for article in articles]
+        followers = 0
+        with self._lock:
+            for article, minhash in signed:
+                article['minhash'] = minhash
+                if minhash is None:
+                    continue
+                signature = unpack_minhash(minhash)
+                lead = self._find(signature)
+                if lead is None:
+                    self._add(signature, article)
+                else:
+                    article['cluster_lead'] = lead
+                    followers += 1
+        if followers:
+            logger.debug(f"Clustered {followers} of {len(articles)} articles with existing stories")
+        return followers
+
+    def _replace(self, article, news_id):
+        # Caller holds the lock; swaps (or with news_id None, drops) the entries led by an article dict
+        signature = unpack_minhash(article['minhash'])
+        removed = False
+        for bucket, key in zip(self.buckets, self._keys(signature)):
+            if key not in bucket:
+                continue
+            entries = bucket[key]
+            bucket[key] = [
+                (candidate, news_id) if lead is article else (candidate, lead)
+                for candidate, lead in entries
+                if lead is not article or news_id is not None
+            ]
+            removed = removed or len(bucket[key]) != len(entries)
+        if removed:
+            self.size -= 1
+
+    def lead_stored(self, article):
+        """Swap a lead's article dict for its news ID once it is written"""
+        if article.get('minhash') is None or article.get('_news_id') is None:
+            return
+        with self._lock:
+            self._replace(article, article['_news_id'])
+
+    def forget(self, article):
+        """Drop a lead registered by assign() that was not stored after all"""
+        if article.get('minhash') is None:
+            return
+        with self._lock:
+            self._replace(article, None)
+
+deduplicator = ArticleDeduplicator()
+story_clusters = StoryClusterIndex()
@@ -0,0 +1,194 @@
+import os
+import random
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models import SourceSchedule, ProviderUsage
+from news_fetcher import build_sources, run_ingestion, PROVIDER_NEWSAPI, PROVIDER_GNEWS
+from reference_data import reference_data
+from job_leases import job_leases
+from job_queue import job_queue
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Scheduler settings
+FETCH_MIN_INTERVAL = int(os.environ.get("FETCH_MIN_INTERVAL", "300"))  # seconds
+FETCH_MAX_INTERVAL = int(os.environ.get("FETCH_MAX_INTERVAL", "7200"))  # seconds
+FETCH_DEFAULT_INTERVAL = int(os.environ.get("FETCH_DEFAULT_INTERVAL", "1800"))  # seconds, for new sources
+FETCH_TARGET_NEW_ITEMS = float(os.environ.get("FETCH_TARGET_NEW_ITEMS", "5"))  # new articles we aim to find per poll
+FETCH_RATE_ALPHA = float(os.environ.get("FETCH_RATE_ALPHA", "0.3"))  # weight of the latest poll in the moving averages
+FETCH_JITTER = float(os.environ.get("FETCH_JITTER", "0.1"))  # +/- fraction applied to every interval
+FETCH_LATENCY_FACTOR = int(os.environ.get("FETCH_LATENCY_FACTOR", "30"))  # never poll more often than this many fetch times
+FETCH_MAX_SOURCES_PER_TICK = int(os.environ.get("FETCH_MAX_SOURCES_PER_TICK", "20"))
+
+# Requests per UTC day each provider allows us (0 means unlimited)
+PROVIDER_DAILY_QUOTAS = {
+    PROVIDER_NEWSAPI: int(os.environ.get("NEWSAPI_DAILY_QUOTA", "100")),
+    PROVIDER_GNEWS: int(os.environ.get("GNEWS_DAILY_QUOTA", "100"))
+}
+
+def jittered(seconds):
+    """Spread a delay by +/- FETCH_JITTER so sources drift apart instead of firing together"""
+    return timedelta(seconds=seconds * random.uniform(1 - FETCH_JITTER, 1 + FETCH_JITTER))
+
+class FetchScheduler:
+    """Polls each source on its own interval, adapted to how often it publishes new articles"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self._provider_sources = {}
+
+    def init_app(self, app):
+        self.app = app
+
+    def sync_schedules(self, sources, now):
+        """Create schedules for new sources, staggered across the default interval"""
+        schedules = {schedule.source_key: schedule for schedule in SourceSchedule.query.all()}
+        for key, source in sources.items():
+            if key in schedules:
+                continue
+            schedule = SourceSchedule(
+                source_key=key,
+                provider=source['provider'],
+                country_id=source['country_id'],
+                feed_url=source['feed_url'],
+                interval=FETCH_DEFAULT_INTERVAL,
+                next_due_at=now + timedelta(seconds=random.uniform(0, FETCH_DEFAULT_INTERVAL)),
+                new_item_rate=0.0,
+                polls=0,
+                failures=0
+            )
+            db.session.add(schedule)
+            schedules[key] = schedule
+        # Sources that are no longer configured keep their rows but are not polled
+        return {key: schedule for key, schedule in schedules.items() if key in sources}
+
+    def quota_floor(self, provider):
+        """Shortest interval that keeps all of a provider's sources within its daily quota"""
+        quota = PROVIDER_DAILY_QUOTAS.get(provider)
+        if not quota:
+            return 0
+        return 86400 * self._provider_sources.get(provider, 0) / quota
+
+    def reserve_quota(self, provider, now):
+        """Count one request against the provider's quota for today, if any is left"""
+        quota = PROVIDER_DAILY_QUOTAS.get(provider)
+        if not quota:
+            return True
+        day = now.date()
+        for _ in range(2):
+            result = db.session.execute(
+                update(ProviderUsage)
+                .where(ProviderUsage.provider == provider, ProviderUsage.day == day, ProviderUsage.requests < quota)
+                .values(requests=ProviderUsage.requests + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                return True
+            if ProviderUsage.query.filter_by(provider=provider, day=day).first():
+                return False
+            # First request of the day; another process may create the row at the same time
+            try:
+                with db.session.begin_nested():
+                    db.session.add(ProviderUsage(provider=provider, day=day, requests=1))
+                return True
+            except IntegrityError:
+                continue
+        return False
+
+    def next_interval(self, schedule):
+        """Interval that should find about FETCH_TARGET_NEW_ITEMS new articles per poll"""
+        if schedule.new_item_rate:
+            target = FETCH_TARGET_NEW_ITEMS / schedule.new_item_rate * 3600
+        else:
+            # Nothing new lately; back off gradually
+            target = schedule.interval * 1.5
+        # Change by at most a factor of two per poll so one burst does not swing the schedule
+        target = min(max(target, schedule.interval / 2), schedule.interval * 2)
+        floor = max(FETCH_MIN_INTERVAL, (schedule.latency or 0) * FETCH_LATENCY_FACTOR, self.quota_floor(schedule.provider))
+        return int(min(max(target, floor), max(FETCH_MAX_INTERVAL, floor)))
+
+    def record(self, schedule, result, now):
+        """Fold a poll's outcome into the source's averages and schedule its next poll"""
+        since_last = (now - schedule.last_polled_at).total_seconds() if schedule.last_polled_at else schedule.interval
+        schedule.polls = (schedule.polls or 0) + 1
+        schedule.last_polled_at = now
+        if result is None or not result['ok']:
+            # No response, or an error (bad key, rate limited): back off exponentially
+            schedule.failures = (schedule.failures or 0) + 1
+            schedule.interval = min(max(schedule.interval, FETCH_MIN_INTERVAL) * 2, FETCH_MAX_INTERVAL)
+        else:
+            schedule.failures = 0
+            rate = result['new'] / max(since_last, 1) * 3600
+            if schedule.polls == 1:
+                schedule.new_item_rate = rate
+                schedule.latency = result['latency']
+            else:
+                schedule.new_item_rate = FETCH_RATE_ALPHA * rate + (1 - FETCH_RATE_ALPHA) * (schedule.new_item_rate or 0)
+                schedule.latency = FETCH_RATE_ALPHA * result['latency'] + (1 - FETCH_RATE_ALPHA) * (schedule.latency or result['latency'])
+            schedule.interval = self.next_interval(schedule)
+        schedule.next_due_at = now + jittered(schedule.interval)
+
+    def enqueue(self):
+        """Queue a fetch job for the job workers (scheduled job, runs every minute)"""
+        with self.app.app_context():
+            try:
+                # Every web process schedules this; the dedup key keeps one fetch queued at a time
+                job_queue.enqueue('fetch', dedup_key='fetch')
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error queueing the news fetch: {str(e)}")
+            finally:
+                db.session.remove()
+
+    def run_due(self):
+        """Poll the sources that are due (run by the fetch job, see job_handlers.py)"""
+        with self.app.app_context():
+            try:
+                now = datetime.utcnow()
+                sources = {source['key']: source for source in build_sources(reference_data.countries())}
+                self._provider_sources = {}
+                for source in sources.values():
+                    self._provider_sources[source['provider']] = self._provider_sources.get(source['provider'], 0) + 1
+                schedules = self.sync_schedules(sources, now)
+
+                due = sorted(
+                    (schedule for schedule in schedules.values() if schedule.next_due_at <= now),
+                    key=lambda schedule: schedule.next_due_at
+                )[:FETCH_MAX_SOURCES_PER_TICK]
+                dispatch = []
+                for schedule in due:
+                    if not self.reserve_quota(schedule.provider, now):
+                        # Budget spent; try again shortly after the quota resets
+                        tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+                        schedule.next_due_at = tomorrow + jittered(FETCH_MIN_INTERVAL)
+                        logger.warning(f"Daily quota for {schedule.provider} used up, deferring {schedule.source_key}")
+                        continue
+                    # Provisional next poll, so a failed run does not leave the source due every tick
+                    schedule.next_due_at = now + jittered(schedule.interval)
+                    dispatch.append(schedule)
+                db.session.commit()
+                if not dispatch:
+                    return 0
+
+                logger.info(f"Polling {len(dispatch)} due news sources")
+                total_articles, results = run_ingestion([sources[schedule.source_key] for schedule in dispatch])
+                job_leases.check()
+                now = datetime.utcnow()
+                for schedule in dispatch:
+                    self.record(schedule, results.get(schedule.source_key), now)
+                db.session.commit()
+                return total_articles
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error polling news sources: {str(e)}")
+                return 0
+            finally:
+                db.session.remove()
+
+fetch_scheduler = FetchScheduler()
@@ -1,7 +1,7 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, BooleanField, TextAreaField, SelectField, FileField, HiddenField, SubmitField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, URL, Optional
-from models import Country, Category
+from reference_data import reference_data
 
 class LoginForm(FlaskForm):
     """Form for user login"""
@@ -33,7 +33,7 @@ class RegistrationForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         super(RegistrationForm, self).__init__(*args, **kwargs)
         from app import db
-        self.country.choices = [(c.id, c.name) for c in Country.query.order_by(Country.name).all()]
+        self.country.choices = reference_data.country_choices()
 
 class NewsForm(FlaskForm):
     """Form for adding/editing news"""
@@ -52,8 +52,8 @@ class NewsForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         super(NewsForm, self).__init__(*args, **kwargs)
         from app import db
-        self.category.choices = [(c.id, c.name) for c in Category.query.order_by(Category.name).all()]
-        self.country.choices = [(c.id, c.name) for c in Country.query.order_by(Country.name).all()]
+        self.category.choices = reference_data.category_choices()
+        self.country.choices = reference_data.country_choices()
 
 class ProfileForm(FlaskForm):
     """Form for editing user profile"""
@@ -71,7 +71,7 @@ class ProfileForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         super(ProfileForm, self).__init__(*args, **kwargs)
         from app import db
-        self.country.choices = [(c.id, c.name) for c in Country.query.order_by(Country.name).all()]
+        self.country.choices = reference_data.country_choices()
 
 class SupportTicketForm(FlaskForm):
     """Form for creating a support ticket"""
@@ -0,0 +1,129 @@
+import os
+import time
+import random
+import logging
+import threading
+import requests
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# HTTP client settings
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "20"))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.environ.get("HTTP_BACKOFF_BASE", "0.5"))  # seconds
+HTTP_BACKOFF_MAX = float(os.environ.get("HTTP_BACKOFF_MAX", "30"))  # seconds
+HTTP_POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", "50"))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))  # keep-alive connections per host
+FETCH_PER_HOST_LIMIT = int(os.environ.get("FETCH_PER_HOST_LIMIT", "2"))  # concurrent requests per host
+USER_AGENT = os.environ.get("HTTP_USER_AGENT", "JBC-News/1.0 (+https://github.com/JBCNEWS/JBC-News-Project)")
+
+# Responses worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class HostLimiter:
+    """Limit the number of concurrent requests made to any one host"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def _semaphore_for(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.limit)
+            return self._semaphores[host]
+
+    @contextmanager
+    def slot(self, url):
+        semaphore = self._semaphore_for(url)
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, honouring Retry-After when the server sends one"""
+    if retry_after:
+        try:
+            return min(float(retry_after), HTTP_BACKOFF_MAX)
+        except ValueError:
+            try:
+                return min(max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0), HTTP_BACKOFF_MAX)
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(HTTP_BACKOFF_BASE * (2 ** attempt), HTTP_BACKOFF_MAX))
+
+class HttpClient:
+    """Shared pooled HTTP session with timeouts, retries and a conditional-request cache"""
+
+    def __init__(self, per_host_limit=FETCH_PER_HOST_LIMIT, max_retries=HTTP_MAX_RETRIES):
+        self.max_retries = max_retries
+        self.timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        self.host_limiter = HostLimiter(per_host_limit)
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None, conditional=False, timeout=None, stream=False, retries=None):
+        """GET a URL; with conditional=True an unchanged resource comes back as a 304 response"""
+        max_retries = self.max_retries if retries is None else retries
+        headers = dict(headers or {})
+        cache_key = requests.Request('GET', url, params=params).prepare().url
+        if conditional:
+            with self._lock:
+                validators = self._validators.get(cache_key)
+            if validators:
+                if validators.get('etag'):
+                    headers['If-None-Match'] = validators['etag']
+                if validators.get('last_modified'):
+                    headers['If-Modified-Since'] = validators['last_modified']
+
+        attempt = 0
+        while True:
+            try:
+                with self.host_limiter.slot(url):
+                    response = self.session.get(url, params=params, headers=headers,
+                                                timeout=timeout or self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.warning(f"Request to {urlparse(url).netloc} failed ({str(e)}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= max_retries:
+                    break
+                delay = backoff_delay(attempt, response.headers.get('Retry-After'))
+                logger.warning(f"Request to {urlparse(url).netloc} returned {response.status_code}, retrying in {delay:.1f}s")
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+        if conditional and response.status_code == 200:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                with self._lock:
+                    self._validators[cache_key] = {'etag': etag, 'last_modified': last_modified}
+        return response
+
+    def forget(self, url, params=None):
+        """Drop stored validators so the next conditional GET downloads the full response"""
+        cache_key = requests.Request('GET', url, params=params).prepare().url
+        with self._lock:
+            self._validators.pop(cache_key, None)
+
+http_client = HttpClient()
@@ -0,0 +1,361 @@
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import select, insert, update, delete
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Metrics settings
+INGEST_METRICS_HISTORY = int(os.environ.get("INGEST_METRICS_HISTORY", "48"))  # finished runs kept in the ingest_run table (a day at 30 minutes)
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float('inf'))
+
+class Histogram:
+    """Fixed-bucket histogram of durations (not thread-safe; callers hold a lock)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.items = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, seconds, items=1):
+        self.count += 1
+        self.total += seconds
+        self.items += items
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+
+    def quantile(self, q):
+        """Approximate quantile: the upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def merge(self, data):
+        """Add the observations of another histogram, given as to_dict() output"""
+        if not data['count']:
+            return self
+        self.count += data['count']
+        self.total += data['total']
+        self.items += data['items']
+        self.min = data['min'] if self.min is None else min(self.min, data['min'])
+        self.max = data['max'] if self.max is None else max(self.max, data['max'])
+        for i, bound in enumerate(self.buckets):
+            self.counts[i] += data['buckets'].get('+Inf' if bound == float('inf') else str(bound), 0)
+        return self
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'items': self.items,
+            'total': round(self.total, 4),
+            'mean': round(self.total / self.count, 4) if self.count else None,
+            'min': round(self.min, 4) if self.min is not None else None,
+            'max': round(self.max, 4) if self.max is not None else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': {
+                ('+Inf' if bound == float('inf') else str(bound)): count
+                for bound, count in zip(self.buckets, self.counts)
+            }
+        }
+
+class IngestionRun:
+    """Timings and counters for one fetch_all_news run"""
+
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.started_at = datetime.utcnow()
+        self.finished_at = None
+        self.duration = None
+        self.status = 'running'
+        self.error = None
+        self.phases = {}  # wall-clock time of each step of the run, in order
+        self.stages = {}  # per-operation durations; operations overlap across threads
+        self.sources = {}
+        self.counters = {}
+        self.bytes_downloaded = 0
+        self.record_id = None  # row in the ingest_run table
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, items=1):
+        with self._lock:
+            if stage not in self.stages:
+                self.stages[stage] = Histogram()
+            self.stages[stage].observe(seconds, items)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_phase(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0) + seconds
+
+    def _source(self, name):
+        # Caller holds the lock
+        if name not in self.sources:
+            self.sources[name] = {
+                'requests': 0,
+                'errors': 0,
+                'articles': 0,
+                'bytes': 0,
+                'latency': Histogram()
+            }
+        return self.sources[name]
+
+    def record_source(self, name, seconds, ok=True):
+        with self._lock:
+            source = self._source(name)
+            source['requests'] += 1
+            source['errors'] += 0 if ok else 1
+            source['latency'].observe(seconds)
+
+    def add_source_articles(self, name, articles):
+        with self._lock:
+            self._source(name)['articles'] += articles
+
+    def add_bytes(self, count, source=None):
+        with self._lock:
+            self.bytes_downloaded += count
+            if source:
+                self._source(source)['bytes'] += count
+
+    def finish(self, status='ok', error=None):
+        self.duration = time.monotonic() - self._started
+        self.finished_at = datetime.utcnow()
+        self.status = status
+        self.error = error
+
+    def to_dict(self):
+        with self._lock:
+            counters = dict(self.counters)
+            screened = counters.get('dedup_screened', 0)
+            return {
+                'run_id': self.run_id,
+                'status': self.status,
+                'error': self.error,
+                'started_at': self.started_at.isoformat(),
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+                'duration': round(self.duration if self.duration is not None else time.monotonic() - self._started, 3),
+                'bytes_downloaded': self.bytes_downloaded,
+                'dedup_hit_rate': round(counters.get('dedup_rejected', 0) / screened, 4) if screened else None,
+                'counters': counters,
+                'phases': {name: round(seconds, 3) for name, seconds in self.phases.items()},
+                'stages': {name: histogram.to_dict() for name, histogram in self.stages.items()},
+                'sources': {
+                    name: dict(source, latency=source['latency'].to_dict())
+                    for name, source in self.sources.items()
+                },
+                'failed_sources': sorted(name for name, source in self.sources.items() if source['errors'])
+            }
+
+class IngestionMetrics:
+    """Process-wide ingestion metrics: the current run, a rolling history, and all-time stage totals
+
+    Recording calls made while no run is active (e.g. background translations)
+    only update the all-time totals. Runs are also written to the ingest_run
+    table, a row when they start and their summary when they finish, so
+    stored_runs() shows them whichever process ran the fetch job and across
+    restarts; snapshot() only describes this process.
+    """
+
+    def __init__(self, history=INGEST_METRICS_HISTORY):
+        self.history = deque(maxlen=history)
+        self.current = None
+        self.totals = {}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._next_run_id = 1
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start_run(self):
+        with self._lock:
+            run = IngestionRun(self._next_run_id)
+            self._next_run_id += 1
+            self.current = run
+        record_id = self._store_start(run)
+        if record_id is not None:
+            # Number the run by its row, so logs and stored runs agree across processes
+            run.run_id = run.record_id = record_id
+        return run
+
+    def finish_run(self, run, status='ok', error=None):
+        run.finish(status, error)
+        with self._lock:
+            if self.current is run:
+                self.current = None
+            self.history.append(run)
+        summary = run.to_dict()
+        self._store_finish(run, summary)
+        phases = ', '.join(f"{name} {seconds}s" for name, seconds in summary['phases'].items())
+        logger.info(f"Ingestion run {run.run_id} {status} in {summary['duration']}s ({phases}), "
+                    f"{summary['bytes_downloaded']} bytes downloaded, dedup hit rate {summary['dedup_hit_rate']}")
+        return run
+
+    def _store_start(self, run):
+        """Insert the running run's row; returns its id, or None if it could not be written"""
+        from app import db
+        from models import IngestRun
+        try:
+            with db.engine.begin() as connection:
+                return connection.execute(
+                    insert(IngestRun).values(owner=self.owner, status='running', started_at=run.started_at)
+                ).inserted_primary_key[0]
+        except Exception as e:
+            logger.error(f"Error storing ingestion run {run.run_id}: {str(e)}")
+            return None
+
+    def _store_finish(self, run, summary):
+        """Write a finished run's summary to its row and drop rows beyond the kept history"""
+        from app import db
+        from models import IngestRun
+        if run.record_id is None:
+            return
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(IngestRun).where(IngestRun.id == run.record_id).values(
+                        status=run.status,
+                        finished_at=run.finished_at,
+                        duration=run.duration,
+                        summary=json.dumps(summary)
+                    )
+                )
+                oldest_kept = connection.execute(
+                    select(IngestRun.id).order_by(IngestRun.id.desc()).offset(self.history.maxlen - 1).limit(1)
+                ).scalar()
+                if oldest_kept:
+                    connection.execute(delete(IngestRun).where(IngestRun.id < oldest_kept))
+        except Exception as e:
+            logger.error(f"Error storing ingestion run {run.run_id}: {str(e)}")
+
+    def stored_runs(self, runs=None):
+        """JSON-ready view of every process's stored runs: those still running, recent
+        finished ones (newest first) and stage totals over the finished ones"""
+        from models import IngestRun
+        rows = IngestRun.query.order_by(IngestRun.id.desc()).limit(self.history.maxlen).all()
+        running = [row.to_dict() for row in rows if row.status == 'running']
+        finished = [row.to_dict() for row in rows if row.status != 'running']
+        totals = {}
+        for summary in finished:
+            for name, stage in summary.get('stages', {}).items():
+                totals.setdefault(name, Histogram()).merge(stage)
+        if runs is not None:
+            finished = finished[:runs]
+        return {
+            'current': running,
+            'runs': finished,
+            'totals': {name: histogram.to_dict() for name, histogram in totals.items()}
+        }
+
+    def observe(self, stage, seconds, items=1):
+        with self._lock:
+            if stage not in self.totals:
+                self.totals[stage] = Histogram()
+            self.totals[stage].observe(seconds, items)
+            run = self.current
+        if run:
+            run.observe(stage, seconds, items)
+
+    @contextmanager
+    def stage(self, name, items=1):
+        """Time a block as one operation of the named stage"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started, items)
+
+    @contextmanager
+    def phase(self, name):
+        """Time a step of the current run by wall clock"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            run = self.current
+            if run:
+                run.add_phase(name, time.monotonic() - started)
+
+    @contextmanager
+    def source(self, name):
+        """Time a fetch from one source; bytes and articles recorded inside are attributed to it"""
+        previous = getattr(self._local, 'source', None), getattr(self._local, 'source_failed', False)
+        self._local.source, self._local.source_failed = name, False
+        started = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = not self._local.source_failed
+        finally:
+            self._local.source, self._local.source_failed = previous
+            elapsed = time.monotonic() - started
+            self.observe('fetch', elapsed)
+            run = self.current
+            if run:
+                run.record_source(name, elapsed, ok)
+
+    def fail_source(self):
+        """Count the source being fetched on this thread as failed, for fetchers that handle their own errors"""
+        self._local.source_failed = True
+
+    def source_ok(self):
+        """Whether the source being fetched on this thread has not been counted as failed"""
+        return not getattr(self._local, 'source_failed', False)
+
+    def count(self, name, value=1):
+        run = self.current
+        if run:
+            run.count(name, value)
+
+    def add_bytes(self, count):
+        run = self.current
+        if run:
+            run.add_bytes(count, getattr(self._local, 'source', None))
+
+    def add_articles(self, count):
+        run = self.current
+        source = getattr(self._local, 'source', None)
+        if run and source:
+            run.add_source_articles(source, count)
+
+    def snapshot(self, runs=None):
+        """JSON-ready view of the current run, recent runs (newest first) and all-time totals"""
+        with self._lock:
+            current = self.current
+            history = list(self.history)
+            totals = {name: histogram.to_dict() for name, histogram in self.totals.items()}
+        history.reverse()
+        if runs is not None:
+            history = history[:runs]
+        return {
+            'pid': os.getpid(),
+            'current': current.to_dict() if current else None,
+            'runs': [run.to_dict() for run in history],
+            'totals': totals
+        }
+
+ingest_metrics = IngestionMetrics()
@@ -0,0 +1,484 @@
+import os
+import re
+import json
+import math
+import mmap
+import time
+import atexit
+import bisect
+import logging
+import tempfile
+import threading
+import unicodedata
+import zlib
+from array import array
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, update, func
+from app import db
+from models import News, NewsTranslation
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Index settings
+SEARCH_INDEX_PATH = os.environ.get("SEARCH_INDEX_PATH", os.path.join(tempfile.gettempdir(), "jbc_search_index.bin"))
+SEARCH_INDEX_REFRESH_SECONDS = int(os.environ.get("SEARCH_INDEX_REFRESH_SECONDS", "30"))  # how stale a search may be
+SEARCH_INDEX_LOOKBACK = int(os.environ.get("SEARCH_INDEX_LOOKBACK", "120"))  # seconds of overlap for late commits by other processes
+SEARCH_INDEX_SAVE_EVERY = int(os.environ.get("SEARCH_INDEX_SAVE_EVERY", "500"))  # documents added between saves
+SEARCH_INDEX_MAX_DEAD = float(os.environ.get("SEARCH_INDEX_MAX_DEAD", "0.3"))  # share of replaced documents that triggers a rebuild
+SEARCH_MAX_RESULTS = int(os.environ.get("SEARCH_MAX_RESULTS", "500"))
+SEARCH_PREFIX_EXPANSION = int(os.environ.get("SEARCH_PREFIX_EXPANSION", "50"))  # terms a prefix may match
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_WEIGHT = 2  # a title word counts as this many summary words
+
+INDEX_MAGIC = b'JBCSIX01'
+SYNC_BATCH = 1000
+
+# Word characters, plus the combining marks that Devanagari, Arabic/Urdu and
+# Sinhala spell words with (\w alone would split words at vowel signs and viramas)
+WORD_PATTERN = re.compile(
+    r"[\w\u0900-\u0963\u0966-\u097f\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0d81-\u0df3\u200c\u200d]+"
+)
+
+# Spelling variants folded together so queries match however an article wrote a word
+LETTER_FOLDS = str.maketrans({
+    # Arabic/Urdu short vowel marks, superscript alef and tatweel are optional
+    **{chr(c): None for c in range(0x064b, 0x0660)},
+    '\u0670': None, '\u0640': None,
+    # Alef with hamza or madda, alef wasla -> alef
+    '\u0623': '\u0627', '\u0625': '\u0627', '\u0622': '\u0627', '\u0671': '\u0627',
+    # Alef maksura, Farsi/Urdu yeh, yeh with hamza -> yeh
+    '\u0649': '\u064a', '\u06cc': '\u064a', '\u0626': '\u064a',
+    # Keheh (Urdu kaf) -> kaf; teh marbuta, heh goal, heh with yeh -> heh; waw with hamza -> waw
+    '\u06a9': '\u0643', '\u0629': '\u0647', '\u06c1': '\u0647', '\u06c0': '\u0647', '\u0624': '\u0648',
+    # Joiners only affect how a word is drawn (Sinhala, Urdu)
+    '\u200c': None, '\u200d': None,
+    # Arabic-Indic, Eastern Arabic-Indic and Devanagari digits as ASCII
+    **{chr(0x0660 + d): str(d) for d in range(10)},
+    **{chr(0x06f0 + d): str(d) for d in range(10)},
+    **{chr(0x0966 + d): str(d) for d in range(10)},
+})
+
+def split_words(text):
+    """Case-folded words of a text, keeping the combining marks of Indic and Arabic scripts"""
+    return [word.strip('_') for word in WORD_PATTERN.findall(unicodedata.normalize('NFKC', text or '').casefold())
+            if word.strip('_')]
+
+def tokenize(text):
+    """Index terms of a text: its words with spelling variants folded together"""
+    return [term for term in (word.translate(LETTER_FOLDS) for word in split_words(text)) if term]
+
+def _content_hash(title, summary, translations):
+    translated = sorted((language, t.get('title'), t.get('summary')) for language, t in translations.items())
+    return zlib.crc32(f"{title}\x00{summary}\x00{translated!r}".encode('utf-8'))
+
+class InvertedIndex:
+    """In-process BM25 inverted index over article titles, summaries and translations
+
+    Every article contributes one document per language. Posting lists are arrays
+    of document numbers and term frequencies; the saved index is memory-mapped,
+    so a restart only reads what was added since the last save. Documents are
+    append-only: an edited article gets new documents and its old ones are marked
+    dead, as are a deleted article's, and the index is rebuilt once too many are dead.
+    """
+
+    def __init__(self, path=SEARCH_INDEX_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._mmap = None
+        self._file = None
+        self._reset()
+        self._loaded = False
+        self._synced_at = None  # monotonic time of the last sync
+        self._atexit = False
+
+    def _reset(self):
+        # Documents
+        self.languages = []
+        self.doc_news = array('I')
+        self.doc_language = array('B')
+        self.doc_length = array('I')
+        self.doc_time = array('d')  # published_at as a UTC timestamp
+        self.doc_live = array('B')
+        self.doc_hash = array('I')  # content hash of the article, to skip unchanged ones
+        self.news_docs = {}  # news_id -> (content hash, [doc numbers])
+        self.live_count = 0
+        self.live_length = 0
+        # Saved postings, memory-mapped: term -> (start, end) in base_docs/base_tfs
+        self.base_terms = []
+        self.base_ranges = {}
+        self.base_docs = memoryview(b'').cast('I')
+        self.base_tfs = memoryview(b'').cast('I')
+        # Postings added since the last save
+        self.delta = {}
+        self.delta_docs = 0
+        # newest News.updated_at indexed
+        self.updated_through = None
+
+    def _language(self, code):
+        if code not in self.languages:
+            self.languages.append(code)
+        return self.languages.index(code)
+
+    # Building
+
+    def _add_document(self, news_id, content_hash, language, title, summary, published_at):
+        terms = {}
+        for term in tokenize(title):
+            terms[term] = terms.get(term, 0) + TITLE_WEIGHT
+        for term in tokenize(summary):
+            terms[term] = terms.get(term, 0) + 1
+        if not terms:
+            return None
+        doc = len(self.doc_news)
+        length = sum(terms.values())
+        self.doc_news.append(news_id)
+        self.doc_language.append(self._language(language))
+        self.doc_length.append(length)
+        self.doc_time.append(published_at.replace(tzinfo=timezone.utc).timestamp() if published_at else 0.0)
+        self.doc_live.append(1)
+        self.doc_hash.append(content_hash)
+        self.live_count += 1
+        self.live_length += length
+        for term, tf in terms.items():
+            postings = self.delta.get(term)
+            if postings is None:
+                postings = self.delta[term] = (array('I'), array('I'))
+            postings[0].append(doc)
+            postings[1].append(tf)
+        self.delta_docs += 1
+        return doc
+
+    def _kill(self, docs):
+        for doc in docs:
+            if self.doc_live[doc]:
+                self.doc_live[doc] = 0
+                self.live_count -= 1
+                self.live_length -= self.doc_length[doc]
+
+    def index_news(self, news_id, title, summary, translations, published_at):
+        """Add or replace an article's documents; returns False if it was already current
+
+        translations is a {language_code: {'title', 'summary'}} dict.
+        """
+        content_hash = _content_hash(title, summary, translations)
+        current = self.news_docs.get(news_id)
+        if current and current[0] == content_hash:
+            return False
+        if current:
+            self._kill(current[1])
+        docs = [self._add_document(news_id, content_hash, 'en', title, summary, published_at)]
+        for language, translation in translations.items():
+            docs.append(self._add_document(news_id, content_hash, language, translation.get('title'),
+                                           translation.get('summary'), published_at))
+        self.news_docs[news_id] = (content_hash, [doc for doc in docs if doc is not None])
+        return True
+
+    def sync(self):
+        """Index articles added or changed since the last sync; returns how many changed"""
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                self.load()
+            query = db.session.query(News.id, News.title, News.summary, News.published_at, News.updated_at)
+            if self.updated_through is not None:
+                query = query.filter(News.updated_at >= self.updated_through - timedelta(seconds=SEARCH_INDEX_LOOKBACK))
+            changed = 0
+            batch = []
+            for row in query.order_by(News.updated_at, News.id).yield_per(SYNC_BATCH):
+                batch.append(row)
+                if len(batch) == SYNC_BATCH:
+                    changed += self._index_batch(batch)
+                    batch = []
+            changed += self._index_batch(batch)
+            changed += self._remove_deleted()
+            if self.updated_through is None:
+                self.updated_through = datetime.utcnow()
+            self._synced_at = time.monotonic()
+            if changed:
+                logger.info(f"Indexed {changed} changed articles for search")
+
+            if self.doc_news and 1 - self.live_count / len(self.doc_news) > SEARCH_INDEX_MAX_DEAD:
+                self.rebuild()
+            elif self.delta_docs >= SEARCH_INDEX_SAVE_EVERY:
+                self.save()
+            return changed
+
+    def _index_batch(self, rows):
+        """Index a batch of (id, title, summary, published_at, updated_at) rows with their translations"""
+        if not rows:
+            return 0
+        translations = {}
+        query = db.session.query(
+            NewsTranslation.news_id, NewsTranslation.lang, NewsTranslation.title, NewsTranslation.summary
+        ).filter(NewsTranslation.news_id.in_([row[0] for row in rows]))
+        for news_id, language, title, summary in query:
+            translations.setdefault(news_id, {})[language] = {'title': title, 'summary': summary}
+        changed = 0
+        for news_id, title, summary, published_at, updated_at in rows:
+            if self.index_news(news_id, title, summary, translations.get(news_id, {}), published_at):
+                changed += 1
+            if updated_at and (self.updated_through is None or updated_at > self.updated_through):
+                self.updated_through = updated_at
+        return changed
+
+    def _remove_deleted(self):
+        """Drop the documents of articles deleted since they were indexed"""
+        if db.session.query(func.count(News.id)).scalar() == len(self.news_docs):
+            return 0
+        existing = {news_id for news_id, in db.session.query(News.id).yield_per(SYNC_BATCH)}
+        deleted = [news_id for news_id in self.news_docs if news_id not in existing]
+        for news_id in deleted:
+            self._kill(self.news_docs.pop(news_id)[1])
+        return len(deleted)
+
+    def rebuild(self):
+        """Re-index every article from scratch, dropping dead documents"""
+        with self._lock:
+            logger.info("Rebuilding the search index")
+            self._close()
+            self._reset()
+            self._loaded = True
+            self.sync()
+            self.save()
+
+    def ensure_fresh(self):
+        if self._synced_at is None or time.monotonic() - self._synced_at > SEARCH_INDEX_REFRESH_SECONDS:
+            self.sync()
+        if not self._atexit:
+            self._atexit = True
+            atexit.register(self.save)
+
+    def watch_translations(self):
+        """Touch News.updated_at when a translation changes, so sync picks it up
+
+        Only processes searching with this index need it; the database
+        full-text index has its own triggers.
+        """
+        for identifier in ('after_insert', 'after_update', 'after_delete'):
+            if not event.contains(NewsTranslation, identifier, touch_translated_news):
+                event.listen(NewsTranslation, identifier, touch_translated_news)
+
+    # Persistence
+
+    def save(self):
+        """Write the index (saved postings merged with new ones) and memory-map it"""
+        with self._lock:
+            if not self.delta and os.path.exists(self.path):
+                return
+            terms = sorted(set(self.base_ranges) | set(self.delta))
+            posting_docs = array('I')
+            posting_tfs = array('I')
+            term_ends = array('Q')
+            for term in terms:
+                base = self.base_ranges.get(term)
+                if base:
+                    posting_docs.frombytes(self.base_docs[base[0]:base[1]].tobytes())
+                    posting_tfs.frombytes(self.base_tfs[base[0]:base[1]].tobytes())
+                delta = self.delta.get(term)
+                if delta:
+                    posting_docs.extend(delta[0])
+                    posting_tfs.extend(delta[1])
+                term_ends.append(len(posting_docs))
+
+            sections = [
+                ('doc_news', self.doc_news), ('doc_language', self.doc_language),
+                ('doc_length', self.doc_length), ('doc_time', self.doc_time), ('doc_live', self.doc_live),
+                ('doc_hash', self.doc_hash),
+                ('term_ends', term_ends), ('posting_docs', posting_docs), ('posting_tfs', posting_tfs),
+                ('terms', array('B', '\n'.join(terms).encode('utf-8')))
+            ]
+            meta = {
+                'languages': self.languages,
+                'updated_through': self.updated_through.isoformat() if self.updated_through else None,
+                'sections': {}
+            }
+            offset = 0
+            for name, values in sections:
+                meta['sections'][name] = [offset, values.typecode, len(values)]
+                offset += len(values) * values.itemsize
+                offset += -offset % 8
+            header = json.dumps(meta).encode('utf-8')
+            header += b' ' * (-(len(INDEX_MAGIC) + 4 + len(header)) % 8)
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.search_index-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(INDEX_MAGIC)
+                    f.write(len(header).to_bytes(4, 'little'))
+                    f.write(header)
+                    for name, values in sections:
+                        data = values.tobytes()
+                        f.write(data)
+                        f.write(b'\0' * (-len(data) % 8))
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.error(f"Error saving the search index: {str(e)}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+            self._open(terms)
+            logger.info(f"Saved search index with {len(self.doc_news)} documents and {len(terms)} terms")
+
+    def _close(self):
+        # Views into the map must be released before it can be closed
+        self.base_docs = memoryview(b'').cast('I')
+        self.base_tfs = memoryview(b'').cast('I')
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = self._file = None
+
+    def _open(self, terms=None):
+        """Map the saved file; returns its metadata"""
+        self._close()
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"{self.path} is not a search index")
+        header_start = len(INDEX_MAGIC) + 4
+        header_length = int.from_bytes(self._mmap[len(INDEX_MAGIC):header_start], 'little')
+        meta = json.loads(self._mmap[header_start:header_start + header_length])
+        data_start = header_start + header_length
+        view = memoryview(self._mmap)
+
+        def section(name):
+            offset, typecode, length = meta['sections'][name]
+            start = data_start + offset
+            return view[start:start + length * array(typecode).itemsize].cast(typecode)
+
+        if terms is None:
+            terms = section('terms').tobytes().decode('utf-8').split('\n') if meta['sections']['terms'][2] else []
+        term_ends = section('term_ends')
+        self.base_terms = terms
+        self.base_ranges = {}
+        start = 0
+        for term, end in zip(terms, term_ends):
+            self.base_ranges[term] = (start, end)
+            start = end
+        self.base_docs = section('posting_docs')
+        self.base_tfs = section('posting_tfs')
+        self.delta = {}
+        self.delta_docs = 0
+        return meta, section
+
+    def load(self):
+        """Load the saved index, if any, so only later changes need indexing"""
+        with self._lock:
+            if not os.path.exists(self.path):
+                return False
+            try:
+                meta, section = self._open()
+            except Exception as e:
+                logger.error(f"Error loading the search index, rebuilding it: {str(e)}")
+                self._close()
+                self._reset()
+                return False
+            self.languages = meta['languages']
+            self.updated_through = datetime.fromisoformat(meta['updated_through']) if meta['updated_through'] else None
+            # Document tables are small enough to copy, so they can change in place
+            self.doc_news = array('I', section('doc_news'))
+            self.doc_language = array('B', section('doc_language'))
+            self.doc_length = array('I', section('doc_length'))
+            self.doc_time = array('d', section('doc_time'))
+            self.doc_live = array('B', section('doc_live'))
+            self.doc_hash = array('I', section('doc_hash'))
+            self.news_docs = {}
+            self.live_count = 0
+            self.live_length = 0
+            for doc, news_id in enumerate(self.doc_news):
+                if self.doc_live[doc]:
+                    self.news_docs.setdefault(news_id, (self.doc_hash[doc], []))[1].append(doc)
+                    self.live_count += 1
+                    self.live_length += self.doc_length[doc]
+            logger.info(f"Loaded search index with {len(self.doc_news)} documents from {self.path}")
+            return True
+
+    # Querying
+
+    def _postings(self, term):
+        base = self.base_ranges.get(term)
+        if base:
+            yield self.base_docs[base[0]:base[1]], self.base_tfs[base[0]:base[1]]
+        delta = self.delta.get(term)
+        if delta:
+            yield delta
+
+    def _expand(self, prefix):
+        """Indexed terms starting with a prefix (the prefix itself first)"""
+        terms = [prefix] if prefix in self.base_ranges or prefix in self.delta else []
+        i = bisect.bisect_left(self.base_terms, prefix)
+        while i < len(self.base_terms) and self.base_terms[i].startswith(prefix) and len(terms) < SEARCH_PREFIX_EXPANSION:
+            if self.base_terms[i] != prefix:
+                terms.append(self.base_terms[i])
+            i += 1
+        for term in self.delta:
+            if len(terms) >= SEARCH_PREFIX_EXPANSION:
+                break
+            if term.startswith(prefix) and term not in terms:
+                terms.append(term)
+        return terms
+
+    def search(self, query, language=None, recency_days=None, limit=SEARCH_MAX_RESULTS, now=None):
+        """Rank articles containing every query word (the last as a prefix) by BM25
+
+        Scores are divided by 1 + age / recency_days when recency_days is given,
+        with ages taken at now (a UTC timestamp, by default the current time).
+        Returns [(news_id, score)], best first.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            self.ensure_fresh()
+            if not self.live_count:
+                return []
+            language_id = self.languages.index(language) if language in self.languages else None
+            if language and language_id is None:
+                return []
+            average_length = self.live_length / self.live_count
+
+            scores = None
+            for position, word in enumerate(words):
+                is_prefix = position == len(words) - 1
+                word_scores = {}
+                for term in (self._expand(word) if is_prefix else [word]):
+                    postings = list(self._postings(term))
+                    df = sum(len(docs) for docs, _ in postings)
+                    idf = math.log(1 + (self.live_count - df + 0.5) / (df + 0.5))
+                    for docs, tfs in postings:
+                        for doc, tf in zip(docs, tfs):
+                            if not self.doc_live[doc] or (language_id is not None and self.doc_language[doc] != language_id):
+                                continue
+                            if scores is not None and doc not in scores:
+                                continue
+                            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_length[doc] / average_length)
+                            word_scores[doc] = max(word_scores.get(doc, 0.0), idf * tf * (BM25_K1 + 1) / norm)
+                if scores is None:
+                    scores = word_scores
+                else:
+                    scores = {doc: score + word_scores[doc] for doc, score in scores.items() if doc in word_scores}
+                if not scores:
+                    return []
+
+            # Best document per article, scaled down with age
+            now = now or time.time()
+            best = {}
+            for doc, score in scores.items():
+                if recency_days:
+                    score = score / (1 + max(now - self.doc_time[doc], 0) / 86400 / recency_days)
+                news_id = self.doc_news[doc]
+                if score > best.get(news_id, 0.0):
+                    best[news_id] = score
+            return sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+def touch_translated_news(mapper, connection, translation):
+    connection.execute(
+        update(News.__table__).where(News.__table__.c.id == translation.news_id).values(updated_at=datetime.utcnow())
+    )
+
+inverted_index = InvertedIndex()
@@ -0,0 +1,75 @@
+import os
+import logging
+from app import db
+from models import News
+from job_queue import job_queue, PermanentJobError
+from job_leases import job_leases
+from scraper import scraper
+from news_fetcher import FETCH_RUN_DEADLINE
+from fetch_scheduler import fetch_scheduler
+from translation_pipeline import translation_pipeline, TRANSLATION_LEASE
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+@job_queue.register('fetch', visibility_timeout=FETCH_RUN_DEADLINE + 60, max_attempts=1)
+def fetch():
+    """Poll the news sources that are due (queued every minute by the web processes)
+
+    Not retried: the next minute queues another. The lease fences a run that
+    outlives its visibility timeout from the one started in its place.
+    """
+    try:
+        job_leases.exclusive('fetch_news')(fetch_scheduler.run_due)()
+    finally:
+        # Whichever worker claims the next fetch job can run it
+        job_leases.release('fetch_news')
+
+@job_queue.register('translate', visibility_timeout=TRANSLATION_LEASE)
+def translate(news_ids=None):
+    """Translate a batch of new articles, or with no IDs, sweep those due for a retry
+
+    Failed translations are retried by the pipeline's own backoff, not by the job.
+    """
+    if news_ids is None:
+        translation_pipeline.translate_due()
+    else:
+        translation_pipeline.translate_news(news_ids)
+
+@job_queue.register('scrape', visibility_timeout=120)
+def scrape(news_id):
+    """Fill in the content of an article that was stored without it"""
+    news = db.session.get(News, news_id)
+    if not news or news.content or not news.source_url:
+        return
+    scraped = scraper.scrape(news.source_url)
+    if not scraped:
+        # Failures are remembered by the scrape cache, so retrying soon would not help
+        logger.warning(f"Could not scrape content for news ID {news_id}")
+        return
+    news.content = scraped['content']
+    if not news.summary:
+        news.summary = scraped['summary']
+    db.session.commit()
+
+@job_queue.register('telegram_send', visibility_timeout=60)
+def telegram_send(chat_id, text, photo=None, parse_mode='Markdown', bot_token_env='NEWS_BOT_TOKEN'):
+    """Send one Telegram message (or photo with caption) through one of the bots
+
+    With the default Markdown parse mode, text must already be escaped (see utils.escape_markdown).
+    """
+    import telegram
+
+    token = os.environ.get(bot_token_env, "")
+    if not token:
+        raise RuntimeError(f"{bot_token_env} is not set")
+    bot = telegram.Bot(token=token)
+    try:
+        if photo:
+            bot.send_photo(chat_id=chat_id, photo=photo, caption=text, parse_mode=parse_mode)
+        else:
+            bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+    except (telegram.error.BadRequest, telegram.error.Unauthorized) as e:
+        # Malformed messages and chats that blocked the bot fail the same way every time
+        raise PermanentJobError(str(e)) from e
@@ -0,0 +1,178 @@
+import os
+import uuid
+import atexit
+import socket
+import logging
+import functools
+import threading
+from datetime import timedelta
+from sqlalchemy import select, update, insert, or_, case, func
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models import JobLease
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Lease settings
+JOB_LEASE_TTL = int(os.environ.get("JOB_LEASE_TTL", "180"))  # seconds before a silent leader is replaced
+
+class LeaseLost(RuntimeError):
+    pass
+
+def db_now(offset=0):
+    """The database's current UTC time plus offset seconds, as a SQL expression
+
+    Lease times are only ever set and compared on the database clock, so hosts
+    whose clocks disagree still agree on when a lease expires.
+    """
+    if db.engine.dialect.name == 'sqlite':
+        # Milliseconds, in the text format SQLAlchemy stores datetimes in
+        return func.strftime('%Y-%m-%d %H:%M:%f', 'now', f'{offset:+d} seconds', type_=db.DateTime)
+    if db.engine.dialect.name == 'postgresql':
+        now = func.timezone('UTC', func.now(), type_=db.DateTime)
+    else:
+        now = func.now(type_=db.DateTime)
+    return now + timedelta(seconds=offset) if offset else now
+
+class JobLeaseManager:
+    """Lease table that lets exactly one process (across workers and hosts) run each scheduled job
+
+    Every process schedules the jobs, but a job only runs in the process holding
+    its lease. The holder keeps the lease from run to run and renews it while a
+    run is in progress; if the process dies, the lease expires and the next
+    process whose tick comes up takes over. A run whose renewal fails stops at
+    its next check(), before writing anything more.
+    """
+
+    def __init__(self, app=None, ttl=JOB_LEASE_TTL):
+        self.app = app
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._held = set()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def init_app(self, app):
+        self.app = app
+        # Hand leases over straight away on a clean shutdown instead of waiting for them to expire
+        atexit.register(self.release_all)
+
+    def acquire(self, name, ttl=None):
+        """Take or renew the lease for a job; returns True if this process holds it"""
+        now = db_now()
+        expires_at = db_now(ttl or self.ttl)
+        try:
+            with db.engine.begin() as connection:
+                result = connection.execute(
+                    update(JobLease)
+                    .where(JobLease.name == name, or_(JobLease.owner == self.owner, JobLease.expires_at < now))
+                    .values(
+                        acquired_at=case((JobLease.owner == self.owner, JobLease.acquired_at), else_=now),
+                        owner=self.owner,
+                        renewed_at=now,
+                        expires_at=expires_at
+                    )
+                )
+                held = result.rowcount == 1
+                # Only a job with no row yet is inserted; inserting over a held lease
+                # would fail on the unique name and log an error in the database
+                exists = held or connection.execute(
+                    select(JobLease.id).where(JobLease.name == name)
+                ).first() is not None
+            if not exists:
+                # No row yet for this job; another process may be inserting it too
+                try:
+                    with db.engine.begin() as connection:
+                        connection.execute(insert(JobLease).values(
+                            name=name, owner=self.owner, acquired_at=now, renewed_at=now, expires_at=expires_at
+                        ))
+                    held = True
+                except IntegrityError:
+                    held = False
+        except Exception as e:
+            logger.error(f"Error acquiring job lease {name}: {str(e)}")
+            held = False
+
+        with self._lock:
+            if held and name not in self._held:
+                self._held.add(name)
+                logger.info(f"Process {self.owner} now runs scheduled job {name}")
+            elif not held and name in self._held:
+                self._held.discard(name)
+                logger.warning(f"Process {self.owner} lost the lease for scheduled job {name}")
+        return held
+
+    def release(self, name):
+        """Give up a lease so another process can take the job at once"""
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(JobLease)
+                    .where(JobLease.name == name, JobLease.owner == self.owner)
+                    .values(expires_at=db_now())
+                )
+        except Exception as e:
+            logger.error(f"Error releasing job lease {name}: {str(e)}")
+        with self._lock:
+            self._held.discard(name)
+
+    def release_all(self):
+        with self._lock:
+            held = list(self._held)
+        if not held or self.app is None:
+            return
+        with self.app.app_context():
+            for name in held:
+                self.release(name)
+
+    def check(self):
+        """Raise LeaseLost if the scheduled job running on this thread no longer holds its lease
+
+        Long jobs call this before each write, so a run that lost its lease stops
+        rather than writing alongside the new holder. Outside a job it does nothing.
+        """
+        name = getattr(self._local, 'name', None)
+        if name is None:
+            return
+        with self._lock:
+            held = name in self._held
+        if not held:
+            raise LeaseLost(f"Scheduled job {name} lost its lease")
+
+    def _heartbeat(self, name, ttl, stop):
+        # Renew the lease while a long run is in progress; once a renewal fails the
+        # lease is dropped from _held and the run stops at its next check()
+        while not stop.wait(ttl / 3):
+            with self.app.app_context():
+                if not self.acquire(name, ttl):
+                    return
+
+    def exclusive(self, name, ttl=None):
+        """Wrap a scheduled job so it only runs in the process holding its lease"""
+        ttl = ttl or self.ttl
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.app.app_context():
+                    if not self.acquire(name, ttl):
+                        logger.debug(f"Skipping scheduled job {name}, another process holds its lease")
+                        return None
+                stop = threading.Event()
+                heartbeat = threading.Thread(target=self._heartbeat, args=(name, ttl, stop),
+                                             name=f"job-lease-{name}", daemon=True)
+                heartbeat.start()
+                self._local.name = name
+                try:
+                    with self.app.app_context():
+                        return func(*args, **kwargs)
+                finally:
+                    self._local.name = None
+                    stop.set()
+                    heartbeat.join()
+            return wrapper
+        return decorator
+
+job_leases = JobLeaseManager()
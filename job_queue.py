@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import uuid
+import random
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, or_, and_
+from app import db
+from models import Job
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Queue settings
+JOB_VISIBILITY_TIMEOUT = int(os.environ.get("JOB_VISIBILITY_TIMEOUT", "300"))  # seconds before a silent worker's job is retried
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF_BASE = int(os.environ.get("JOB_BACKOFF_BASE", "30"))  # seconds
+JOB_BACKOFF_MAX = int(os.environ.get("JOB_BACKOFF_MAX", "3600"))  # seconds
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "2"))  # seconds an idle worker waits between polls
+JOB_CLAIM_BATCH = int(os.environ.get("JOB_CLAIM_BATCH", "10"))
+
+# Job states stored in Job.status
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+class PermanentJobError(Exception):
+    """Raised by a handler for a failure that retrying cannot fix; the job fails at once"""
+
+def backoff_delay(attempts):
+    """Exponential backoff with jitter for the given number of failed attempts"""
+    delay = min(JOB_BACKOFF_BASE * (2 ** max(attempts - 1, 0)), JOB_BACKOFF_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def _due(now):
+    """Queued jobs whose time has come, and running jobs whose worker went silent"""
+    return or_(
+        and_(Job.status == JOB_QUEUED, Job.run_at <= now),
+        and_(Job.status == JOB_RUNNING, Job.locked_until < now)
+    )
+
+class JobQueue:
+    """Durable job queue in the job table, drained by any number of worker processes
+
+    Workers claim due jobs with FOR UPDATE SKIP LOCKED on PostgreSQL, or with
+    conditional updates elsewhere (SQLite). A claimed job is invisible to other
+    workers until its visibility timeout passes, so a job whose worker dies is
+    picked up again; failures are retried with backoff up to max_attempts.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def register(self, kind, visibility_timeout=JOB_VISIBILITY_TIMEOUT, max_attempts=JOB_MAX_ATTEMPTS):
+        """Decorator registering the handler for a job kind; it is called with the payload as keyword arguments"""
+        def decorator(func):
+            self.handlers[kind] = {
+                'func': func,
+                'visibility_timeout': visibility_timeout,
+                'max_attempts': max_attempts
+            }
+            return func
+        return decorator
+
+    def enqueue(self, kind, payload=None, run_at=None, priority=0, dedup_key=None, max_attempts=None):
+        """Add a job in the current transaction (the caller commits)
+
+        A job whose dedup_key matches one that is still queued or running is dropped.
+        """
+        values = {
+            'kind': kind,
+            'payload': json.dumps(payload or {}),
+            'status': JOB_QUEUED,
+            'priority': priority,
+            'attempts': 0,
+            'max_attempts': max_attempts or self.handlers.get(kind, {}).get('max_attempts', JOB_MAX_ATTEMPTS),
+            'run_at': run_at or datetime.utcnow(),
+            'dedup_key': dedup_key,
+            'created_at': datetime.utcnow()
+        }
+        if dedup_key is None:
+            db.session.execute(Job.__table__.insert().values(**values))
+            return
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            if not Job.query.filter_by(dedup_key=dedup_key).first():
+                db.session.execute(Job.__table__.insert().values(**values))
+            return
+        db.session.execute(insert(Job).values(**values).on_conflict_do_nothing(index_elements=['dedup_key']))
+
+    def claim(self, kinds=None, limit=JOB_CLAIM_BATCH):
+        """Reserve up to limit due jobs for this worker and return their IDs"""
+        now = datetime.utcnow()
+        conditions = [_due(now)]
+        if kinds:
+            conditions.append(Job.kind.in_(kinds))
+        query = select(Job.id, Job.kind).where(*conditions).order_by(Job.priority.desc(), Job.run_at, Job.id).limit(limit)
+
+        if db.engine.dialect.name == 'postgresql':
+            # Rows locked by another worker's claim are skipped rather than waited on
+            rows = db.session.execute(query.with_for_update(skip_locked=True)).all()
+            for job_id, kind in rows:
+                self._lock_job(job_id, kind, now)
+            db.session.commit()
+            return [job_id for job_id, _ in rows]
+
+        # No row locks: each claim is a conditional update that only one worker can win
+        claimed = []
+        for job_id, kind in db.session.execute(query).all():
+            result = self._lock_job(job_id, kind, now, conditions=[_due(now)])
+            if result.rowcount == 1:
+                claimed.append(job_id)
+        db.session.commit()
+        return claimed
+
+    def _lock_job(self, job_id, kind, now, conditions=()):
+        visibility_timeout = self.handlers.get(kind, {}).get('visibility_timeout', JOB_VISIBILITY_TIMEOUT)
+        return db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, *conditions)
+            .values(
+                status=JOB_RUNNING,
+                attempts=Job.attempts + 1,
+                locked_by=self.worker_id,
+                locked_until=now + timedelta(seconds=visibility_timeout)
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def run_job(self, job_id):
+        """Run one claimed job and record the outcome; returns True if it succeeded"""
+        job = db.session.get(Job, job_id)
+        if not job or job.locked_by != self.worker_id:
+            return False
+        handler = self.handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job kind {job.kind}")
+            handler['func'](**job.get_payload())
+        except Exception as e:
+            db.session.rollback()
+            self.record_failure(job_id, e)
+            return False
+
+        # Only finish the job if no other worker took it over after a timeout
+        db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.locked_by == self.worker_id)
+            .values(status=JOB_DONE, finished_at=datetime.utcnow(), locked_by=None, locked_until=None,
+                    last_error=None, dedup_key=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return True
+
+    def record_failure(self, job_id, error):
+        """Schedule a retry with backoff, or mark the job failed once attempts run out"""
+        job = db.session.get(Job, job_id)
+        if not job or job.locked_by != self.worker_id:
+            return
+        job.last_error = str(error)[:255]
+        job.locked_by = None
+        job.locked_until = None
+        if job.attempts >= job.max_attempts or isinstance(error, PermanentJobError):
+            job.status = JOB_FAILED
+            job.finished_at = datetime.utcnow()
+            job.dedup_key = None
+            logger.error(f"Giving up on {job.kind} job {job_id} after {job.attempts} attempts: {str(error)}")
+        else:
+            job.status = JOB_QUEUED
+            job.run_at = datetime.utcnow() + timedelta(seconds=backoff_delay(job.attempts))
+            logger.warning(f"{job.kind} job {job_id} failed on attempt {job.attempts}, will retry: {str(error)}")
+        db.session.commit()
+
+    def run_once(self, app, kinds=None, limit=JOB_CLAIM_BATCH):
+        """Claim and run a batch of due jobs; returns how many were claimed"""
+        with app.app_context():
+            try:
+                job_ids = self.claim(kinds, limit)
+                for job_id in job_ids:
+                    self.run_job(job_id)
+                return len(job_ids)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error running queued jobs: {str(e)}")
+                return 0
+            finally:
+                db.session.remove()
+
+    def work(self, app, kinds=None, threads=1, poll_interval=JOB_POLL_INTERVAL, stop=None):
+        """Drain the queue until stop is set, sleeping while there is nothing due"""
+        stop = stop or threading.Event()
+
+        def loop():
+            while not stop.is_set():
+                if not self.run_once(app, kinds):
+                    stop.wait(poll_interval)
+
+        workers = [threading.Thread(target=loop, name=f"job-worker-{i}", daemon=True) for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        logger.info(f"Job worker {self.worker_id} started with {threads} threads for {', '.join(kinds or self.handlers)}")
+        try:
+            while any(worker.is_alive() for worker in workers):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+        for worker in workers:
+            worker.join()
+        logger.info(f"Job worker {self.worker_id} stopped")
+
+    def counts(self):
+        """Number of jobs per (kind, status)"""
+        rows = db.session.query(Job.kind, Job.status, db.func.count(Job.id)).group_by(Job.kind, Job.status).all()
+        counts = {}
+        for kind, status, count in rows:
+            counts.setdefault(kind, {})[status] = count
+        return counts
+
+job_queue = JobQueue()
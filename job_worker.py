@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+JBC Job Worker
+--------------
+Runs background jobs from the durable job queue: fetch, translate, scrape and
+telegram_send. Start as many workers as needed, on any host that can reach the
+database. The web processes only queue fetch and translate jobs (see
+fetch_scheduler.py and translation_pipeline.py); a fetch run holds a thread for
+up to FETCH_RUN_DEADLINE, so give workers running it more than one thread.
+
+    python job_worker.py                          # all job kinds, one thread
+    python job_worker.py --kinds scrape --threads 4
+    python job_worker.py --once                   # run what is due, then exit
+"""
+
+import sys
+import signal
+import argparse
+import logging
+import threading
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="JBC background job worker")
+    parser.add_argument('--kinds', help="comma-separated job kinds to run (default: all)")
+    parser.add_argument('--threads', type=int, default=1, help="jobs run concurrently by this worker")
+    parser.add_argument('--poll-interval', type=float, default=None, help="seconds to wait when the queue is empty")
+    parser.add_argument('--once', action='store_true', help="run the jobs that are due, then exit")
+    args = parser.parse_args()
+
+    from app import app
+    from job_queue import job_queue, JOB_POLL_INTERVAL
+    import job_handlers  # registers the handlers
+
+    kinds = [kind.strip() for kind in args.kinds.split(',')] if args.kinds else None
+    unknown = [kind for kind in kinds or [] if kind not in job_queue.handlers]
+    if unknown:
+        logger.error(f"Unknown job kinds: {', '.join(unknown)}")
+        return 1
+
+    if args.once:
+        total = 0
+        while True:
+            claimed = job_queue.run_once(app, kinds)
+            if not claimed:
+                break
+            total += claimed
+        logger.info(f"Ran {total} jobs")
+        return 0
+
+    stop = threading.Event()
+
+    def handle_signal(signum, frame):
+        logger.info(f"Received signal {signum}, finishing current jobs")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    job_queue.work(app, kinds, threads=args.threads,
+                   poll_interval=args.poll_interval or JOB_POLL_INTERVAL, stop=stop)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
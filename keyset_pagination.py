@@ -0,0 +1,198 @@
+import os
+import json
+import base64
+import binascii
+import logging
+from datetime import datetime
+from sqlalchemy import and_, or_, func, select, inspect
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Pagination settings
+KEYSET_TOTAL_CAP = int(os.environ.get("KEYSET_TOTAL_CAP", "1000"))  # rows counted at most; larger totals show as "1000+"
+
+NEXT = "next"
+PREVIOUS = "prev"
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+def _fits(value, column):
+    """Whether a decoded cursor value has the type of its key column"""
+    if value is None:
+        return True
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return True
+    if isinstance(value, bool) and python_type is not bool:
+        return False
+    if python_type is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, python_type)
+
+class Cursor:
+    """Position in a listing: the sort key of the row to continue from, and which way
+
+    Encoded as an opaque URL-safe token. The page number, total and the time the
+    listing was first shown ride along, so later pages never count or rank again.
+    """
+
+    def __init__(self, values, direction=NEXT, page=1, total=None, total_capped=False, as_of=None):
+        self.values = list(values)
+        self.direction = direction
+        self.page = page
+        self.total = total
+        self.total_capped = total_capped
+        self.as_of = as_of
+
+    def encode(self):
+        payload = {
+            'k': [_encode_value(value) for value in self.values],
+            'd': self.direction,
+            'p': self.page
+        }
+        if self.total is not None:
+            payload['t'] = [self.total, self.total_capped]
+        if self.as_of is not None:
+            payload['a'] = self.as_of.isoformat()
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+    @classmethod
+    def decode(cls, token):
+        """The cursor in a token, or None for a missing or malformed one (the first page)"""
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            total, total_capped = payload.get('t', (None, False))
+            if not isinstance(payload['k'], list) or not isinstance(total, (int, type(None))):
+                raise TypeError("cursor key or total has the wrong type")
+            return cls(
+                [_decode_value(value) for value in payload['k']],
+                direction=PREVIOUS if payload.get('d') == PREVIOUS else NEXT,
+                page=max(int(payload.get('p', 1)), 1),
+                total=total,
+                total_capped=bool(total_capped),
+                as_of=datetime.fromisoformat(payload['a']) if payload.get('a') else None
+            )
+        except (ValueError, KeyError, TypeError, binascii.Error) as e:
+            logger.debug(f"Ignoring invalid page cursor: {str(e)}")
+            return None
+
+    def fits(self, keys):
+        """Whether the cursor's values match the key columns in number and type"""
+        return len(self.values) == len(keys) and all(
+            _fits(value, column) for value, (column, _) in zip(self.values, keys)
+        )
+
+class KeysetPage:
+    """One page of a listing, with cursors to the pages either side"""
+
+    def __init__(self, items, per_page, page=1, next_cursor=None, prev_cursor=None, total=None, total_capped=False):
+        self.items = items
+        self.per_page = per_page
+        self.page = page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_capped = total_capped
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def pages(self):
+        """Number of pages when the total is known (a lower bound if it was capped)"""
+        if self.total is None:
+            return None
+        return max((self.total + self.per_page - 1) // self.per_page, 1)
+
+def _beyond(keys, values, direction):
+    """Rows strictly after (or, going back, before) the given sort key"""
+    clauses = []
+    for i, ((column, descending), value) in enumerate(zip(keys, values)):
+        forward = descending if direction == NEXT else not descending
+        comparison = column < value if forward else column > value
+        clauses.append(and_(*[keys[j][0] == values[j] for j in range(i)], comparison))
+    first_column, first_descending = keys[0]
+    # The bound on the first column alone gives the planner an index range
+    forward = first_descending if direction == NEXT else not first_descending
+    bound = first_column <= values[0] if forward else first_column >= values[0]
+    return and_(bound, or_(*clauses))
+
+def _ordering(keys, direction):
+    forward = direction == NEXT
+    return [column.desc() if descending == forward else column.asc() for column, descending in keys]
+
+def count_upto(query, cap=KEYSET_TOTAL_CAP):
+    """Rows a query returns, counting no further than cap; returns (count, capped)"""
+    # Only the primary key is read, which an index can usually supply
+    primary_key = inspect(query.column_descriptions[0]['entity']).primary_key
+    limited = query.order_by(None).with_entities(*primary_key).limit(cap + 1).subquery()
+    count = query.session.execute(select(func.count()).select_from(limited)).scalar()
+    return min(count, cap), count > cap
+
+def keyset_paginate(query, keys, cursor=None, per_page=10, with_total=False, as_of=None):
+    """A page of a query in keys order, continuing from a cursor
+
+    keys is a sequence of (column, descending) pairs whose last column is
+    unique, e.g. ((News.published_at, True), (News.id, True)). Each page is one
+    index range read of per_page + 1 rows however deep it is; there is no
+    OFFSET. With with_total, the first page also counts the rows (up to
+    KEYSET_TOTAL_CAP) and later pages reuse that count. A cursor whose values
+    do not fit the keys is ignored, giving the first page.
+    """
+    if cursor and not cursor.fits(keys):
+        # A forged or stale token; comparing its values to the columns could fail in the database
+        logger.debug("Ignoring page cursor that does not fit the listing's keys")
+        cursor = None
+    direction = cursor.direction if cursor else NEXT
+    page = cursor.page if cursor else 1
+    if cursor:
+        total, total_capped = cursor.total, cursor.total_capped
+        as_of = cursor.as_of or as_of
+    elif with_total:
+        total, total_capped = count_upto(query)
+    else:
+        total, total_capped = None, False
+
+    labels = [f'keyset_{i}' for i in range(len(keys))]
+    keyed = query.order_by(None).add_columns(*[column.label(label) for (column, _), label in zip(keys, labels)])
+    if cursor:
+        keyed = keyed.filter(_beyond(keys, cursor.values, direction))
+    rows = keyed.order_by(*_ordering(keys, direction)).limit(per_page + 1).all()
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == PREVIOUS:
+        rows.reverse()
+    items = [row[0] for row in rows]
+
+    def cursor_to(row, to_direction, to_page):
+        values = [getattr(row, label) for label in labels]
+        return Cursor(values, to_direction, to_page, total, total_capped, as_of).encode()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if (direction == NEXT and more) or (direction == PREVIOUS and cursor):
+            next_cursor = cursor_to(rows[-1], NEXT, page + 1)
+        if (direction == PREVIOUS and more) or (direction == NEXT and cursor):
+            prev_cursor = cursor_to(rows[0], PREVIOUS, max(page - 1, 1))
+
+    return KeysetPage(items, per_page, page, next_cursor, prev_cursor, total, total_capped)
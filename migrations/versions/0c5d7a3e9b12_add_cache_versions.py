@@ -0,0 +1,37 @@
+"""add cache versions
+
+Revision ID: 0c5d7a3e9b12
+Revises: f3e81b6c2a90
+Create Date: 2026-10-18 18:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c5d7a3e9b12'
+down_revision = 'f3e81b6c2a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() may already have created the table
+    if sa.inspect(op.get_bind()).has_table('cache_version'):
+        return
+
+    op.create_table(
+        'cache_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.execute("INSERT INTO cache_version (name, version) VALUES ('news', 0)")
+
+
+def downgrade():
+    op.drop_table('cache_version')
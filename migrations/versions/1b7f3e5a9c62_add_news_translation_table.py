@@ -0,0 +1,267 @@
+"""add news translation table
+
+Revision ID: 1b7f3e5a9c62
+Revises: d81f4a6c3e25
+Create Date: 2026-10-18 21:10:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b7f3e5a9c62'
+down_revision = 'd81f4a6c3e25'
+branch_labels = None
+depends_on = None
+
+# Same DDL as search_index.py, frozen here
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS news_search (
+        news_id INTEGER NOT NULL REFERENCES news (id) ON DELETE CASCADE,
+        language VARCHAR(10) NOT NULL,
+        document TSVECTOR NOT NULL,
+        PRIMARY KEY (news_id, language)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_news_search_document ON news_search USING GIN (document)",
+    """
+    CREATE OR REPLACE FUNCTION news_search_refresh() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO news_search (news_id, language, document) VALUES (
+            NEW.id, 'en',
+            setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.summary, '')), 'B')
+        )
+        ON CONFLICT (news_id, language) DO UPDATE SET document = EXCLUDED.document;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS news_search_refresh ON news",
+    """
+    CREATE TRIGGER news_search_refresh
+    AFTER INSERT OR UPDATE OF title, summary ON news
+    FOR EACH ROW EXECUTE FUNCTION news_search_refresh()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION news_translation_search_refresh() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM news_search WHERE news_id = OLD.news_id AND language = OLD.lang;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO news_search (news_id, language, document) VALUES (
+                NEW.news_id, NEW.lang,
+                setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(NEW.summary, '')), 'B')
+            )
+            ON CONFLICT (news_id, language) DO UPDATE SET document = EXCLUDED.document;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS news_translation_search_refresh ON news_translation",
+    """
+    CREATE TRIGGER news_translation_search_refresh
+    AFTER INSERT OR UPDATE OR DELETE ON news_translation
+    FOR EACH ROW EXECUTE FUNCTION news_translation_search_refresh()
+    """
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+        title, summary, news_id UNINDEXED, language UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    # Title matches count twice as much as summary matches
+    "INSERT INTO news_fts (news_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0)')",
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_insert AFTER INSERT ON news BEGIN
+        INSERT INTO news_fts (rowid, title, summary, news_id, language)
+        VALUES (new.id, new.title, new.summary, new.id, 'en');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_update AFTER UPDATE OF title, summary ON news BEGIN
+        DELETE FROM news_fts WHERE rowid = old.id;
+        INSERT INTO news_fts (rowid, title, summary, news_id, language)
+        VALUES (new.id, new.title, new.summary, new.id, 'en');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_delete AFTER DELETE ON news BEGIN
+        DELETE FROM news_fts WHERE rowid = old.id;
+        DELETE FROM news_fts WHERE rowid IN (SELECT -id FROM news_translation WHERE news_id = old.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_translation_fts_insert AFTER INSERT ON news_translation BEGIN
+        INSERT INTO news_fts (rowid, title, summary, news_id, language)
+        VALUES (-new.id, new.title, new.summary, new.news_id, new.lang);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_translation_fts_update AFTER UPDATE ON news_translation BEGIN
+        DELETE FROM news_fts WHERE rowid = -old.id;
+        INSERT INTO news_fts (rowid, title, summary, news_id, language)
+        VALUES (-new.id, new.title, new.summary, new.news_id, new.lang);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_translation_fts_delete AFTER DELETE ON news_translation BEGIN
+        DELETE FROM news_fts WHERE rowid = -old.id;
+    END
+    """
+]
+
+
+SQLITE_TRIGGERS = (
+    'news_fts_insert', 'news_fts_update', 'news_fts_delete',
+    'news_translation_fts_insert', 'news_translation_fts_update', 'news_translation_fts_delete'
+)
+
+news = sa.table('news', sa.column('id', sa.Integer), sa.column('translations', sa.Text))
+news_translation = sa.table(
+    'news_translation', sa.column('id', sa.Integer), sa.column('news_id', sa.Integer), sa.column('lang', sa.String),
+    sa.column('title', sa.Text), sa.column('summary', sa.Text), sa.column('updated_at', sa.DateTime)
+)
+
+
+def _drop_translations_column(bind):
+    if bind.dialect.name == 'sqlite':
+        # Batch mode would rebuild news, and the rebuild loses the partial listing indexes
+        op.execute("ALTER TABLE news DROP COLUMN translations")
+    else:
+        op.drop_column('news', 'translations')
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # db.create_all() may already have created it
+    if not inspector.has_table('news_translation'):
+        op.create_table(
+            'news_translation',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('news_id', sa.Integer(), nullable=False),
+            sa.Column('lang', sa.String(length=10), nullable=False),
+            sa.Column('title', sa.Text(), nullable=True),
+            sa.Column('summary', sa.Text(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['news_id'], ['news.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_news_translation_news_lang', 'news_translation', ['news_id', 'lang'], unique=True)
+
+    if 'translations' not in {column['name'] for column in inspector.get_columns('news')}:
+        return
+
+    # The old search triggers read news.translations and must go before it does;
+    # any new ones search_index.install() added at startup are put back below
+    if bind.dialect.name == 'postgresql':
+        search_installed = inspector.has_table('news_search')
+        op.execute("DROP TRIGGER IF EXISTS news_search_refresh ON news")
+        op.execute("DROP TRIGGER IF EXISTS news_translation_search_refresh ON news_translation")
+    elif bind.dialect.name == 'sqlite':
+        search_installed = inspector.has_table('news_fts')
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        # Row IDs change scheme, so the FTS table is rebuilt from scratch
+        op.execute("DROP TABLE IF EXISTS news_fts")
+    else:
+        search_installed = False
+
+    # Copy the JSON translations into rows in chunks, keeping rows already there
+    now = sa.func.current_timestamp()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(news.c.id, news.c.translations)
+            .where(news.c.id > last_id, news.c.translations.isnot(None))
+            .order_by(news.c.id)
+            .limit(1000)
+        ).all()
+        if not rows:
+            break
+        existing = set(bind.execute(
+            sa.select(news_translation.c.news_id, news_translation.c.lang)
+            .where(news_translation.c.news_id.in_([row.id for row in rows]))
+        ).all())
+        values = []
+        for row in rows:
+            try:
+                translations = json.loads(row.translations)
+            except ValueError:
+                continue
+            if not isinstance(translations, dict):
+                continue
+            for lang, translation in translations.items():
+                if isinstance(translation, dict) and (row.id, lang) not in existing:
+                    values.append({'news_id': row.id, 'lang': lang, 'title': translation.get('title'),
+                                   'summary': translation.get('summary')})
+        if values:
+            bind.execute(news_translation.insert().values(updated_at=now), values)
+        last_id = rows[-1].id
+
+    _drop_translations_column(bind)
+
+    if search_installed:
+        for statement in POSTGRES_DDL if bind.dialect.name == 'postgresql' else SQLITE_DDL:
+            op.execute(statement)
+        if bind.dialect.name == 'sqlite':
+            # Rewriting every title re-runs the triggers, which indexes the existing archive
+            op.execute("UPDATE news SET title = title")
+            op.execute("UPDATE news_translation SET title = title")
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # The previous search_index.install() recreates its triggers at startup
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS news_translation_search_refresh ON news_translation")
+        op.execute("DROP FUNCTION IF EXISTS news_translation_search_refresh()")
+        op.execute("DROP TRIGGER IF EXISTS news_search_refresh ON news")
+    elif bind.dialect.name == 'sqlite':
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS news_fts")
+
+    if 'translations' not in {column['name'] for column in inspector.get_columns('news')}:
+        op.add_column('news', sa.Column('translations', sa.Text(), nullable=True))
+
+    # Rebuild the JSON column from the rows, a chunk of articles at a time
+    last_id = 0
+    while True:
+        news_ids = bind.execute(
+            sa.select(news_translation.c.news_id).distinct()
+            .where(news_translation.c.news_id > last_id)
+            .order_by(news_translation.c.news_id)
+            .limit(1000)
+        ).scalars().all()
+        if not news_ids:
+            break
+        translations = {}
+        for row in bind.execute(
+            sa.select(news_translation.c.news_id, news_translation.c.lang,
+                      news_translation.c.title, news_translation.c.summary)
+            .where(news_translation.c.news_id.in_(news_ids))
+        ):
+            translations.setdefault(row.news_id, {})[row.lang] = {'title': row.title, 'summary': row.summary}
+        bind.execute(
+            news.update().where(news.c.id == sa.bindparam('news_id')).values(translations=sa.bindparam('data')),
+            [{'news_id': news_id, 'data': json.dumps(data)} for news_id, data in translations.items()]
+        )
+        last_id = news_ids[-1]
+
+    op.drop_index('ix_news_translation_news_lang', table_name='news_translation')
+    op.drop_table('news_translation')
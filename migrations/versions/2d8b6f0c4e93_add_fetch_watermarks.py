@@ -0,0 +1,40 @@
+"""add fetch watermarks
+
+Revision ID: 2d8b6f0c4e93
+Revises: 9c3f5a8e1d27
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d8b6f0c4e93'
+down_revision = '9c3f5a8e1d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() may already have created the table
+    if sa.inspect(op.get_bind()).has_table('fetch_watermark'):
+        return
+
+    op.create_table(
+        'fetch_watermark',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('source_key', sa.String(length=64), nullable=False),
+        sa.Column('provider', sa.String(length=20), nullable=False),
+        sa.Column('country_id', sa.Integer(), nullable=False),
+        sa.Column('last_published_at', sa.DateTime(), nullable=True),
+        sa.Column('last_url', sa.String(length=512), nullable=True),
+        sa.Column('last_fetched_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['country_id'], ['country.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('source_key')
+    )
+
+
+def downgrade():
+    op.drop_table('fetch_watermark')
@@ -0,0 +1,55 @@
+"""add news translation state
+
+Revision ID: 3f1c2a9b7d01
+Revises:
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7d01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # Databases created by db.create_all() may already have these columns
+    columns = _columns('news')
+    with op.batch_alter_table('news', schema=None) as batch_op:
+        if 'translation_status' not in columns:
+            batch_op.add_column(sa.Column('translation_status', sa.String(length=20), nullable=True))
+        if 'translation_attempts' not in columns:
+            batch_op.add_column(sa.Column('translation_attempts', sa.Integer(), nullable=True))
+        if 'translation_next_attempt_at' not in columns:
+            batch_op.add_column(sa.Column('translation_next_attempt_at', sa.DateTime(), nullable=True))
+        if 'translation_error' not in columns:
+            batch_op.add_column(sa.Column('translation_error', sa.String(length=255), nullable=True))
+
+    if 'ix_news_translation_status' not in _indexes('news'):
+        op.create_index('ix_news_translation_status', 'news', ['translation_status'], unique=False)
+
+    # Articles that already have translations are done; the rest go through the pipeline
+    op.execute("UPDATE news SET translation_attempts = 0 WHERE translation_attempts IS NULL")
+    op.execute("UPDATE news SET translation_status = 'done' WHERE translation_status IS NULL AND translations IS NOT NULL")
+    op.execute("UPDATE news SET translation_status = 'pending' WHERE translation_status IS NULL")
+
+
+def downgrade():
+    op.drop_index('ix_news_translation_status', table_name='news')
+    with op.batch_alter_table('news', schema=None) as batch_op:
+        batch_op.drop_column('translation_error')
+        batch_op.drop_column('translation_next_attempt_at')
+        batch_op.drop_column('translation_attempts')
+        batch_op.drop_column('translation_status')
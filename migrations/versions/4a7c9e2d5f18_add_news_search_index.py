@@ -0,0 +1,127 @@
+"""add full-text search index
+
+Revision ID: 4a7c9e2d5f18
+Revises: b6d2e8f1a7c4
+Create Date: 2026-10-18 17:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a7c9e2d5f18'
+down_revision = 'b6d2e8f1a7c4'
+branch_labels = None
+depends_on = None
+
+# Same DDL as search_index.py, frozen here
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS news_search (
+        news_id INTEGER NOT NULL REFERENCES news (id) ON DELETE CASCADE,
+        language VARCHAR(10) NOT NULL,
+        document TSVECTOR NOT NULL,
+        PRIMARY KEY (news_id, language)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_news_search_document ON news_search USING GIN (document)",
+    """
+    CREATE OR REPLACE FUNCTION news_search_refresh() RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM news_search WHERE news_id = NEW.id;
+        INSERT INTO news_search (news_id, language, document) VALUES (
+            NEW.id, 'en',
+            setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.summary, '')), 'B')
+        );
+        BEGIN
+            INSERT INTO news_search (news_id, language, document)
+            SELECT NEW.id, key,
+                   setweight(to_tsvector('simple', coalesce(value->>'title', '')), 'A') ||
+                   setweight(to_tsvector('simple', coalesce(value->>'summary', '')), 'B')
+            FROM jsonb_each(coalesce(NEW.translations, '{}')::jsonb)
+            WHERE jsonb_typeof(value) = 'object';
+        EXCEPTION WHEN others THEN
+            -- Unparseable translations must not block the write; the original is still indexed
+            NULL;
+        END;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS news_search_refresh ON news",
+    """
+    CREATE TRIGGER news_search_refresh
+    AFTER INSERT OR UPDATE OF title, summary, translations ON news
+    FOR EACH ROW EXECUTE FUNCTION news_search_refresh()
+    """
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+        title, summary, news_id UNINDEXED, language UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    # Title matches count twice as much as summary matches
+    "INSERT INTO news_fts (news_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0)')",
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_insert AFTER INSERT ON news BEGIN
+        INSERT INTO news_fts (rowid, title, summary, news_id, language)
+        VALUES (new.id * 64, new.title, new.summary, new.id, 'en');
+        INSERT INTO news_fts (rowid, title, summary, news_id, language)
+        SELECT new.id * 64 + row_number() OVER (ORDER BY key),
+               json_extract(value, '$.title'), json_extract(value, '$.summary'), new.id, key
+        FROM json_each(CASE WHEN json_valid(new.translations) THEN new.translations ELSE '{}' END)
+        WHERE json_type(value) = 'object';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_update AFTER UPDATE OF title, summary, translations ON news BEGIN
+        DELETE FROM news_fts WHERE rowid BETWEEN old.id * 64 AND old.id * 64 + 63;
+        INSERT INTO news_fts (rowid, title, summary, news_id, language)
+        VALUES (new.id * 64, new.title, new.summary, new.id, 'en');
+        INSERT INTO news_fts (rowid, title, summary, news_id, language)
+        SELECT new.id * 64 + row_number() OVER (ORDER BY key),
+               json_extract(value, '$.title'), json_extract(value, '$.summary'), new.id, key
+        FROM json_each(CASE WHEN json_valid(new.translations) THEN new.translations ELSE '{}' END)
+        WHERE json_type(value) = 'object';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_delete AFTER DELETE ON news BEGIN
+        DELETE FROM news_fts WHERE rowid BETWEEN old.id * 64 AND old.id * 64 + 63;
+    END
+    """
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        table, ddl = 'news_search', POSTGRES_DDL
+    elif bind.dialect.name == 'sqlite':
+        table, ddl = 'news_fts', SQLITE_DDL
+    else:
+        return
+    # search_index.install() at startup may already have created the index
+    created = not sa.inspect(bind).has_table(table)
+    for statement in ddl:
+        op.execute(statement)
+    if created:
+        # Rewriting every title re-runs the triggers, which indexes the existing archive
+        op.execute("UPDATE news SET title = title")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS news_search_refresh ON news")
+        op.execute("DROP FUNCTION IF EXISTS news_search_refresh()")
+        op.execute("DROP TABLE IF EXISTS news_search")
+    elif bind.dialect.name == 'sqlite':
+        for trigger in ('news_fts_insert', 'news_fts_update', 'news_fts_delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS news_fts")
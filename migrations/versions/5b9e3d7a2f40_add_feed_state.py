@@ -0,0 +1,40 @@
+"""add feed state
+
+Revision ID: 5b9e3d7a2f40
+Revises: c52e0b7f9a14
+Create Date: 2026-10-18 14:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9e3d7a2f40'
+down_revision = 'c52e0b7f9a14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() may already have created the table
+    if sa.inspect(op.get_bind()).has_table('feed_state'):
+        return
+
+    op.create_table(
+        'feed_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('feed_url', sa.String(length=512), nullable=False),
+        sa.Column('etag', sa.String(length=256), nullable=True),
+        sa.Column('last_modified', sa.String(length=64), nullable=True),
+        sa.Column('last_item_id', sa.String(length=512), nullable=True),
+        sa.Column('last_published_at', sa.DateTime(), nullable=True),
+        sa.Column('last_fetched_at', sa.DateTime(), nullable=True),
+        sa.Column('last_status', sa.String(length=20), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('feed_url')
+    )
+
+
+def downgrade():
+    op.drop_table('feed_state')
@@ -0,0 +1,48 @@
+"""add news listing indexes
+
+Revision ID: 6e2b9d4c1a73
+Revises: 0c5d7a3e9b12
+Create Date: 2026-10-18 19:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e2b9d4c1a73'
+down_revision = '0c5d7a3e9b12'
+branch_labels = None
+depends_on = None
+
+
+# Same indexes as News.__table_args__, frozen here
+INDEXES = [
+    ('ix_news_published_at', ['published_at', 'id'], None, None),
+    ('ix_news_country_published_at', ['country_id', 'published_at', 'id'], None, None),
+    ('ix_news_category_published_at', ['category_id', 'published_at', 'id'], None, None),
+    ('ix_news_live_country_published_at', ['country_id', 'published_at', 'id'], 'is_published', 'is_published = 1'),
+    ('ix_news_live_category_published_at', ['category_id', 'published_at', 'id'], 'is_published', 'is_published = 1'),
+    ('ix_news_created_by_published_at', ['created_by', 'published_at', 'id'], None, None),
+    ('ix_news_breaking_published_at', ['published_at', 'id'], 'is_breaking', 'is_breaking = 1'),
+    ('ix_news_unpublished_published_at', ['published_at', 'id'], 'NOT is_published', 'is_published = 0'),
+]
+
+
+def upgrade():
+    # db.create_all() may already have created them
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('news')}
+
+    for name, columns, postgresql_where, sqlite_where in INDEXES:
+        if name in indexes:
+            continue
+        op.create_index(
+            name, 'news', columns, unique=False,
+            postgresql_where=sa.text(postgresql_where) if postgresql_where else None,
+            sqlite_where=sa.text(sqlite_where) if sqlite_where else None
+        )
+
+
+def downgrade():
+    for name, _, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='news')
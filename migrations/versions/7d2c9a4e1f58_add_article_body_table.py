@@ -0,0 +1,99 @@
+"""add article body table
+
+Revision ID: 7d2c9a4e1f58
+Revises: 1b7f3e5a9c62
+Create Date: 2026-10-18 21:50:00.000000
+
+"""
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2c9a4e1f58'
+down_revision = '1b7f3e5a9c62'
+branch_labels = None
+depends_on = None
+
+# Same level as models.ARTICLE_BODY_COMPRESSION, frozen here
+COMPRESSION = 6
+
+news = sa.table('news', sa.column('id', sa.Integer), sa.column('content', sa.Text))
+article_body = sa.table(
+    'article_body', sa.column('news_id', sa.Integer), sa.column('data', sa.LargeBinary),
+    sa.column('length', sa.Integer)
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # db.create_all() may already have created it
+    if not inspector.has_table('article_body'):
+        op.create_table(
+            'article_body',
+            sa.Column('news_id', sa.Integer(), nullable=False),
+            sa.Column('data', sa.LargeBinary(), nullable=False),
+            sa.Column('length', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['news_id'], ['news.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('news_id')
+        )
+
+    if 'content' not in {column['name'] for column in inspector.get_columns('news')}:
+        return
+
+    # Compress existing bodies into the new table in chunks, keeping rows already there
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(news.c.id, news.c.content)
+            .where(news.c.id > last_id)
+            .order_by(news.c.id)
+            .limit(1000)
+        ).all()
+        if not rows:
+            break
+        existing = set(bind.execute(
+            sa.select(article_body.c.news_id).where(article_body.c.news_id.in_([row.id for row in rows]))
+        ).scalars())
+        values = [
+            {'news_id': row.id, 'data': zlib.compress(row.content.encode('utf-8'), COMPRESSION), 'length': len(row.content)}
+            for row in rows if row.content and row.id not in existing
+        ]
+        if values:
+            bind.execute(article_body.insert(), values)
+        last_id = rows[-1].id
+
+    if bind.dialect.name == 'sqlite':
+        # Batch mode would rebuild news, and the rebuild loses the partial listing indexes
+        op.execute("ALTER TABLE news DROP COLUMN content")
+    else:
+        op.drop_column('news', 'content')
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if 'content' not in {column['name'] for column in sa.inspect(bind).get_columns('news')}:
+        op.add_column('news', sa.Column('content', sa.Text(), nullable=True))
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(article_body.c.news_id, article_body.c.data)
+            .where(article_body.c.news_id > last_id)
+            .order_by(article_body.c.news_id)
+            .limit(1000)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            news.update().where(news.c.id == sa.bindparam('body_news_id')).values(content=sa.bindparam('text')),
+            [{'body_news_id': row.news_id, 'text': zlib.decompress(row.data).decode('utf-8')} for row in rows]
+        )
+        last_id = rows[-1].news_id
+
+    op.drop_table('article_body')
@@ -0,0 +1,42 @@
+"""add translation memory
+
+Revision ID: 8a4d6e21c3b2
+Revises: 3f1c2a9b7d01
+Create Date: 2026-10-18 13:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4d6e21c3b2'
+down_revision = '3f1c2a9b7d01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() may already have created the table
+    if sa.inspect(op.get_bind()).has_table('translation_memory'):
+        return
+
+    op.create_table(
+        'translation_memory',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('text_hash', sa.String(length=64), nullable=False),
+        sa.Column('target_language', sa.String(length=10), nullable=False),
+        sa.Column('translated_text', sa.Text(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('hits', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('text_hash', 'target_language', name='uq_translation_memory_text_language')
+    )
+    op.create_index('ix_translation_memory_last_used_at', 'translation_memory', ['last_used_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_translation_memory_last_used_at', table_name='translation_memory')
+    op.drop_table('translation_memory')
@@ -0,0 +1,59 @@
+"""add source schedules and provider usage
+
+Revision ID: 9c3f5a8e1d27
+Revises: e7a19c4d2b65
+Create Date: 2026-10-18 15:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3f5a8e1d27'
+down_revision = 'e7a19c4d2b65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() may already have created the tables
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('source_schedule'):
+        op.create_table(
+            'source_schedule',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('source_key', sa.String(length=600), nullable=False),
+            sa.Column('provider', sa.String(length=20), nullable=False),
+            sa.Column('country_id', sa.Integer(), nullable=False),
+            sa.Column('feed_url', sa.String(length=512), nullable=True),
+            sa.Column('interval', sa.Integer(), nullable=False),
+            sa.Column('next_due_at', sa.DateTime(), nullable=False),
+            sa.Column('last_polled_at', sa.DateTime(), nullable=True),
+            sa.Column('new_item_rate', sa.Float(), nullable=True),
+            sa.Column('latency', sa.Float(), nullable=True),
+            sa.Column('polls', sa.Integer(), nullable=True),
+            sa.Column('failures', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['country_id'], ['country.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('source_key')
+        )
+        op.create_index('ix_source_schedule_next_due_at', 'source_schedule', ['next_due_at'], unique=False)
+
+    if not inspector.has_table('provider_usage'):
+        op.create_table(
+            'provider_usage',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('provider', sa.String(length=20), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('requests', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('provider', 'day', name='uq_provider_usage_provider_day')
+        )
+
+
+def downgrade():
+    op.drop_table('provider_usage')
+    op.drop_index('ix_source_schedule_next_due_at', table_name='source_schedule')
+    op.drop_table('source_schedule')
@@ -0,0 +1,38 @@
+"""add ingest runs
+
+Revision ID: a5c8e2f4b7d9
+Revises: 7d2c9a4e1f58
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5c8e2f4b7d9'
+down_revision = '7d2c9a4e1f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() may already have created the table
+    if sa.inspect(op.get_bind()).has_table('ingest_run'):
+        return
+
+    op.create_table(
+        'ingest_run',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('owner', sa.String(length=128), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('duration', sa.Float(), nullable=True),
+        sa.Column('summary', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('ingest_run')
@@ -0,0 +1,70 @@
+"""add news de-duplication indexes
+
+Revision ID: c52e0b7f9a14
+Revises: 8a4d6e21c3b2
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+import re
+import hashlib
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52e0b7f9a14'
+down_revision = '8a4d6e21c3b2'
+branch_labels = None
+depends_on = None
+
+
+def _title_hash(title):
+    # Same normalization as News.compute_title_hash, frozen here for the backfill
+    title = unicodedata.normalize('NFKC', title or '').casefold()
+    normalized = ' '.join(re.sub(r'[^\w\s]', ' ', title).split())
+    if not normalized:
+        return None
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {column['name'] for column in inspector.get_columns('news')}
+    indexes = {index['name'] for index in inspector.get_indexes('news')}
+
+    if 'title_hash' not in columns:
+        with op.batch_alter_table('news', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('title_hash', sa.String(length=40), nullable=True))
+
+    # Backfill title hashes in chunks
+    news = sa.table('news', sa.column('id', sa.Integer), sa.column('title', sa.String), sa.column('title_hash', sa.String))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(news.c.id, news.c.title)
+            .where(news.c.id > last_id, news.c.title_hash.is_(None))
+            .order_by(news.c.id)
+            .limit(1000)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            news.update().where(news.c.id == sa.bindparam('news_id')).values(title_hash=sa.bindparam('hash')),
+            [{'news_id': row.id, 'hash': _title_hash(row.title)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+    if 'ix_news_title_hash' not in indexes:
+        op.create_index('ix_news_title_hash', 'news', ['title_hash'], unique=False)
+    if 'ix_news_source_url' not in indexes:
+        op.create_index('ix_news_source_url', 'news', ['source_url'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_news_source_url', table_name='news')
+    op.drop_index('ix_news_title_hash', table_name='news')
+    with op.batch_alter_table('news', schema=None) as batch_op:
+        batch_op.drop_column('title_hash')
@@ -0,0 +1,39 @@
+"""add keyset pagination indexes
+
+Revision ID: d81f4a6c3e25
+Revises: 6e2b9d4c1a73
+Create Date: 2026-10-18 20:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81f4a6c3e25'
+down_revision = '6e2b9d4c1a73'
+branch_labels = None
+depends_on = None
+
+
+# Same indexes as User and Support __table_args__, frozen here
+INDEXES = [
+    ('ix_user_created_at', 'user', ['created_at', 'id']),
+    ('ix_support_created_at', 'support', ['created_at', 'id']),
+    ('ix_support_status_created_at', 'support', ['status', 'created_at', 'id']),
+]
+
+
+def upgrade():
+    # db.create_all() may already have created them
+    inspector = sa.inspect(op.get_bind())
+
+    for name, table, columns in INDEXES:
+        if name in {index['name'] for index in inspector.get_indexes(table)}:
+            continue
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
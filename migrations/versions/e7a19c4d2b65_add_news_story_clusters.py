@@ -0,0 +1,81 @@
+"""add news story clusters
+
+Revision ID: e7a19c4d2b65
+Revises: 5b9e3d7a2f40
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+import re
+import random
+import struct
+import hashlib
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a19c4d2b65'
+down_revision = '5b9e3d7a2f40'
+branch_labels = None
+depends_on = None
+
+# Same permutations as models.MINHASH_COEFFICIENTS, frozen here for the backfill
+_PRIME = (1 << 61) - 1
+_random = random.Random(20261018)
+_COEFFICIENTS = [(_random.randrange(1, _PRIME), _random.randrange(0, _PRIME)) for _ in range(64)]
+
+
+def _minhash(title, summary):
+    # Same signature as News.compute_minhash
+    text = unicodedata.normalize('NFKC', f"{title or ''} {summary or ''}").casefold()
+    tokens = set(re.sub(r'[^\w\s]', ' ', text).split())
+    if len(tokens) < 6:
+        return None
+    values = [int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big') for token in tokens]
+    signature = [min((a * value + b) % _PRIME for value in values) & 0xFFFFFFFF for a, b in _COEFFICIENTS]
+    return struct.pack('>64I', *signature)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {column['name'] for column in inspector.get_columns('news')}
+    indexes = {index['name'] for index in inspector.get_indexes('news')}
+
+    with op.batch_alter_table('news', schema=None) as batch_op:
+        if 'minhash' not in columns:
+            batch_op.add_column(sa.Column('minhash', sa.LargeBinary(), nullable=True))
+        if 'cluster_lead_id' not in columns:
+            batch_op.add_column(sa.Column('cluster_lead_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_news_cluster_lead_id_news', 'news', ['cluster_lead_id'], ['id'])
+    if 'ix_news_cluster_lead_id' not in indexes:
+        op.create_index('ix_news_cluster_lead_id', 'news', ['cluster_lead_id'], unique=False)
+
+    # Backfill signatures in chunks; existing articles all stay cluster leads
+    news = sa.table('news', sa.column('id', sa.Integer), sa.column('title', sa.String),
+                    sa.column('summary', sa.Text), sa.column('minhash', sa.LargeBinary))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(news.c.id, news.c.title, news.c.summary)
+            .where(news.c.id > last_id, news.c.minhash.is_(None))
+            .order_by(news.c.id)
+            .limit(1000)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            news.update().where(news.c.id == sa.bindparam('news_id')).values(minhash=sa.bindparam('signature')),
+            [{'news_id': row.id, 'signature': _minhash(row.title, row.summary)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    op.drop_index('ix_news_cluster_lead_id', table_name='news')
+    with op.batch_alter_table('news', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_news_cluster_lead_id_news', type_='foreignkey')
+        batch_op.drop_column('cluster_lead_id')
+        batch_op.drop_column('minhash')
@@ -0,0 +1,34 @@
+"""add news updated_at
+
+Revision ID: f3e81b6c2a90
+Revises: 4a7c9e2d5f18
+Create Date: 2026-10-18 18:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3e81b6c2a90'
+down_revision = '4a7c9e2d5f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() may already have created the column
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('news')}
+    if 'updated_at' in columns:
+        return
+
+    with op.batch_alter_table('news', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_news_updated_at', ['updated_at'])
+    op.execute("UPDATE news SET updated_at = published_at")
+
+
+def downgrade():
+    with op.batch_alter_table('news', schema=None) as batch_op:
+        batch_op.drop_index('ix_news_updated_at')
+        batch_op.drop_column('updated_at')
@@ -1,9 +1,30 @@
 from app import db
 from flask_login import UserMixin
+from sqlalchemy import event, inspect
 from datetime import datetime
 from enum import Enum
 import uuid
 import json
+import re
+import hashlib
+import unicodedata
+import random
+import struct
+import zlib
+
+# MinHash settings for near-duplicate detection
+MINHASH_PERMUTATIONS = 64
+MINHASH_MIN_TOKENS = 6  # shorter texts are too small to fingerprint reliably
+MINHASH_PRIME = (1 << 61) - 1
+# Fixed seed: stored signatures are only comparable if every process uses the same permutations
+_minhash_random = random.Random(20261018)
+MINHASH_COEFFICIENTS = [
+    (_minhash_random.randrange(1, MINHASH_PRIME), _minhash_random.randrange(0, MINHASH_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+
+# zlib level for stored article bodies (1 fastest .. 9 smallest)
+ARTICLE_BODY_COMPRESSION = 6
 
 class Role(Enum):
     USER = "user"
@@ -28,6 +49,11 @@ class User(UserMixin, db.Model):
     # Relationships
     country = db.relationship('Country', backref='users')
     
+    # Admin user list, newest first (keyset pagination)
+    __table_args__ = (
+        db.Index('ix_user_created_at', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<User {self.username}>'
     
@@ -83,9 +109,8 @@ class News(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     summary = db.Column(db.Text, nullable=False)
-    content = db.Column(db.Text, nullable=True)
     image_url = db.Column(db.String(512), nullable=True)
-    source_url = db.Column(db.String(512), nullable=True)
+    source_url = db.Column(db.String(512), nullable=True, index=True)
     source_name = db.Column(db.String(100), nullable=True)
     published_at = db.Column(db.DateTime, default=datetime.utcnow)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)
@@ -94,26 +119,364 @@ class News(db.Model):
     is_auto_generated = db.Column(db.Boolean, default=True)
     is_published = db.Column(db.Boolean, default=True)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
-    translations = db.Column(db.Text, nullable=True)  # JSON field to store translated content
+    title_hash = db.Column(db.String(40), nullable=True, index=True)  # hash of the normalized title, for de-duplication
+    minhash = db.Column(db.LargeBinary, nullable=True)  # title + summary MinHash signature, for near-duplicate clustering
+    cluster_lead_id = db.Column(db.Integer, db.ForeignKey('news.id'), nullable=True, index=True)  # first article of the story cluster
+    translation_status = db.Column(db.String(20), default="pending", index=True)  # pending, in_progress, done, failed, clustered
+    translation_attempts = db.Column(db.Integer, default=0)
+    translation_next_attempt_at = db.Column(db.DateTime, nullable=True)  # retry backoff / claim lease
+    translation_error = db.Column(db.String(255), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # any change, for incremental indexing
     
     # Relationships
     category = db.relationship('Category', backref='news')
     country = db.relationship('Country', backref='news')
     author = db.relationship('User', backref='created_news')
-    
+    cluster_lead = db.relationship('News', remote_side=[id], backref='cluster_followers')
+    translations = db.relationship('NewsTranslation', backref='news', cascade='all, delete-orphan',
+                                   order_by='NewsTranslation.lang')
+    body = db.relationship('ArticleBody', backref='news', uselist=False, cascade='all, delete-orphan')
+
+    # Listings filter on these columns and show the newest first. Public pages
+    # only list published articles and have partial indexes of their own, so
+    # counting a country's or category's articles never reads the table;
+    # breaking and unpublished articles are few and get small partial indexes.
+    __table_args__ = (
+        db.Index('ix_news_published_at', 'published_at', 'id'),
+        db.Index('ix_news_country_published_at', 'country_id', 'published_at', 'id'),
+        db.Index('ix_news_category_published_at', 'category_id', 'published_at', 'id'),
+        db.Index('ix_news_live_country_published_at', 'country_id', 'published_at', 'id',
+                 postgresql_where=db.text('is_published'), sqlite_where=db.text('is_published = 1')),
+        db.Index('ix_news_live_category_published_at', 'category_id', 'published_at', 'id',
+                 postgresql_where=db.text('is_published'), sqlite_where=db.text('is_published = 1')),
+        db.Index('ix_news_created_by_published_at', 'created_by', 'published_at', 'id'),
+        db.Index('ix_news_breaking_published_at', 'published_at', 'id',
+                 postgresql_where=db.text('is_breaking'), sqlite_where=db.text('is_breaking = 1')),
+        db.Index('ix_news_unpublished_published_at', 'published_at', 'id',
+                 postgresql_where=db.text('NOT is_published'), sqlite_where=db.text('is_published = 0')),
+    )
+
     def __repr__(self):
         return f'<News {self.title}>'
     
-    def get_translation(self, language_code):
-        if not self.translations:
+    @staticmethod
+    def normalize_title(title):
+        """Case-fold a title and strip punctuation and extra whitespace"""
+        title = unicodedata.normalize('NFKC', title or '').casefold()
+        title = re.sub(r'[^\w\s]', ' ', title)
+        return ' '.join(title.split())
+    
+    @staticmethod
+    def compute_title_hash(title):
+        normalized = News.normalize_title(title)
+        if not normalized:
+            return None
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def compute_minhash(title, summary):
+        """MinHash signature of the words in the title and summary, packed as bytes"""
+        tokens = set(News.normalize_title(f"{title or ''} {summary or ''}").split())
+        if len(tokens) < MINHASH_MIN_TOKENS:
             return None
-        translations = json.loads(self.translations)
-        return translations.get(language_code)
+        values = [int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big') for token in tokens]
+        signature = [
+            min((a * value + b) % MINHASH_PRIME for value in values) & 0xFFFFFFFF
+            for a, b in MINHASH_COEFFICIENTS
+        ]
+        return struct.pack(f'>{MINHASH_PERMUTATIONS}I', *signature)
+    
+    @property
+    def content(self):
+        """Full article text, kept out of the news table so listings never read it"""
+        return self.body.text if self.body else None
+    
+    @content.setter
+    def content(self, value):
+        if not value:
+            self.body = None
+        elif self.body is None:
+            self.body = ArticleBody(text=value)
+        else:
+            self.body.text = value
+    
+    def get_translation(self, language_code):
+        """Translated title and summary in one language, or None"""
+        if 'translations' in inspect(self).unloaded:
+            # Read just the one row unless the article came with all its translations
+            translation = NewsTranslation.query.filter_by(news_id=self.id, lang=language_code).first()
+        else:
+            translation = next((t for t in self.translations if t.lang == language_code), None)
+        return translation.to_dict() if translation else None
     
     def add_translation(self, language_code, translation_data):
-        translations = json.loads(self.translations) if self.translations else {}
-        translations[language_code] = translation_data
-        self.translations = json.dumps(translations)
+        """Add or replace the translation in one language, leaving the others untouched"""
+        translation = None
+        if self.id is not None:
+            translation = NewsTranslation.query.filter_by(news_id=self.id, lang=language_code).first()
+        if translation is None:
+            translation = NewsTranslation(news=self, lang=language_code)
+            db.session.add(translation)
+        translation.title = translation_data.get('title')
+        translation.summary = translation_data.get('summary')
+    
+    def set_translations(self, translations):
+        """Add or replace translations from a {language_code: {'title', 'summary'}} dict"""
+        existing = {translation.lang: translation for translation in self.translations}
+        for language_code, translation_data in translations.items():
+            translation = existing.get(language_code)
+            if translation is None:
+                translation = NewsTranslation(lang=language_code)
+                self.translations.append(translation)
+            translation.title = translation_data.get('title')
+            translation.summary = translation_data.get('summary')
+
+@event.listens_for(News, 'before_insert')
+@event.listens_for(News, 'before_update')
+def set_news_title_hash(mapper, connection, news):
+    news.title_hash = News.compute_title_hash(news.title)
+
+@event.listens_for(News, 'before_insert')
+def set_news_minhash(mapper, connection, news):
+    # The ingestion engine sets the signature it clustered on; fill it in for everything else
+    if news.minhash is None:
+        news.minhash = News.compute_minhash(news.title, news.summary)
+
+class NewsTranslation(db.Model):
+    __tablename__ = 'news_translation'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    news_id = db.Column(db.Integer, db.ForeignKey('news.id', ondelete='CASCADE'), nullable=False)
+    lang = db.Column(db.String(10), nullable=False)  # language code, e.g. hi
+    title = db.Column(db.Text, nullable=True)
+    summary = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_news_translation_news_lang', 'news_id', 'lang', unique=True),
+    )
+    
+    def __repr__(self):
+        return f'<NewsTranslation {self.news_id} {self.lang}>'
+    
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'summary': self.summary
+        }
+    
+    @staticmethod
+    def load(news_ids, language_code):
+        """Translations of several articles in one language, keyed by news ID"""
+        if not news_ids or not language_code:
+            return {}
+        rows = NewsTranslation.query.filter(
+            NewsTranslation.news_id.in_(list(news_ids)),
+            NewsTranslation.lang == language_code
+        ).all()
+        return {translation.news_id: translation for translation in rows}
+
+class ArticleBody(db.Model):
+    __tablename__ = 'article_body'
+    
+    news_id = db.Column(db.Integer, db.ForeignKey('news.id', ondelete='CASCADE'), primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed UTF-8 text
+    length = db.Column(db.Integer, nullable=False)  # characters before compression
+    
+    def __repr__(self):
+        return f'<ArticleBody {self.news_id} {self.length} chars>'
+    
+    @property
+    def text(self):
+        return zlib.decompress(self.data).decode('utf-8')
+    
+    @text.setter
+    def text(self, value):
+        self.data = zlib.compress(value.encode('utf-8'), ARTICLE_BODY_COMPRESSION)
+        self.length = len(value)
+
+class TranslationMemory(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    text_hash = db.Column(db.String(64), nullable=False)  # sha256 of the source text
+    target_language = db.Column(db.String(10), nullable=False)
+    translated_text = db.Column(db.Text, nullable=False)
+    size = db.Column(db.Integer, nullable=False, default=0)  # bytes, used for size-based eviction
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('text_hash', 'target_language', name='uq_translation_memory_text_language'),
+    )
+    
+    def __repr__(self):
+        return f'<TranslationMemory {self.target_language}:{self.text_hash[:8]}>'
+
+class FeedState(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    feed_url = db.Column(db.String(512), nullable=False, unique=True)
+    etag = db.Column(db.String(256), nullable=True)
+    last_modified = db.Column(db.String(64), nullable=True)
+    last_item_id = db.Column(db.String(512), nullable=True)  # guid/id of the newest item already ingested
+    last_published_at = db.Column(db.DateTime, nullable=True)
+    last_fetched_at = db.Column(db.DateTime, nullable=True)
+    last_status = db.Column(db.String(20), nullable=True)
+    
+    def __repr__(self):
+        return f'<FeedState {self.feed_url}>'
+    
+    def to_dict(self):
+        return {
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'last_item_id': self.last_item_id,
+            'last_published_at': self.last_published_at,
+            'last_fetched_at': self.last_fetched_at,
+            'last_status': self.last_status
+        }
+
+class FetchWatermark(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    source_key = db.Column(db.String(64), nullable=False, unique=True)  # provider:country code
+    provider = db.Column(db.String(20), nullable=False)
+    country_id = db.Column(db.Integer, db.ForeignKey('country.id'), nullable=False)
+    last_published_at = db.Column(db.DateTime, nullable=True)  # newest publishedAt already ingested
+    last_url = db.Column(db.String(512), nullable=True)  # newest article already ingested
+    last_fetched_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<FetchWatermark {self.source_key}>'
+    
+    def to_dict(self):
+        return {
+            'last_published_at': self.last_published_at,
+            'last_url': self.last_url,
+            'last_fetched_at': self.last_fetched_at
+        }
+
+class SourceSchedule(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    source_key = db.Column(db.String(600), nullable=False, unique=True)  # provider:country code or provider:feed URL
+    provider = db.Column(db.String(20), nullable=False)
+    country_id = db.Column(db.Integer, db.ForeignKey('country.id'), nullable=False)
+    feed_url = db.Column(db.String(512), nullable=True)
+    interval = db.Column(db.Integer, nullable=False)  # seconds between polls
+    next_due_at = db.Column(db.DateTime, nullable=False, index=True)
+    last_polled_at = db.Column(db.DateTime, nullable=True)
+    new_item_rate = db.Column(db.Float, default=0.0)  # EWMA of new articles per hour
+    latency = db.Column(db.Float, nullable=True)  # EWMA of fetch time in seconds
+    polls = db.Column(db.Integer, default=0)
+    failures = db.Column(db.Integer, default=0)  # consecutive polls without a response
+    
+    # Relationships
+    country = db.relationship('Country', backref='source_schedules')
+    
+    def __repr__(self):
+        return f'<SourceSchedule {self.source_key}>'
+    
+    def to_dict(self):
+        return {
+            'source_key': self.source_key,
+            'provider': self.provider,
+            'country': self.country.code if self.country else None,
+            'interval': self.interval,
+            'next_due_at': self.next_due_at.isoformat() if self.next_due_at else None,
+            'last_polled_at': self.last_polled_at.isoformat() if self.last_polled_at else None,
+            'new_item_rate': self.new_item_rate,
+            'latency': self.latency,
+            'polls': self.polls,
+            'failures': self.failures
+        }
+
+class ProviderUsage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    provider = db.Column(db.String(20), nullable=False)
+    day = db.Column(db.Date, nullable=False)  # UTC day the quota applies to
+    requests = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('provider', 'day', name='uq_provider_usage_provider_day'),
+    )
+    
+    def __repr__(self):
+        return f'<ProviderUsage {self.provider} {self.day}: {self.requests}>'
+
+class JobLease(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), nullable=False, unique=True)  # scheduled job ID
+    owner = db.Column(db.String(128), nullable=False)  # host:pid:token of the process running the job
+    acquired_at = db.Column(db.DateTime, default=datetime.utcnow)
+    renewed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<JobLease {self.name} {self.owner}>'
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'owner': self.owner,
+            'acquired_at': self.acquired_at.isoformat() if self.acquired_at else None,
+            'renewed_at': self.renewed_at.isoformat() if self.renewed_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+class IngestRun(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    owner = db.Column(db.String(128), nullable=False)  # host:pid of the process that ran it
+    status = db.Column(db.String(20), nullable=False, default="running")  # running, ok, error
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration = db.Column(db.Float, nullable=True)  # seconds
+    summary = db.Column(db.Text, nullable=True)  # JSON run summary written when the run finishes (see ingest_metrics.py)
+    
+    def __repr__(self):
+        return f'<IngestRun {self.id} {self.status}>'
+    
+    def to_dict(self):
+        if self.summary:
+            return dict(json.loads(self.summary), owner=self.owner)
+        return {
+            'run_id': self.id,
+            'owner': self.owner,
+            'status': self.status,
+            'started_at': self.started_at.isoformat() if self.started_at else None
+        }
+
+class CacheVersion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), nullable=False, unique=True)  # cached data set, e.g. news
+    version = db.Column(db.Integer, nullable=False, default=0)  # bumped in the same transaction as the change
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CacheVersion {self.name}:{self.version}>'
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)  # fetch, translate, scrape, telegram_send
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON arguments for the handler
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, running, done, failed
+    priority = db.Column(db.Integer, nullable=False, default=0)  # higher runs first
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # not claimed before this time
+    locked_by = db.Column(db.String(128), nullable=True)  # worker holding the job
+    locked_until = db.Column(db.DateTime, nullable=True)  # visibility timeout of a running job
+    dedup_key = db.Column(db.String(128), nullable=True, unique=True)  # drops repeat enqueues of the same work
+    last_error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
+    
+    def get_payload(self):
+        return json.loads(self.payload) if self.payload else {}
 
 class Support(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -128,6 +491,12 @@ class Support(db.Model):
     # Relationships
     user = db.relationship('User', backref='support_tickets')
     
+    # Ticket lists, newest first and optionally by status (keyset pagination)
+    __table_args__ = (
+        db.Index('ix_support_created_at', 'created_at', 'id'),
+        db.Index('ix_support_status_created_at', 'status', 'created_at', 'id'),
+    )
+    
     def __init__(self, *args, **kwargs):
         super(Support, self).__init__(*args, **kwargs)
         if not self.ticket_id:
@@ -1,14 +1,24 @@
 import os
-import json
-import requests
+import time
 import logging
-import trafilatura
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from datetime import datetime, timedelta, timezone
 from flask import current_app
 from app import db
-from models import News, Category, Country
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError, DataError
+from models import News, Category, FetchWatermark
+from dedup import deduplicator, story_clusters
+from ingest_metrics import ingest_metrics
+from http_client import http_client
+from rss_fetcher import fetch_feed, load_feed_states, save_feed_state
+from scraper import scraper
+from job_queue import job_queue
+from job_leases import job_leases
+from reference_data import reference_data
+from page_cache import page_cache
 from googleapiclient.discovery import build
-from utils import translate_text
+from translation_pipeline import translation_pipeline, STATUS_PENDING, STATUS_CLUSTERED
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG)
@@ -18,6 +28,18 @@ logger = logging.getLogger(__name__)
 NEWS_API_KEY = os.environ.get("NEWS_API_KEY", "")
 GNEWS_API_KEY = os.environ.get("GNEWS_API_KEY", "")
 
+# Ingestion engine settings
+FETCH_MAX_WORKERS = int(os.environ.get("FETCH_MAX_WORKERS", "8"))
+FETCH_RUN_DEADLINE = int(os.environ.get("FETCH_RUN_DEADLINE", "600"))  # seconds per run
+RSS_ENABLED = os.environ.get("RSS_ENABLED", "true").lower() in ("1", "true", "yes")
+INGEST_WRITE_BATCH = int(os.environ.get("INGEST_WRITE_BATCH", "200"))  # articles per bulk insert
+FETCH_WATERMARK_LOOKBACK = int(os.environ.get("FETCH_WATERMARK_LOOKBACK", "600"))  # seconds of overlap for late-indexed articles
+
+# Source providers
+PROVIDER_NEWSAPI = "newsapi"
+PROVIDER_GNEWS = "gnews"
+PROVIDER_RSS = "rss"
+
 # News sources by country
 news_sources = {
     'US': ['cnn', 'the-new-york-times', 'bbc-news'],
@@ -52,10 +74,17 @@ rss_feeds = {
 }
 
 def fetch_from_newsapi(country_code):
-    """Fetch news from NewsAPI based on country code"""
+    """Fetch news from NewsAPI based on country code (None if unchanged since the last fetch)"""
     try:
-        url = f"https://newsapi.org/v2/top-headlines?country={country_code.lower()}&apiKey={NEWS_API_KEY}"
-        response = requests.get(url)
+        response = http_client.get(
+            "https://newsapi.org/v2/top-headlines",
+            params={'country': country_code.lower(), 'apiKey': NEWS_API_KEY},
+            conditional=True
+        )
+        ingest_metrics.add_bytes(len(response.content))
+        if response.status_code == 304:
+            logger.info(f"NewsAPI headlines for {country_code} unchanged since last fetch")
+            return None
         data = response.json()
         
         if response.status_code == 200 and data.get('status') == 'ok':
@@ -64,16 +93,31 @@ def fetch_from_newsapi(country_code):
             return articles
         else:
             logger.error(f"Failed to fetch from NewsAPI: {data.get('message')}")
+            ingest_metrics.fail_source()
             return []
     except Exception as e:
         logger.error(f"Error fetching from NewsAPI: {str(e)}")
+        ingest_metrics.fail_source()
         return []
 
-def fetch_from_gnews(country_code):
-    """Fetch news from GNews based on country code"""
+def fetch_from_gnews(country_code, since=None):
+    """Fetch news from GNews based on country code (None if unchanged since the last fetch)
+
+    With since (a naive UTC datetime), only articles published after it are requested.
+    """
     try:
-        url = f"https://gnews.io/api/v4/top-headlines?country={country_code.lower()}&token={GNEWS_API_KEY}"
-        response = requests.get(url)
+        params = {'country': country_code.lower(), 'token': GNEWS_API_KEY}
+        if since:
+            params['from'] = since.strftime('%Y-%m-%dT%H:%M:%SZ')
+        response = http_client.get(
+            "https://gnews.io/api/v4/top-headlines",
+            params=params,
+            conditional=True
+        )
+        ingest_metrics.add_bytes(len(response.content))
+        if response.status_code == 304:
+            logger.info(f"GNews headlines for {country_code} unchanged since last fetch")
+            return None
         data = response.json()
         
         if response.status_code == 200 and 'articles' in data:
@@ -82,93 +126,305 @@ def fetch_from_gnews(country_code):
             return articles
         else:
             logger.error(f"Failed to fetch from GNews: {data.get('message', 'Unknown error')}")
+            ingest_metrics.fail_source()
             return []
     except Exception as e:
         logger.error(f"Error fetching from GNews: {str(e)}")
+        ingest_metrics.fail_source()
         return []
 
 def scrape_website(url):
-    """Scrape website content using trafilatura"""
+    """Scrape website content using trafilatura (cached, see scraper.py)"""
     try:
-        downloaded = trafilatura.fetch_url(url)
-        text = trafilatura.extract(downloaded)
-        if text:
-            # Get first 500 characters as summary
-            summary = text[:500] + "..." if len(text) > 500 else text
-            return {
-                "content": text,
-                "summary": summary
-            }
-        return None
+        return scraper.scrape(url)
     except Exception as e:
         logger.error(f"Error scraping website {url}: {str(e)}")
         return None
 
-def process_news_article(article, country_id, category_name="General"):
-    """Process and add news article to database"""
-    try:
-        # Get or create category
-        category = Category.query.filter_by(name=category_name).first()
-        if not category:
-            category = Category(name=category_name)
+def article_exists(article):
+    """Check if an article is already stored (by URL or normalized title)"""
+    conditions = []
+    if article.get('url'):
+        conditions.append(News.source_url == article.get('url'))
+    title_hash = News.compute_title_hash(article.get('title'))
+    if title_hash:
+        conditions.append(News.title_hash == title_hash)
+    if not conditions:
+        return False
+    return db.session.query(News.id).filter(or_(*conditions)).first() is not None
+
+def needs_scrape(article):
+    """Check if an article has no content and can be scraped"""
+    return not article.get('content') and bool(article.get('url'))
+
+def merge_scraped_content(article, scraped):
+    """Copy scraped content and summary into an article dict"""
+    if scraped:
+        article['content'] = scraped['content']
+        if not article.get('description'):
+            article['description'] = scraped['summary']
+    return article
+
+def parse_published_at(value):
+    """Parse an ISO 8601 publish time into a naive UTC datetime"""
+    if not value:
+        return datetime.utcnow()
+    if isinstance(value, datetime):
+        published_at = value
+    else:
+        try:
+            published_at = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return datetime.utcnow()
+    if published_at.tzinfo is not None:
+        published_at = published_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return published_at
+
+def cluster_lead_id(article):
+    """News ID of the article's story cluster lead, if it has one that is stored"""
+    lead = article.get('cluster_lead')
+    if isinstance(lead, dict):
+        return lead.get('_news_id')
+    return lead
+
+def filter_new_articles(articles, watermark):
+    """Keep the articles newer than a source's watermark
+
+    Headlines come newest first, so the newest article already ingested marks the
+    end of what is new. Returns (articles, state), where state is the watermark
+    with this poll's time; advance_watermark() moves it once the articles are stored.
+    """
+    state = dict(watermark)
+    state['last_fetched_at'] = datetime.utcnow()
+    last_url = watermark.get('last_url')
+    last_published_at = watermark.get('last_published_at')
+    cutoff = last_published_at - timedelta(seconds=FETCH_WATERMARK_LOOKBACK) if last_published_at else None
+
+    fresh = []
+    for article in articles or []:
+        if last_url and article.get('url') == last_url:
+            break
+        published_at = parse_published_at(article.get('publishedAt')) if article.get('publishedAt') else None
+        if cutoff and published_at and published_at < cutoff:
+            continue
+        fresh.append(article)
+
+    skipped = len(articles or []) - len(fresh)
+    if skipped:
+        ingest_metrics.count('watermark_skipped', skipped)
+    return fresh, state
+
+def advance_watermark(articles, state, failed):
+    """Move a source's watermark past the new articles that were stored
+
+    articles are a poll's new articles, newest first; failed holds the id() of
+    those the writer could not store this time (transient errors; articles it
+    rejected for good count as passed). The watermark only moves past the run of
+    oldest articles that are all stored, so a failed article is listed again on
+    the next poll, and its publish time caps last_published_at so the lookback
+    does not skip it either. Publish times in the future count as now.
+    """
+    state = dict(state)
+    failed_at = [i for i, article in enumerate(articles) if id(article) in failed]
+    stored = articles[failed_at[-1] + 1:] if failed_at else articles
+    if not stored:
+        return state
+
+    now = datetime.utcnow()
+    published = [min(parse_published_at(article.get('publishedAt')), now)
+                 for article in stored if article.get('publishedAt')]
+    if state.get('last_published_at'):
+        published.append(min(state['last_published_at'], now))
+    newest = max(published, default=None)
+    for i in failed_at:
+        if articles[i].get('publishedAt') and newest:
+            newest = min(newest, parse_published_at(articles[i].get('publishedAt')))
+    state['last_url'] = next((article.get('url') for article in stored if article.get('url')), state.get('last_url'))
+    state['last_published_at'] = newest
+    return state
+
+def load_watermarks(source_keys):
+    """Read the stored watermark for each API source as plain dicts for worker threads"""
+    watermarks = {key: {} for key in source_keys}
+    for watermark in FetchWatermark.query.filter(FetchWatermark.source_key.in_(list(source_keys))).all():
+        watermarks[watermark.source_key] = watermark.to_dict()
+    return watermarks
+
+def save_watermark(source, state):
+    """Persist an API source's watermark in the current transaction (the caller commits)"""
+    watermark = FetchWatermark.query.filter_by(source_key=source['key']).first()
+    if not watermark:
+        watermark = FetchWatermark(source_key=source['key'], provider=source['provider'], country_id=source['country_id'])
+        db.session.add(watermark)
+    for key in ('last_published_at', 'last_url', 'last_fetched_at'):
+        if key in state:
+            setattr(watermark, key, state[key])
+    return watermark
+
+def build_news(article, country_id, category_id):
+    """Create (but do not add) a News object from a fetched article dict"""
+    source = article.get('source') or {}
+    lead_id = cluster_lead_id(article)
+    return News(
+        title=(article.get('title') or '')[:200],
+        summary=article.get('description') or '',
+        content=article.get('content') or '',
+        image_url=article.get('urlToImage') or article.get('image'),
+        source_url=article.get('url'),
+        source_name=source.get('name') or 'Unknown',
+        published_at=parse_published_at(article.get('publishedAt')),
+        category_id=category_id,
+        country_id=country_id,
+        minhash=article.get('minhash'),
+        cluster_lead_id=lead_id,
+        # Followers take the lead's translations instead of being translated themselves
+        translation_status=STATUS_CLUSTERED if lead_id else STATUS_PENDING,
+        is_auto_generated=True,
+        is_published=True
+    )
+
+class IngestionWriter:
+    """Collects new articles and writes them with one bulk insert per transaction
+
+    Story cluster followers wait until their lead is written so they can point at it.
+    Articles that can never be stored (no title or URL, or a row the database
+    rejects) go to rejected; those that hit a transient error go to failed and
+    are fetched again.
+    """
+
+    def __init__(self, batch_size=INGEST_WRITE_BATCH):
+        self.batch_size = batch_size
+        self.pending = []
+        self.deferred = []
+        self.failed = []
+        self.rejected = []
+        self.promoted = []  # followers that became a cluster lead because theirs was never stored
+        self.written = 0
+        self._categories = None
+
+    def category_id(self, name):
+        """Resolve a category from the preloaded map, creating it in the current transaction if needed"""
+        if self._categories is None:
+            self._categories = {category.name: category.id for category in reference_data.categories()}
+        if name not in self._categories:
+            category = Category(name=name)
             db.session.add(category)
+            db.session.flush()
+            self._categories[name] = category.id
+        return self._categories[name]
+
+    def add(self, article, country_id, category_name="General"):
+        if not article.get('title') or not article.get('url'):
+            self.rejected.append(article)
+            return
+        if isinstance(article.get('cluster_lead'), dict) and '_news_id' not in article['cluster_lead']:
+            self.deferred.append((article, country_id, category_name))
+            return
+        self.pending.append((article, country_id, category_name))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write pending articles in one transaction and queue them for translation"""
+        if not self.pending:
+            return 0
+        # A fetch run that lost its lease writes nothing more (see job_leases.py)
+        job_leases.check()
+        batch, self.pending = self.pending, []
+        try:
+            inserted = self._insert(batch)
+        except Exception as e:
+            db.session.rollback()
+            self._categories = None
+            logger.error(f"Bulk insert of {len(batch)} articles failed, retrying one at a time: {str(e)}")
+            inserted = []
+            for item in batch:
+                try:
+                    inserted.extend(self._insert([item]))
+                except (IntegrityError, DataError) as e:
+                    # The row itself is invalid; retrying it would fail the same way
+                    db.session.rollback()
+                    self._categories = None
+                    self.rejected.append(item[0])
+                    logger.error(f"Rejected news article {item[0].get('url')}: {str(e)}")
+                except Exception as e:
+                    db.session.rollback()
+                    self._categories = None
+                    self.failed.append(item[0])
+                    logger.error(f"Error processing news article: {str(e)}")
+        self.written += len(inserted)
+        return len(inserted)
+
+    def finish(self):
+        """Write everything still held, including followers whose lead was never stored"""
+        self.flush()
+        while self.deferred:
+            deferred, self.deferred = self.deferred, []
+            promoted = {}
+            for item in deferred:
+                article = item[0]
+                lead = article['cluster_lead']
+                if '_news_id' in lead:
+                    self.pending.append(item)
+                elif id(lead) in promoted:
+                    article['cluster_lead'] = promoted[id(lead)]
+                    self.deferred.append(item)
+                else:
+                    # The lead failed: the first follower leads the rest, and is scraped
+                    # and translated in its place
+                    article['cluster_lead'] = None
+                    promoted[id(lead)] = article
+                    self.promoted.append(article)
+                    self.pending.append(item)
+            self.flush()
+
+    def _insert(self, batch):
+        with ingest_metrics.stage('db_write', items=len(batch)):
+            rows = [build_news(article, country_id, self.category_id(category_name))
+                    for article, country_id, category_name in batch]
+            db.session.add_all(rows)
+            db.session.flush()
+            inserted = [(news.id, news.cluster_lead_id is not None) for news in rows]
+            # Translations are filled in by translate jobs, queued in the same transaction
+            translation_pipeline.enqueue([news_id for news_id, is_follower in inserted if not is_follower])
             db.session.commit()
-        
+        for (article, _, _), (news_id, is_follower) in zip(batch, inserted):
+            article['_news_id'] = news_id
+            if not is_follower:
+                story_clusters.lead_stored(article)
+        ingest_metrics.count('articles_written', len(inserted))
+        logger.info(f"Added {len(inserted)} news articles")
+        return inserted
+
+def process_news_article(article, country_id, category_name="General", scrape=True, check_existing=True):
+    """Process and add news article to database"""
+    try:
         # Check if article already exists (by URL or title)
-        existing = News.query.filter_by(source_url=article.get('url')).first()
-        if not existing:
-            existing = News.query.filter_by(title=article.get('title')).first()
-        
-        if existing:
+        if check_existing and article_exists(article):
             logger.debug(f"Article already exists: {article.get('title')}")
             return None
         
         # For articles without content, try to scrape the website
-        if not article.get('content') and article.get('url'):
-            scraped = scrape_website(article.get('url'))
-            if scraped:
-                article['content'] = scraped['content']
-                if not article.get('description'):
-                    article['description'] = scraped['summary']
+        if scrape and needs_scrape(article):
+            merge_scraped_content(article, scrape_website(article.get('url')))
         
-        # Create news object
-        news = News(
-            title=article.get('title'),
-            summary=article.get('description', ''),
-            content=article.get('content', ''),
-            image_url=article.get('urlToImage') or article.get('image'),
-            source_url=article.get('url'),
-            source_name=article.get('source', {}).get('name') or article.get('source', {}).get('name', 'Unknown'),
-            published_at=article.get('publishedAt') if article.get('publishedAt') else datetime.utcnow(),
-            category_id=category.id,
-            country_id=country_id,
-            is_auto_generated=True,
-            is_published=True
-        )
+        # Get or create category
+        category = reference_data.category_by_name(category_name)
+        if not category:
+            category = Category(name=category_name)
+            db.session.add(category)
+            db.session.flush()
         
+        # Create news object
+        news = build_news(article, country_id, category.id)
         db.session.add(news)
+        db.session.flush()
+        
+        # Translations are filled in by a translate job, queued in the same transaction
+        translation_pipeline.enqueue([news.id])
         db.session.commit()
         logger.info(f"Added news article: {news.title}")
         
-        # Generate translations (can be async in production)
-        try:
-            translations = {}
-            summary_en = news.summary
-            title_en = news.title
-            
-            # Translate to other languages
-            for lang_code in ['hi', 'ur', 'ar', 'si']:  # Hindi, Urdu, Arabic, Sinhala
-                translations[lang_code] = {
-                    'title': translate_text(title_en, lang_code),
-                    'summary': translate_text(summary_en, lang_code)
-                }
-            
-            news.translations = json.dumps(translations)
-            db.session.commit()
-            logger.info(f"Added translations for news ID: {news.id}")
-        except Exception as e:
-            logger.error(f"Error generating translations: {str(e)}")
-        
         return news
     except Exception as e:
         db.session.rollback()
@@ -183,9 +439,10 @@ def fetch_news_for_country(country):
         # Fetch from NewsAPI
         articles = fetch_from_newsapi(country.code)
         
-        # If NewsAPI fails or returns empty, try GNews
-        if not articles:
+        # If NewsAPI fails or returns empty, try GNews (unchanged headlines need no fallback)
+        if articles is not None and not articles:
             articles = fetch_from_gnews(country.code)
+        articles = articles or []
         
         # Process articles
         for article in articles:
@@ -196,18 +453,187 @@ def fetch_news_for_country(country):
         logger.error(f"Error fetching news for {country.name}: {str(e)}")
         return 0
 
-def fetch_all_news():
-    """Fetch news for all countries"""
+def fetch_source(source, state=None):
+    """Fetch one source's new articles on a worker thread (no DB access)
+
+    state is the source's FeedState (RSS) or FetchWatermark (APIs) as a dict.
+    Returns (articles, new_state, latency, ok), where ok is False if the
+    provider answered with an error (the fetchers log those and return nothing).
+    """
+    started = time.monotonic()
+    state = state or {}
+    with ingest_metrics.source(source['key']):
+        if source['provider'] == PROVIDER_RSS:
+            articles, state = fetch_feed(source['feed_url'], state)
+        else:
+            if source['provider'] == PROVIDER_GNEWS:
+                # GNews can filter by publish time; overlap a little for late-indexed articles
+                since = state.get('last_published_at')
+                articles = fetch_from_gnews(source['country_code'],
+                                            since - timedelta(seconds=FETCH_WATERMARK_LOOKBACK) if since else None)
+            else:
+                articles = fetch_from_newsapi(source['country_code'])
+            articles, state = filter_new_articles(articles, state)
+        ingest_metrics.add_articles(len(articles))
+        ok = ingest_metrics.source_ok()
+    return articles, state, time.monotonic() - started, ok
+
+def provider_enabled(provider):
+    """Whether a provider is configured (API providers need a key)"""
+    if provider == PROVIDER_NEWSAPI:
+        return bool(NEWS_API_KEY)
+    if provider == PROVIDER_GNEWS:
+        return bool(GNEWS_API_KEY)
+    return RSS_ENABLED
+
+def source_for(provider, country, feed_url=None):
+    """Describe a source as a plain dict that can be handed to worker threads"""
+    return {
+        'key': f"{provider}:{feed_url or country.code}",
+        'provider': provider,
+        'country_id': country.id,
+        'country_code': country.code,
+        'country_name': country.name,
+        'feed_url': feed_url
+    }
+
+def build_sources(countries):
+    """Every enabled (country, provider, feed) source, as plain dicts"""
+    sources = []
+    for country in countries:
+        for provider in (PROVIDER_NEWSAPI, PROVIDER_GNEWS):
+            if provider_enabled(provider):
+                sources.append(source_for(provider, country))
+        if provider_enabled(PROVIDER_RSS):
+            for feed_url in rss_feeds.get(country.code, []):
+                sources.append(source_for(PROVIDER_RSS, country, feed_url))
+    return sources
+
+@page_cache.deferred()
+def run_ingestion(sources, run_deadline=FETCH_RUN_DEADLINE):
+    """Fetch the given sources concurrently and write results from this thread
+
+    The pages listing what the run stored are invalidated once, when it ends.
+    Returns (total_articles, results), where results maps each source key that
+    responded to {'listed', 'new', 'latency', 'ok'}.
+    """
+    run = ingest_metrics.start_run()
     try:
-        logger.info("Starting automated news fetch")
-        countries = Country.query.all()
+        deadline = time.monotonic() + run_deadline
         
         total_articles = 0
-        for country in countries:
-            count = fetch_news_for_country(country)
-            total_articles += count
+        results = {}
+        writer = IngestionWriter()
+        pool = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="news-fetch")
+        try:
+            # Fan out the article list requests for every source, starting from its stored state
+            feed_states = load_feed_states([source['feed_url'] for source in sources if source['feed_url']])
+            watermarks = load_watermarks([source['key'] for source in sources if not source['feed_url']])
+            list_futures = {
+                pool.submit(fetch_source, source,
+                            feed_states[source['feed_url']] if source['feed_url'] else watermarks[source['key']]): source
+                for source in sources
+            }
+            
+            # As each source's list arrives, write what is ready and fan out the scrapes
+            scrape_futures = {}
+            unscraped = []
+            polled = []
+            with ingest_metrics.phase('collect'):
+                try:
+                    for future in as_completed(list_futures, timeout=max(deadline - time.monotonic(), 0)):
+                        source = list_futures[future]
+                        try:
+                            articles, state, latency, ok = future.result()
+                        except Exception as e:
+                            logger.error(f"Error fetching news from {source['key']} for {source['country_name']}: {str(e)}")
+                            continue
+                        # Feed states and watermarks are saved once the articles are written, see below
+                        polled.append((source, articles, state))
+                        
+                        total_articles += len(articles)
+                        with ingest_metrics.stage('dedup', items=len(articles)):
+                            accepted = deduplicator.screen(articles)
+                        ingest_metrics.count('dedup_screened', len(articles))
+                        ingest_metrics.count('dedup_rejected', len(articles) - len(accepted))
+                        results[source['key']] = {'listed': len(articles), 'new': len(accepted), 'latency': latency, 'ok': ok}
+                        
+                        # Only the first article of each story is scraped and translated
+                        ingest_metrics.count('cluster_followers', story_clusters.assign(accepted))
+                        for article in accepted:
+                            if needs_scrape(article) and not article.get('cluster_lead'):
+                                scrape_futures[scraper.submit(article.get('url'), deadline)] = (article, source['country_id'])
+                            else:
+                                writer.add(article, source['country_id'])
+                except FuturesTimeoutError:
+                    logger.warning("News fetch deadline reached before all sources responded")
+                    ingest_metrics.count('sources_timed_out', sum(1 for future in list_futures if not future.done()))
+            
+            # Write scraped articles as they complete; on deadline, store the rest unscraped
+            pending = set(scrape_futures)
+            with ingest_metrics.phase('scrape'):
+                try:
+                    for future in as_completed(scrape_futures, timeout=max(deadline - time.monotonic(), 0)):
+                        pending.discard(future)
+                        article, country_id = scrape_futures[future]
+                        try:
+                            merge_scraped_content(article, future.result())
+                        except Exception as e:
+                            logger.error(f"Error scraping website {article.get('url')}: {str(e)}")
+                        writer.add(article, country_id)
+                except FuturesTimeoutError:
+                    logger.warning(f"News fetch deadline reached with {len(pending)} scrapes outstanding")
+                    ingest_metrics.count('scrapes_timed_out', len(pending))
+                    for future in pending:
+                        future.cancel()
+                        article, country_id = scrape_futures[future]
+                        writer.add(article, country_id)
+                        unscraped.append(article)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            with ingest_metrics.phase('write'):
+                writer.finish()
+                # Scrapes cut off by the deadline, and those of followers promoted to
+                # lead, are finished by the job workers
+                for article in unscraped + [article for article in writer.promoted if needs_scrape(article)]:
+                    if article.get('_news_id'):
+                        job_queue.enqueue('scrape', {'news_id': article['_news_id']},
+                                          dedup_key=f"scrape:{article['_news_id']}")
+                db.session.commit()
+            for article in writer.failed + writer.rejected:
+                deduplicator.forget(article)
+                story_clusters.forget(article)
+        
+        # Source states are saved in a transaction of their own, after the articles
+        # commit. Watermarks only move past articles that are now stored or were
+        # rejected for good, and a feed with articles that failed to store keeps
+        # its old ETag and last item so they are fetched again.
+        job_leases.check()
+        failed = {id(article) for article in writer.failed}
+        for source, articles, state in polled:
+            if not source['feed_url']:
+                save_watermark(source, advance_watermark(articles, state, failed))
+            elif not any(id(article) in failed for article in articles):
+                save_feed_state(source['feed_url'], state)
+        db.session.commit()
         
-        logger.info(f"Completed news fetch, processed {total_articles} articles")
+        ingest_metrics.count('articles_listed', total_articles)
+        ingest_metrics.count('articles_failed', len(writer.failed))
+        ingest_metrics.count('articles_rejected', len(writer.rejected))
+        ingest_metrics.finish_run(run)
+        logger.info(f"Completed news fetch from {len(sources)} sources, processed {total_articles} articles, added {writer.written}")
+        return total_articles, results
+    except Exception as e:
+        logger.error(f"Error in news ingestion run: {str(e)}")
+        db.session.rollback()
+        ingest_metrics.finish_run(run, status='error', error=str(e))
+        return 0, {}
+
+def fetch_all_news():
+    """Fetch news from every source now, regardless of their schedules"""
+    try:
+        logger.info("Starting automated news fetch")
+        total_articles, _ = run_ingestion(build_sources(reference_data.countries()))
         return total_articles
     except Exception as e:
         logger.error(f"Error in fetch_all_news: {str(e)}")
@@ -0,0 +1,68 @@
+import logging
+from sqlalchemy import select, func, union_all
+from sqlalchemy.orm import joinedload, defer
+from models import News
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+def listing_options():
+    """Loader options for article lists: category and country come in the same query
+
+    The body and translations are separate tables that lists never touch, and
+    the MinHash signature is left out of the row.
+    """
+    return (joinedload(News.category), joinedload(News.country), defer(News.minhash))
+
+# Listing order; the (..., published_at, id) indexes on news return rows in it
+NEWEST_FIRST = (News.published_at.desc(), News.id.desc())
+NEWEST_FIRST_KEYS = ((News.published_at, True), (News.id, True))  # the same order, for keyset_paginate
+
+def listing_query(*criteria, published_only=True):
+    """Articles matching the criteria, newest first (a query to filter further or paginate)"""
+    query = News.query.options(*listing_options()).filter(*criteria)
+    if published_only:
+        query = query.filter(News.is_published == True)
+    return query.order_by(*NEWEST_FIRST)
+
+def latest_news(*criteria, limit=10, published_only=True):
+    """Newest articles matching the criteria"""
+    return listing_query(*criteria, published_only=published_only).limit(limit).all()
+
+def top_news_per_group(group_column, *criteria, limit=4, group_ids=None, published_only=True):
+    """Newest `limit` articles of every group (e.g. News.country_id), in one query
+
+    With group_ids, each group's newest rows are read from its (group,
+    published_at, id) index and combined with UNION ALL, so the cost stays at
+    `limit` rows per group however large the archive grows. Without, articles
+    are ranked within their group with ROW_NUMBER() OVER (PARTITION BY ...),
+    which reads every matching row. Returns {group_id: [News, ...]}, newest
+    first within each group.
+    """
+    if published_only:
+        criteria += (News.is_published == True,)
+    if group_ids is not None:
+        branches = [
+            select(News.id).where(group_column == group_id, *criteria).order_by(*NEWEST_FIRST).limit(limit).subquery()
+            for group_id in group_ids
+        ]
+        if not branches:
+            return {}
+        # Each branch is a subquery so its ORDER BY and LIMIT survive the union
+        newest = union_all(*[select(branch.c.id) for branch in branches]).subquery('newest')
+        query = News.query.join(newest, News.id == newest.c.id)
+    else:
+        rank = func.row_number().over(
+            partition_by=group_column,
+            order_by=NEWEST_FIRST
+        ).label('rank')
+        ranked = select(News.id, rank).where(group_column.isnot(None), *criteria).subquery('ranked')
+        query = News.query.join(ranked, News.id == ranked.c.id).filter(ranked.c.rank <= limit)
+
+    rows = query.options(*listing_options()).order_by(group_column, *NEWEST_FIRST).all()
+
+    groups = {}
+    for news in rows:
+        groups.setdefault(getattr(news, group_column.key), []).append(news)
+    return groups
@@ -0,0 +1,277 @@
+import os
+import time
+import logging
+import functools
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from flask import request, session, make_response
+from flask_login import current_user
+from markupsafe import Markup
+from sqlalchemy import event, select, update, insert, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import db
+from models import News, Country, Category, CacheVersion
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Cache settings
+PAGE_CACHE_BYTES = int(os.environ.get("PAGE_CACHE_BYTES", "50000000"))  # rendered HTML kept in memory
+PAGE_CACHE_TTL = int(os.environ.get("PAGE_CACHE_TTL", "300"))  # seconds, as a backstop to version stamps
+CACHE_VERSION_TTL = float(os.environ.get("CACHE_VERSION_TTL", "1"))  # seconds before re-reading another process's bumps
+
+# Cached data sets, each with a version stamp in the cache_version table
+NEWS_VERSION = "news"  # any listed article, for pages drawing on all of them
+REFERENCE_VERSION = "reference"  # countries and categories, see reference_data.py
+CACHE_VERSION_NAMES = [NEWS_VERSION, REFERENCE_VERSION]
+
+# News columns with a listing of their own, each versioned apart (see listing_version)
+LISTING_COLUMNS = {'country_id': 'country', 'category_id': 'category'}
+
+# News columns that listings show; changes to anything else (translations,
+# pipeline state) leave cached pages valid
+NEWS_LISTING_ATTRIBUTES = (
+    'title', 'summary', 'image_url', 'source_name', 'published_at',
+    'is_published', 'is_breaking', 'category_id', 'country_id'
+)
+
+class PageCache:
+    """In-process cache of rendered pages and fragments, keyed by data version stamps
+
+    Every change to listed news bumps the 'news' version and those of the
+    article's country and category listings, once per transaction (or once per
+    deferred() block, such as an ingestion run); changes to a country or category
+    bump the 'reference' and 'news' versions. A page rendered from older data is
+    then never served again, in this process or (within CACHE_VERSION_TTL) any
+    other. Whole responses are only cached for anonymous visitors; logged-in
+    pages reuse cached fragments.
+    """
+
+    def __init__(self, app=None, max_bytes=PAGE_CACHE_BYTES, ttl=PAGE_CACHE_TTL):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        self._versions = {}  # name -> (version, monotonic time read)
+        self._local = threading.local()  # bumps held back by deferred()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0
+        }
+
+    def init_app(self, app):
+        self.app = app
+        with app.app_context():
+            # bump() only updates, so every version row must exist up front
+            if not inspect(db.engine).has_table(CacheVersion.__tablename__):
+                return
+            for name in CACHE_VERSION_NAMES:
+                try:
+                    with db.engine.begin() as connection:
+                        exists = connection.execute(select(CacheVersion.id).where(CacheVersion.name == name)).first()
+                        if not exists:
+                            connection.execute(insert(CacheVersion).values(name=name, version=0, updated_at=datetime.utcnow()))
+                except IntegrityError:
+                    pass  # created by another process
+
+    # Version stamps
+
+    def version(self, name, max_age=CACHE_VERSION_TTL):
+        """Current version of a data set, re-read from the database at most every max_age seconds"""
+        cached = self._versions.get(name)
+        if cached and time.monotonic() - cached[1] < max_age:
+            return cached[0]
+        version = db.session.execute(select(CacheVersion.version).where(CacheVersion.name == name)).scalar() or 0
+        self._versions[name] = (version, time.monotonic())
+        return version
+
+    def bump(self, names, connection=None):
+        """Invalidate everything cached from some data sets, as part of the current transaction"""
+        connection = connection or db.session
+        # Rows are locked in name order, so concurrent bumps cannot deadlock
+        for name in sorted(names):
+            bumped = connection.execute(
+                update(CacheVersion)
+                .where(CacheVersion.name == name)
+                .values(version=CacheVersion.version + 1, updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not bumped:
+                # First change to a listing: its row starts at 1, unless another process just created it
+                dialect = db.engine.dialect.name
+                if dialect == 'postgresql':
+                    from sqlalchemy.dialects.postgresql import insert as upsert
+                elif dialect == 'sqlite':
+                    from sqlalchemy.dialects.sqlite import insert as upsert
+                else:
+                    connection.execute(insert(CacheVersion).values(name=name, version=1, updated_at=datetime.utcnow()))
+                    continue
+                connection.execute(
+                    upsert(CacheVersion).values(name=name, version=1, updated_at=datetime.utcnow())
+                    .on_conflict_do_update(index_elements=['name'],
+                                           set_={'version': CacheVersion.version + 1, 'updated_at': datetime.utcnow()})
+                )
+
+    @contextmanager
+    def deferred(self):
+        """Hold back this thread's bumps until the block ends, then bump each data set once
+
+        For writers that commit many times in a row, such as ingestion runs: the
+        pages they change go stale together at the end instead of on every commit.
+        """
+        if getattr(self._local, 'deferred', None) is not None:
+            yield
+            return
+        self._local.deferred = set()
+        try:
+            yield
+        finally:
+            names, self._local.deferred = self._local.deferred, None
+            if names:
+                try:
+                    with db.engine.begin() as connection:
+                        self.bump(names, connection)
+                except Exception as e:
+                    logger.error(f"Error bumping page cache versions: {str(e)}")
+                for name in names:
+                    self.forget_version(name)
+
+    def defer(self, names):
+        """Add bumps to the current deferred() block; returns False outside of one"""
+        deferred = getattr(self._local, 'deferred', None)
+        if deferred is None:
+            return False
+        deferred.update(names)
+        return True
+
+    def forget_version(self, name):
+        # Read the version again on next use (after this process bumped it)
+        self._versions.pop(name, None)
+
+    # Entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def set(self, key, value, size):
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[2]
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._size += size
+            while self._size > self.max_bytes and self._entries:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.stats['evictions'] += 1
+
+    def fragment(self, key, render, name=NEWS_VERSION):
+        """Rendered HTML for a fragment, calling render() only when its data changed"""
+        cache_key = ('fragment', key, self.version(name))
+        html = self.get(cache_key)
+        if html is None:
+            html = Markup(render())
+            self.set(cache_key, html, len(html))
+        return html
+
+    def cached(self, *names):
+        """Decorator serving a view's whole response from memory to anonymous visitors
+
+        names are the data sets the page shows, all news by default; a callable
+        is given the view's arguments and returns a name, such as a listing's.
+        """
+        names = names or (NEWS_VERSION,)
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method != 'GET' or current_user.is_authenticated or session.get('_flashes'):
+                    return view(*args, **kwargs)
+                versions = tuple(self.version(name(**kwargs) if callable(name) else name) for name in names)
+                cache_key = ('page', request.full_path, versions)
+                entry = self.get(cache_key)
+                if entry is not None:
+                    body, status, mimetype = entry
+                    response = self.app.response_class(body, status=status, mimetype=mimetype)
+                    response.headers['X-Page-Cache'] = 'hit'
+                    return response
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.direct_passthrough and not session.modified:
+                    body = response.get_data()
+                    self.set(cache_key, (body, response.status_code, response.mimetype), len(body))
+                response.headers['X-Page-Cache'] = 'miss'
+                return response
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), bytes=self._size,
+                        versions={name: version for name, (version, _) in self._versions.items()})
+
+page_cache = PageCache()
+
+def listing_version(column, value):
+    """Version name of the listing of one country or category, e.g. listing_version('country_id', 3)"""
+    return f"{NEWS_VERSION}:{LISTING_COLUMNS[column]}:{value}"
+
+def _changed_versions(session):
+    """Data sets whose cached copies a flush makes stale"""
+    names = set()
+    for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+        if isinstance(obj, (Country, Category)):
+            # Pages show country and category names too
+            names.update((REFERENCE_VERSION, NEWS_VERSION))
+        elif isinstance(obj, News):
+            state = inspect(obj)
+            if obj in session.dirty:
+                if not any(state.attrs[attr].history.has_changes() for attr in NEWS_LISTING_ATTRIBUTES):
+                    continue
+            names.add(NEWS_VERSION)
+            # The listings the article is in, and was in before a move
+            for column in LISTING_COLUMNS:
+                for value in state.attrs[column].history.sum():
+                    if value is not None:
+                        names.add(listing_version(column, value))
+    return names
+
+@event.listens_for(Session, 'before_flush')
+def check_cached_data(session, flush_context, instances):
+    names = _changed_versions(session)
+    if names:
+        session.info.setdefault('page_cache_flush', set()).update(names)
+
+@event.listens_for(Session, 'after_flush')
+def bump_cache_versions(session, flush_context):
+    names = session.info.pop('page_cache_flush', set())
+    if not names or page_cache.defer(names):
+        return
+    # Same transaction as the change, so other processes never see new data with an
+    # old stamp; each version is bumped once however many flushes the transaction has
+    bumped = session.info.setdefault('page_cache_bumped', set())
+    names -= bumped
+    if names:
+        page_cache.bump(names, session.connection())
+        bumped.update(names)
+
+@event.listens_for(Session, 'after_commit')
+def refresh_bumped_versions(session):
+    for name in session.info.pop('page_cache_bumped', ()):
+        page_cache.forget_version(name)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_bumped_versions(session):
+    session.info.pop('page_cache_flush', None)
+    session.info.pop('page_cache_bumped', None)
@@ -0,0 +1,74 @@
+import os
+import logging
+from collections import Counter
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Query budget settings; checked in debug mode, or always with QUERY_BUDGET_ENABLED=true
+QUERY_BUDGET = int(os.environ.get("QUERY_BUDGET", "12"))  # SQL statements a request may run
+QUERY_BUDGET_ENABLED = os.environ.get("QUERY_BUDGET_ENABLED", "false").lower() == "true"
+QUERY_BUDGET_FAIL = os.environ.get("QUERY_BUDGET_FAIL", "false").lower() == "true"  # fail over-budget requests instead of logging them
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+class QueryBudget:
+    """Counts the SQL statements each request runs and flags requests over budget
+
+    A page that runs more statements than its budget usually loads a lazy
+    relationship once per row. Over-budget requests are logged with their most
+    repeated statements; with QUERY_BUDGET_FAIL they fail instead, so a new N+1
+    shows up as an error in development. Routes that need more raise their own
+    budget with @query_budget.limit(n).
+    """
+
+    def __init__(self, app=None, budget=QUERY_BUDGET):
+        self.app = app
+        self.budget = budget
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        event.listen(Engine, 'before_cursor_execute', self._record)
+        app.before_request(self._start)
+        app.after_request(self._check)
+
+    def limit(self, budget):
+        """Decorator giving one view a budget of its own"""
+        def decorator(view):
+            view.query_budget = budget
+            return view
+        return decorator
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        # Background threads have no request and are never counted
+        if has_request_context() and 'query_log' in g:
+            g.query_log.append(statement)
+
+    def _start(self):
+        if self.app.debug or QUERY_BUDGET_ENABLED:
+            g.query_log = []
+
+    def _check(self, response):
+        statements = g.pop('query_log', None)
+        if statements is None:
+            return response
+        view = self.app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', self.budget)
+        response.headers['X-Query-Count'] = str(len(statements))
+        if len(statements) > budget:
+            repeated = Counter(' '.join(statement.split())[:120] for statement in statements).most_common(3)
+            message = (f"{request.method} {request.path} ran {len(statements)} SQL statements (budget {budget}); "
+                       f"most repeated: " + '; '.join(f"{count}x {statement}" for statement, count in repeated))
+            if QUERY_BUDGET_FAIL:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+query_budget = QueryBudget()
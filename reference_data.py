@@ -0,0 +1,181 @@
+import os
+import time
+import select
+import logging
+import tempfile
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app import db
+from models import Country, Category
+from page_cache import page_cache, REFERENCE_VERSION
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Change signals to other processes: PostgreSQL notifications, or a file touched on this host
+REFERENCE_CHANNEL = "reference_data"
+REFERENCE_SIGNAL_PATH = os.environ.get("REFERENCE_SIGNAL_PATH", os.path.join(tempfile.gettempdir(), "jbc_reference_data.signal"))
+
+# Read-only copies of the rows; templates and bots use the same attributes as the models
+CountryRecord = namedtuple('CountryRecord', ['id', 'name', 'code', 'timezone'])
+CategoryRecord = namedtuple('CategoryRecord', ['id', 'name'])
+
+class ReferenceSnapshot:
+    """Immutable view of every country and category at one version"""
+
+    def __init__(self, version, generation, countries, categories):
+        self.version = version
+        self.generation = generation
+        self.countries = tuple(countries)
+        self.categories = tuple(categories)
+        self.countries_by_id = MappingProxyType({country.id: country for country in self.countries})
+        self.countries_by_code = MappingProxyType({country.code: country for country in self.countries})
+        self.categories_by_id = MappingProxyType({category.id: category for category in self.categories})
+        self.categories_by_name = MappingProxyType({category.name: category for category in self.categories})
+        self.country_choices = tuple((country.id, country.name) for country in sorted(self.countries, key=lambda c: c.name))
+        self.category_choices = tuple((category.id, category.name) for category in sorted(self.categories, key=lambda c: c.name))
+
+class ReferenceData:
+    """Process-wide cache of the countries and categories, which almost never change
+
+    Readers get an immutable snapshot without touching the database; it is kept
+    for the life of the process. A committed change to a Country or Category is
+    broadcast: PostgreSQL notifies every process listening on REFERENCE_CHANNEL,
+    other databases touch REFERENCE_SIGNAL_PATH (so processes must share a host),
+    and the next read loads a new snapshot.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped on every change signal
+        self._watching = None  # pid whose listener thread is running
+        self._signal_seen = None  # mtime of the signal file last seen
+
+    def snapshot(self):
+        self._watch()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.generation != self._generation:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.generation != self._generation:
+                    snapshot = self._snapshot = self.load(self._generation)
+        return snapshot
+
+    def load(self, generation):
+        # The version labels the snapshot and tells pages keyed on it apart
+        version = page_cache.version(REFERENCE_VERSION, max_age=0)
+        countries = [CountryRecord(c.id, c.name, c.code, c.timezone) for c in Country.query.order_by(Country.id).all()]
+        categories = [CategoryRecord(c.id, c.name) for c in Category.query.order_by(Category.id).all()]
+        logger.debug(f"Loaded {len(countries)} countries and {len(categories)} categories (reference version {version})")
+        return ReferenceSnapshot(version, generation, countries, categories)
+
+    def invalidate(self):
+        """Load a new snapshot on the next read"""
+        self._generation += 1
+
+    # Change signals
+
+    def broadcast(self):
+        """Tell every process, this one included, that countries or categories changed"""
+        self.invalidate()
+        try:
+            if db.engine.dialect.name == 'postgresql':
+                with db.engine.begin() as connection:
+                    connection.execute(text(f"NOTIFY {REFERENCE_CHANNEL}"))
+            else:
+                with open(REFERENCE_SIGNAL_PATH, 'a'):
+                    pass
+                os.utime(REFERENCE_SIGNAL_PATH)
+        except Exception as e:
+            logger.error(f"Error broadcasting a reference data change: {str(e)}")
+
+    def _watch(self):
+        if db.engine.dialect.name != 'postgresql':
+            try:
+                seen = os.stat(REFERENCE_SIGNAL_PATH).st_mtime_ns
+            except OSError:
+                seen = 0
+            if seen != self._signal_seen:
+                if self._signal_seen is not None:
+                    self.invalidate()
+                self._signal_seen = seen
+            return
+        # One listener per process, started after any fork
+        if self._watching != os.getpid():
+            with self._lock:
+                if self._watching != os.getpid():
+                    self._watching = os.getpid()
+                    threading.Thread(target=self._listen, args=(db.engine,), name="reference-data-listener",
+                                     daemon=True).start()
+
+    def _listen(self, engine):
+        """Invalidate the snapshot on every notification from another process"""
+        while True:
+            try:
+                connection = engine.raw_connection()
+                try:
+                    driver = connection.driver_connection
+                    driver.autocommit = True
+                    driver.cursor().execute(f"LISTEN {REFERENCE_CHANNEL}")
+                    # Changes made before listening started were not heard
+                    self.invalidate()
+                    while True:
+                        if select.select([driver], [], [], 60) == ([], [], []):
+                            continue
+                        driver.poll()
+                        if driver.notifies:
+                            driver.notifies.clear()
+                            self.invalidate()
+                finally:
+                    # A listening connection must not go back to the pool
+                    connection.invalidate()
+            except Exception as e:
+                logger.error(f"Error listening for reference data changes: {str(e)}")
+                time.sleep(5)
+
+    def countries(self):
+        return self.snapshot().countries
+
+    def categories(self):
+        return self.snapshot().categories
+
+    def country(self, country_id):
+        return self.snapshot().countries_by_id.get(country_id)
+
+    def country_by_code(self, code):
+        return self.snapshot().countries_by_code.get(code)
+
+    def category(self, category_id):
+        return self.snapshot().categories_by_id.get(category_id)
+
+    def category_by_name(self, name):
+        return self.snapshot().categories_by_name.get(name)
+
+    def country_choices(self):
+        """(id, name) pairs sorted by name, for select fields"""
+        return list(self.snapshot().country_choices)
+
+    def category_choices(self):
+        """(id, name) pairs sorted by name, for select fields"""
+        return list(self.snapshot().category_choices)
+
+reference_data = ReferenceData()
+
+@event.listens_for(Session, 'before_flush')
+def check_reference_changes(session, flush_context, instances):
+    if any(isinstance(obj, (Country, Category)) for obj in list(session.new) + list(session.deleted) + list(session.dirty)):
+        session.info['reference_changed'] = True
+
+@event.listens_for(Session, 'after_commit')
+def broadcast_reference_changes(session):
+    if session.info.pop('reference_changed', False):
+        reference_data.broadcast()
+
+@event.listens_for(Session, 'after_rollback')
+def discard_reference_changes(session):
+    session.info.pop('reference_changed', None)
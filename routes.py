@@ -1,41 +1,59 @@
 import os
-import json
 import logging
 from datetime import datetime
 from flask import render_template, flash, redirect, url_for, request, jsonify, session, abort
 from flask_login import login_user, logout_user, current_user, login_required
+from flask_wtf.csrf import generate_csrf
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import selectinload, joinedload
 from app import app, db
-from models import User, Staff, News, Category, Country, Support, SupportResponse, Role
+from models import User, Staff, News, NewsTranslation, Support, SupportResponse, Role, SourceSchedule, JobLease, TelegramChat
 from forms import LoginForm, StaffLoginForm, RegistrationForm, ProfileForm, NewsForm, SupportTicketForm, SupportResponseForm, StaffCreationForm, BroadcastForm
 from news_fetcher import fetch_all_news
-from utils import get_local_time_for_country, format_datetime, flash_form_errors, get_random_profile_image, get_random_news_image
+from ingest_metrics import ingest_metrics
+from translation_cache import translation_cache
+from translation_pipeline import translation_pipeline, TRANSLATION_LANGUAGES
+from job_queue import job_queue
+from search_index import search_index, ORIGINAL_LANGUAGE
+from page_cache import page_cache, listing_version, REFERENCE_VERSION
+from news_queries import listing_query, listing_options, latest_news, top_news_per_group, NEWEST_FIRST_KEYS
+from keyset_pagination import Cursor, keyset_paginate
+from reference_data import reference_data
+from utils import format_datetime, flash_form_errors, escape_markdown, get_random_profile_image, get_random_news_image
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Keyset pagination orders of the other listings (newest first, id breaking ties)
+USER_KEYS = ((User.created_at, True), (User.id, True))
+TICKET_KEYS = ((Support.created_at, True), (Support.id, True))
+
 @app.route('/')
+@page_cache.cached()
 def index():
     """Homepage route"""
     # Get breaking news
-    breaking_news = News.query.filter_by(is_breaking=True, is_published=True).order_by(News.published_at.desc()).limit(3).all()
+    breaking_news = latest_news(News.is_breaking == True, limit=3)
+    
+    countries = reference_data.countries()
     
-    # Get latest news from each country
-    countries = Country.query.all()
-    country_news = {}
+    def render_country_news():
+        # Get latest news from each country, all countries in one query
+        latest = top_news_per_group(News.country_id, limit=4, group_ids=[country.id for country in countries])
+        country_news = {country.name: latest.get(country.id, []) for country in countries}
+        return render_template('partials/country_news.html', country_news=country_news)
     
-    for country in countries:
-        news = News.query.filter_by(country_id=country.id, is_published=True).order_by(News.published_at.desc()).limit(4).all()
-        country_news[country.name] = news
+    # The country sections are only rendered again after news changes
+    country_news_html = page_cache.fragment('index:country_news', render_country_news)
     
     # Get categories
-    categories = Category.query.all()
+    categories = reference_data.categories()
     
     return render_template(
         'index.html',
         breaking_news=breaking_news,
-        country_news=country_news,
+        country_news_html=country_news_html,
         countries=countries,
         categories=categories
     )
@@ -208,19 +226,13 @@ def user_dashboard():
     # Get user's country news
     user_country_news = []
     if current_user.country:
-        user_country_news = News.query.filter_by(
-            country_id=current_user.country.id,
-            is_published=True
-        ).order_by(News.published_at.desc()).limit(10).all()
+        user_country_news = latest_news(News.country_id == current_user.country.id, limit=10)
     
     # Get breaking news
-    breaking_news = News.query.filter_by(
-        is_breaking=True,
-        is_published=True
-    ).order_by(News.published_at.desc()).limit(5).all()
+    breaking_news = latest_news(News.is_breaking == True, limit=5)
     
     # Get categories
-    categories = Category.query.all()
+    categories = reference_data.categories()
     
     return render_template(
         'user/dashboard.html',
@@ -309,7 +321,9 @@ def view_ticket(ticket_id):
         return redirect(url_for('index'))
     
     ticket = Support.query.filter_by(ticket_id=ticket_id, user_id=current_user.id).first_or_404()
-    responses = SupportResponse.query.filter_by(ticket_id=ticket.id).order_by(SupportResponse.created_at).all()
+    responses = SupportResponse.query.options(joinedload(SupportResponse.responder)).filter_by(
+        ticket_id=ticket.id
+    ).order_by(SupportResponse.created_at).all()
     
     return render_template('user/ticket.html', ticket=ticket, responses=responses)
 
@@ -325,13 +339,15 @@ def staff_dashboard():
     staff = Staff.query.filter_by(user_id=current_user.id).first()
     
     # Get recent news created by staff
-    staff_news = News.query.filter_by(created_by=current_user.id).order_by(News.published_at.desc()).limit(5).all()
+    staff_news = latest_news(News.created_by == current_user.id, limit=5, published_only=False)
     
     # Get breaking news
-    breaking_news = News.query.filter_by(is_breaking=True).order_by(News.published_at.desc()).limit(5).all()
+    breaking_news = latest_news(News.is_breaking == True, limit=5, published_only=False)
     
     # Get pending support tickets
-    open_tickets = Support.query.filter_by(status="open").order_by(Support.created_at.desc()).limit(5).all()
+    open_tickets = Support.query.options(joinedload(Support.user)).filter_by(status="open").order_by(
+        Support.created_at.desc()
+    ).limit(5).all()
     
     return render_template(
         'staff/dashboard.html',
@@ -354,7 +370,7 @@ def staff_news():
     filter_category = request.args.get('category', type=int)
     filter_status = request.args.get('status')
     
-    query = News.query
+    query = listing_query(published_only=False)
     
     if filter_country:
         query = query.filter_by(country_id=filter_country)
@@ -369,11 +385,11 @@ def staff_news():
     elif filter_status == 'breaking':
         query = query.filter_by(is_breaking=True)
     
-    news = query.order_by(News.published_at.desc()).paginate(page=request.args.get('page', 1, type=int), per_page=10)
+    news = paginate(query, NEWEST_FIRST_KEYS, with_total=True)
     
     # Get countries and categories for filters
-    countries = Country.query.all()
-    categories = Category.query.all()
+    countries = reference_data.countries()
+    categories = reference_data.categories()
     
     return render_template(
         'staff/news.html',
@@ -432,7 +448,10 @@ def edit_news(news_id):
         flash('Access denied', 'danger')
         return redirect(url_for('index'))
     
-    news = News.query.get_or_404(news_id)
+    # The form shows the body and the translations, so they come with the article
+    news = News.query.options(
+        joinedload(News.category), joinedload(News.country), joinedload(News.body), selectinload(News.translations)
+    ).filter_by(id=news_id).first_or_404()
     form = NewsForm(obj=news)
     
     if form.validate_on_submit():
@@ -458,6 +477,23 @@ def edit_news(news_id):
     
     return render_template('staff/edit_news.html', form=form, news=news)
 
+@app.route('/staff/news/<int:news_id>/translate', methods=['POST'])
+@login_required
+def translate_news(news_id):
+    """Generate translations for a news article"""
+    if current_user.role != Role.STAFF and current_user.role != Role.ADMIN:
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+
+    news = News.query.get_or_404(news_id)
+
+    try:
+        translation_pipeline.translate_now(news)
+        return jsonify({'success': True, 'translations': {t.lang: t.to_dict() for t in news.translations}})
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error translating news {news_id}: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/staff/support', methods=['GET'])
 @login_required
 def staff_support():
@@ -469,12 +505,12 @@ def staff_support():
     # Get support tickets, with filter options
     filter_status = request.args.get('status')
     
-    query = Support.query
+    query = Support.query.options(joinedload(Support.user))
     
     if filter_status:
         query = query.filter_by(status=filter_status)
     
-    tickets = query.order_by(Support.created_at.desc()).paginate(page=request.args.get('page', 1, type=int), per_page=10)
+    tickets = paginate(query, TICKET_KEYS, with_total=True)
     
     return render_template(
         'staff/support.html',
@@ -490,9 +526,11 @@ def staff_view_ticket(ticket_id):
         flash('Access denied', 'danger')
         return redirect(url_for('index'))
     
-    ticket = Support.query.filter_by(ticket_id=ticket_id).first_or_404()
-    user = User.query.get(ticket.user_id)
-    responses = SupportResponse.query.filter_by(ticket_id=ticket.id).order_by(SupportResponse.created_at).all()
+    ticket = Support.query.options(joinedload(Support.user)).filter_by(ticket_id=ticket_id).first_or_404()
+    user = ticket.user
+    responses = SupportResponse.query.options(joinedload(SupportResponse.responder)).filter_by(
+        ticket_id=ticket.id
+    ).order_by(SupportResponse.created_at).all()
     
     form = SupportResponseForm()
     
@@ -537,7 +575,7 @@ def admin_dashboard():
     
     # Get recent activities
     recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
-    recent_news = News.query.order_by(News.published_at.desc()).limit(5).all()
+    recent_news = latest_news(limit=5, published_only=False)
     recent_tickets = Support.query.order_by(Support.created_at.desc()).limit(5).all()
     
     return render_template(
@@ -564,7 +602,7 @@ def admin_users():
     filter_status = request.args.get('status')
     filter_country = request.args.get('country', type=int)
     
-    query = User.query
+    query = User.query.options(joinedload(User.country))
     
     if filter_role:
         query = query.filter_by(role=Role(filter_role))
@@ -576,10 +614,10 @@ def admin_users():
     if filter_country:
         query = query.filter_by(country_id=filter_country)
     
-    users = query.order_by(User.created_at.desc()).paginate(page=request.args.get('page', 1, type=int), per_page=10)
+    users = paginate(query, USER_KEYS, with_total=True)
     
     # Get countries for filters
-    countries = Country.query.all()
+    countries = reference_data.countries()
     
     return render_template(
         'admin/users.html',
@@ -682,7 +720,7 @@ def admin_news():
     filter_status = request.args.get('status')
     filter_source = request.args.get('source')
     
-    query = News.query
+    query = listing_query(published_only=False)
     
     if filter_country:
         query = query.filter_by(country_id=filter_country)
@@ -702,11 +740,11 @@ def admin_news():
     elif filter_source == 'manual':
         query = query.filter_by(is_auto_generated=False)
     
-    news = query.order_by(News.published_at.desc()).paginate(page=request.args.get('page', 1, type=int), per_page=10)
+    news = paginate(query, NEWEST_FIRST_KEYS, with_total=True)
     
     # Get countries and categories for filters
-    countries = Country.query.all()
-    categories = Category.query.all()
+    countries = reference_data.countries()
+    categories = reference_data.categories()
     
     return render_template(
         'admin/news.html',
@@ -736,6 +774,21 @@ def admin_fetch_news():
     
     return redirect(url_for('admin_news'))
 
+@app.route('/admin/ingest/metrics')
+@login_required
+def admin_ingest_metrics():
+    """Admin ingestion run metrics route (JSON)"""
+    if current_user.role != Role.ADMIN:
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    metrics = ingest_metrics.stored_runs(runs=request.args.get('runs', type=int))
+    metrics['translation_cache'] = translation_cache.snapshot()
+    metrics['sources'] = [schedule.to_dict() for schedule in SourceSchedule.query.order_by(SourceSchedule.next_due_at).all()]
+    metrics['job_leases'] = [lease.to_dict() for lease in JobLease.query.order_by(JobLease.name).all()]
+    metrics['jobs'] = job_queue.counts()
+    metrics['page_cache'] = page_cache.snapshot()
+    return jsonify(metrics)
+
 @app.route('/admin/broadcast', methods=['GET', 'POST'])
 @login_required
 def admin_broadcast():
@@ -747,21 +800,26 @@ def admin_broadcast():
     form = BroadcastForm()
     
     if form.validate_on_submit():
-        # Logic for broadcasting message
-        # This would integrate with the Telegram bots in a real implementation
+        # Queue one Telegram message per registered chat; the job workers deliver them
         country_filter = form.countries.data
         
-        # Get count of users who would receive the message
-        if country_filter == 'all':
-            user_count = User.query.filter_by(role=Role.USER, is_active=True).count()
-        else:
-            country = Country.query.filter_by(code=country_filter).first()
-            if country:
-                user_count = User.query.filter_by(role=Role.USER, is_active=True, country_id=country.id).count()
-            else:
-                user_count = 0
+        query = TelegramChat.query.join(User, TelegramChat.user_id == User.id).filter(
+            TelegramChat.is_registered == True,
+            User.role == Role.USER,
+            User.is_active == True
+        )
+        if country_filter != 'all':
+            country = reference_data.country_by_code(country_filter)
+            query = query.filter(User.country_id == country.id) if country else None
+        
+        text = f"*{escape_markdown(form.title.data)}*\n\n{escape_markdown(form.message.data)}"
+        chat_ids = [chat.chat_id for chat in query.all()] if query is not None else []
+        for chat_id in chat_ids:
+            job_queue.enqueue('telegram_send', {'chat_id': chat_id, 'text': text})
+        db.session.commit()
+        user_count = len(chat_ids)
         
-        flash(f'Broadcast message "{form.title.data}" sent to {user_count} users', 'success')
+        flash(f'Broadcast message "{form.title.data}" queued for {user_count} users', 'success')
         return redirect(url_for('admin_dashboard'))
     
     return render_template('admin/broadcast.html', form=form)
@@ -777,12 +835,13 @@ def admin_tickets():
     # Get support tickets, with filter options
     filter_status = request.args.get('status')
     
-    query = Support.query
+    # Each row shows the ticket's user and its latest response
+    query = Support.query.options(joinedload(Support.user), selectinload(Support.responses))
     
     if filter_status:
         query = query.filter_by(status=filter_status)
     
-    tickets = query.order_by(Support.created_at.desc()).paginate(page=request.args.get('page', 1, type=int), per_page=10)
+    tickets = paginate(query, TICKET_KEYS, with_total=True)
     
     return render_template(
         'admin/tickets.html',
@@ -793,37 +852,37 @@ def admin_tickets():
 @app.route('/news/<int:news_id>')
 def view_news(news_id):
     """View single news article"""
-    news = News.query.filter_by(id=news_id, is_published=True).first_or_404()
+    # The body and every translation are shown, so they come with the article rather than one query each
+    news = News.query.options(*listing_options(), joinedload(News.body), selectinload(News.translations)).filter_by(
+        id=news_id, is_published=True
+    ).first_or_404()
     
     # Get related news from same category
-    related_news = News.query.filter_by(
-        category_id=news.category_id,
-        is_published=True
-    ).filter(News.id != news.id).order_by(News.published_at.desc()).limit(3).all()
+    related_news = latest_news(News.category_id == news.category_id, News.id != news.id, limit=3)
     
     return render_template('view_news.html', news=news, related_news=related_news)
 
 @app.route('/news/category/<int:category_id>')
+@page_cache.cached(REFERENCE_VERSION, lambda category_id: listing_version('category_id', category_id))
 def news_by_category(category_id):
     """View news by category"""
-    category = Category.query.get_or_404(category_id)
+    category = reference_data.category(category_id)
+    if category is None:
+        abort(404)
     
-    news = News.query.filter_by(
-        category_id=category_id,
-        is_published=True
-    ).order_by(News.published_at.desc()).paginate(page=request.args.get('page', 1, type=int), per_page=10)
+    news = paginate(listing_query(News.category_id == category_id), NEWEST_FIRST_KEYS)
     
     return render_template('news_category.html', category=category, news=news)
 
 @app.route('/news/country/<int:country_id>')
+@page_cache.cached(REFERENCE_VERSION, lambda country_id: listing_version('country_id', country_id))
 def news_by_country(country_id):
     """View news by country"""
-    country = Country.query.get_or_404(country_id)
+    country = reference_data.country(country_id)
+    if country is None:
+        abort(404)
     
-    news = News.query.filter_by(
-        country_id=country_id,
-        is_published=True
-    ).order_by(News.published_at.desc()).paginate(page=request.args.get('page', 1, type=int), per_page=10)
+    news = paginate(listing_query(News.country_id == country_id), NEWEST_FIRST_KEYS)
     
     return render_template('news_country.html', country=country, news=news)
 
@@ -831,17 +890,26 @@ def news_by_country(country_id):
 def search_news():
     """Search news articles"""
     query = request.args.get('q', '')
+    language = request.args.get('lang', '')
+    languages = [ORIGINAL_LANGUAGE] + TRANSLATION_LANGUAGES
+    if language not in languages:
+        language = ''
     
     if not query:
-        return render_template('search.html', query=query, results=None)
+        return render_template('search.html', query=query, results=None, language=language, languages=languages)
     
-    # Search in title and summary
-    results = News.query.filter(
-        (News.title.like(f'%{query}%') | News.summary.like(f'%{query}%')),
-        News.is_published == True
-    ).order_by(News.published_at.desc()).paginate(page=request.args.get('page', 1, type=int), per_page=10)
+    # Ranked by relevance and recency, over the originals or one language's translations.
+    # Later pages rank as of the first page's time, or results would shift between them.
+    cursor = Cursor.decode(request.args.get('cursor'))
+    as_of = cursor.as_of if cursor and cursor.as_of else datetime.utcnow()
+    matches, keys = search_index.ranked(query, language or None, as_of)
+    results = keyset_paginate(matches.options(*listing_options()), keys, cursor, per_page=10, with_total=True, as_of=as_of)
     
-    return render_template('search.html', query=query, results=results)
+    # Titles are shown in the searched language: that one translation of each result, in one query
+    translations = NewsTranslation.load([article.id for article in results.items], language)
+    
+    return render_template('search.html', query=query, results=results, language=language, languages=languages,
+                           translations=translations)
 
 @app.template_filter('format_datetime')
 def format_datetime_filter(value, format='%d %b %Y, %H:%M'):
@@ -854,14 +922,28 @@ def format_datetime_filter(value, format='%d %b %Y, %H:%M'):
 def utility_processor():
     """Add utility functions to templates"""
     return dict(
-        get_local_time_for_country=get_local_time_for_country,
         format_datetime=format_datetime,
-        get_categories=lambda: Category.query.all(),
-        get_countries=lambda: Country.query.all(),
+        get_categories=reference_data.categories,
+        get_countries=reference_data.countries,
         get_random_news_image=lambda: "https://source.unsplash.com/random/800x600/?news",
+        page_url=page_url,
+        csrf_token=generate_csrf,
         now=datetime.utcnow()
     )
 
+def paginate(query, keys, with_total=False):
+    """Page of a listing at the request's cursor (see keyset_pagination.py)"""
+    return keyset_paginate(query, keys, Cursor.decode(request.args.get('cursor')), per_page=10, with_total=with_total)
+
+def page_url(cursor=None):
+    """URL of another page of the current listing, keeping its filters"""
+    args = dict(request.view_args or {}, **request.args.to_dict())
+    args.pop('page', None)
+    args.pop('cursor', None)
+    if cursor:
+        args['cursor'] = cursor
+    return url_for(request.endpoint, **args)
+
 # Error handlers
 @app.errorhandler(400)
 def bad_request(e):
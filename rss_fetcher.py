@@ -0,0 +1,213 @@
+import os
+import re
+import html
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from app import db
+from models import FeedState
+from http_client import http_client
+from ingest_metrics import ingest_metrics
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Feed ingestion settings
+RSS_MAX_ITEMS = int(os.environ.get("RSS_MAX_ITEMS", "50"))  # new items taken per feed per run, oldest first
+RSS_MAX_BYTES = int(os.environ.get("RSS_MAX_BYTES", "5000000"))  # stop reading oversized feeds
+RSS_CHUNK_SIZE = 16384
+
+# XML namespaces used by RSS 2.0 extensions and Atom
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+CONTENT_NS = '{http://purl.org/rss/1.0/modules/content/}'
+MEDIA_NS = '{http://search.yahoo.com/mrss/}'
+DC_NS = '{http://purl.org/dc/elements/1.1/}'
+
+def strip_html(text):
+    """Reduce an HTML fragment to plain text"""
+    if not text:
+        return ''
+    text = re.sub(r'<[^>]+>', ' ', text)
+    return ' '.join(html.unescape(text).split())
+
+def parse_feed_date(value):
+    """Parse an RFC 822 (RSS) or ISO 8601 (Atom) date into a naive UTC datetime"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _text(element, *tags):
+    for tag in tags:
+        child = element.find(tag)
+        if child is not None and (child.text or '').strip():
+            return child.text.strip()
+    return None
+
+def parse_item(element, source_name):
+    """Convert an RSS <item> or Atom <entry> into an article dict shaped like the NewsAPI ones"""
+    if element.tag == ATOM_NS + 'entry':
+        link = None
+        for link_element in element.findall(ATOM_NS + 'link'):
+            if link_element.get('rel', 'alternate') == 'alternate':
+                link = link_element.get('href')
+                break
+        item_id = _text(element, ATOM_NS + 'id') or link
+        title = _text(element, ATOM_NS + 'title')
+        description = _text(element, ATOM_NS + 'summary')
+        content = _text(element, ATOM_NS + 'content')
+        published = _text(element, ATOM_NS + 'published', ATOM_NS + 'updated')
+    else:
+        link = _text(element, 'link')
+        item_id = _text(element, 'guid') or link
+        title = _text(element, 'title')
+        description = _text(element, 'description')
+        content = _text(element, CONTENT_NS + 'encoded')
+        published = _text(element, 'pubDate', DC_NS + 'date')
+
+    image = None
+    for tag in (MEDIA_NS + 'content', MEDIA_NS + 'thumbnail', 'enclosure'):
+        media = element.find(tag)
+        if media is not None and media.get('url') and (tag != 'enclosure' or media.get('type', '').startswith('image')):
+            image = media.get('url')
+            break
+
+    published_at = parse_feed_date(published)
+    return {
+        'id': item_id,
+        'title': strip_html(title),
+        'description': strip_html(description),
+        'content': strip_html(content),
+        'url': link,
+        'urlToImage': image,
+        'publishedAt': published_at.isoformat() if published_at else None,
+        'published_at': published_at,
+        'source': {'name': source_name}
+    }
+
+def iter_feed_items(chunks, source_name):
+    """Incrementally parse feed bytes, yielding items without keeping the whole document"""
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    stack = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == 'start':
+                stack.append(element)
+                continue
+            stack.pop()
+            if element.tag in ('item', ATOM_NS + 'entry'):
+                yield parse_item(element, source_name)
+                # Detach the finished item so memory stays bounded by one item
+                if stack:
+                    stack[-1].remove(element)
+            elif element.tag in ('title', ATOM_NS + 'title') and stack and stack[-1].tag in ('channel', ATOM_NS + 'feed') and element.text:
+                # Channel/feed title, used as the source name for following items
+                source_name = element.text.strip() or source_name
+    parser.close()
+
+def fetch_feed(feed_url, state):
+    """Fetch items newer than the last seen one; runs on a worker thread with no DB access
+
+    Returns (articles, new_state), where state is a plain dict taken from FeedState.
+    """
+    headers = {}
+    if state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    if state.get('last_modified'):
+        headers['If-Modified-Since'] = state['last_modified']
+
+    new_state = dict(state)
+    new_state['last_fetched_at'] = datetime.utcnow()
+    try:
+        response = http_client.get(feed_url, headers=headers, stream=True)
+    except Exception as e:
+        logger.error(f"Error fetching feed {feed_url}: {str(e)}")
+        ingest_metrics.fail_source()
+        new_state['last_status'] = 'error'
+        return [], new_state
+
+    with response:
+        new_state['last_status'] = str(response.status_code)
+        if response.status_code == 304:
+            logger.debug(f"Feed unchanged: {feed_url}")
+            return [], new_state
+        if response.status_code != 200:
+            logger.error(f"Failed to fetch feed {feed_url}: HTTP {response.status_code}")
+            ingest_metrics.fail_source()
+            return [], new_state
+
+        def chunks():
+            received = 0
+            for chunk in response.iter_content(RSS_CHUNK_SIZE):
+                received += len(chunk)
+                ingest_metrics.add_bytes(len(chunk))
+                if received > RSS_MAX_BYTES:
+                    logger.warning(f"Feed {feed_url} exceeds {RSS_MAX_BYTES} bytes, stopping early")
+                    return
+                yield chunk
+
+        articles = []
+        last_item_id = state.get('last_item_id')
+        last_published_at = state.get('last_published_at')
+        try:
+            for item in iter_feed_items(chunks(), urlparse(feed_url).netloc):
+                # Feeds list newest first, so the last seen item marks the end of what is new
+                if last_item_id and item['id'] == last_item_id:
+                    break
+                if last_published_at and item['published_at'] and item['published_at'] <= last_published_at:
+                    continue
+                if item['title'] and item['url']:
+                    articles.append(item)
+        except ET.ParseError as e:
+            logger.error(f"Error parsing feed {feed_url}: {str(e)}")
+            ingest_metrics.fail_source()
+            new_state['last_status'] = 'parse_error'
+
+    # Over the cap, take the oldest new items; the state only moves up to the
+    # newest of those, so the next poll continues with the rest
+    capped = len(articles) > RSS_MAX_ITEMS
+    if capped:
+        logger.info(f"Feed {feed_url} has {len(articles)} new items, taking the oldest {RSS_MAX_ITEMS}")
+        articles = articles[-RSS_MAX_ITEMS:]
+
+    if articles:
+        new_state['last_item_id'] = articles[0]['id']
+        newest = max((item['published_at'] for item in articles if item['published_at']), default=None)
+        if newest and (not last_published_at or newest > last_published_at):
+            new_state['last_published_at'] = newest
+    if new_state['last_status'] == '200' and not capped:
+        new_state['etag'] = response.headers.get('ETag')
+        new_state['last_modified'] = response.headers.get('Last-Modified')
+    logger.info(f"Fetched {len(articles)} new items from feed {feed_url}")
+    return articles, new_state
+
+def load_feed_states(feed_urls):
+    """Read the stored state for each feed as plain dicts that can be handed to worker threads"""
+    states = {feed_url: {} for feed_url in feed_urls}
+    for feed_state in FeedState.query.filter(FeedState.feed_url.in_(list(feed_urls))).all():
+        states[feed_state.feed_url] = feed_state.to_dict()
+    return states
+
+def save_feed_state(feed_url, state):
+    """Persist a feed's state in the current transaction (the caller commits)"""
+    feed_state = FeedState.query.filter_by(feed_url=feed_url).first()
+    if not feed_state:
+        feed_state = FeedState(feed_url=feed_url)
+        db.session.add(feed_state)
+    for key in ('etag', 'last_modified', 'last_item_id', 'last_published_at', 'last_fetched_at', 'last_status'):
+        if key in state:
+            setattr(feed_state, key, state[key])
+    return feed_state
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+import multiprocessing
+import trafilatura
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlparse
+from http_client import http_client
+from ingest_metrics import ingest_metrics
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Scraper settings
+SCRAPE_DOWNLOAD_WORKERS = int(os.environ.get("SCRAPE_DOWNLOAD_WORKERS", "8"))
+SCRAPE_EXTRACT_PROCESSES = int(os.environ.get("SCRAPE_EXTRACT_PROCESSES", str(min(os.cpu_count() or 1, 4))))
+SCRAPE_CACHE_DIR = os.environ.get("SCRAPE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "jbc_scrape_cache"))
+SCRAPE_CACHE_TTL = int(os.environ.get("SCRAPE_CACHE_TTL", "604800"))  # 7 days for successful scrapes
+SCRAPE_NEGATIVE_TTL = int(os.environ.get("SCRAPE_NEGATIVE_TTL", "21600"))  # 6 hours for failures
+SCRAPE_HOST_FAILURE_LIMIT = int(os.environ.get("SCRAPE_HOST_FAILURE_LIMIT", "3"))  # consecutive failures before a host is skipped
+SCRAPE_SWEEP_EVERY = int(os.environ.get("SCRAPE_SWEEP_EVERY", "500"))  # cache writes between sweeps
+SCRAPE_SUMMARY_LENGTH = 500
+
+def extract_article(html, url):
+    """Extract article text and a summary from downloaded HTML (CPU-bound, runs in a worker process)"""
+    text = trafilatura.extract(html, url=url)
+    if not text:
+        return None
+    # Get first 500 characters as summary
+    summary = text[:SCRAPE_SUMMARY_LENGTH] + "..." if len(text) > SCRAPE_SUMMARY_LENGTH else text
+    return {
+        "content": text,
+        "summary": summary
+    }
+
+class ScrapeCache:
+    """On-disk scrape results keyed by URL, with TTL eviction and negative entries for failures"""
+
+    def __init__(self, directory=SCRAPE_CACHE_DIR, ttl=SCRAPE_CACHE_TTL, negative_ttl=SCRAPE_NEGATIVE_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, url):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + '.json')
+
+    def get(self, url):
+        """Return the cached entry for a URL (possibly expired), or None"""
+        try:
+            with open(self._path(url), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get('url') == url else None
+
+    def put(self, url, result, etag=None, last_modified=None):
+        """Store a scrape result; a None result is stored as a negative entry"""
+        now = time.time()
+        entry = {
+            'url': url,
+            'ok': result is not None,
+            'result': result,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': now,
+            'expires_at': now + (self.ttl if result is not None else self.negative_ttl)
+        }
+        path = self._path(url)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Error writing scrape cache for {url}: {str(e)}")
+            return entry
+
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % SCRAPE_SWEEP_EVERY == 0
+        if sweep:
+            self.evict_expired()
+        return entry
+
+    def touch(self, entry):
+        """Extend an entry's lifetime after the origin confirmed it is unchanged"""
+        return self.put(entry['url'], entry['result'], entry.get('etag'), entry.get('last_modified'))
+
+    def evict_expired(self):
+        """Delete entries that are past their TTL"""
+        now = time.time()
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if name.endswith('.tmp'):
+                        if os.path.getmtime(path) < now - 3600:
+                            os.remove(path)
+                        continue
+                    with open(path, encoding='utf-8') as f:
+                        expires_at = json.load(f).get('expires_at', 0)
+                    # Keep positive entries a little longer so their ETag can still revalidate them
+                    if expires_at < now - self.ttl:
+                        os.remove(path)
+                        removed += 1
+                except (OSError, ValueError):
+                    continue
+        if removed:
+            logger.info(f"Evicted {removed} expired scrape cache entries")
+        return removed
+
+class Scraper:
+    """Thread pool for downloads, process pool for extraction, disk cache in front of both"""
+
+    def __init__(self, cache=None, download_workers=SCRAPE_DOWNLOAD_WORKERS, extract_processes=SCRAPE_EXTRACT_PROCESSES):
+        self.cache = cache or ScrapeCache()
+        self.download_workers = download_workers
+        self.extract_processes = extract_processes
+        self._download_pool = None
+        self._extract_pool = None
+        self._extract_pid = None
+        self._host_failures = {}
+        self._lock = threading.Lock()
+
+    def _downloads(self):
+        with self._lock:
+            if self._download_pool is None:
+                self._download_pool = ThreadPoolExecutor(max_workers=self.download_workers, thread_name_prefix="scrape-download")
+            return self._download_pool
+
+    def start(self):
+        """Start the extraction processes; call once at startup, before any threads exist
+
+        The processes are forked, and forking a process that already runs threads
+        (scheduler, translation, HTTP pools) can leave a child holding a lock that
+        no thread will ever release. Spawned children would re-run the entry
+        script instead, and run_bots.py and friends start the app at module level.
+        Without a started pool, articles are extracted inline.
+        """
+        if self.extract_processes <= 0 or self._extract_pool is not None:
+            return
+        self._extract_pool = ProcessPoolExecutor(
+            max_workers=self.extract_processes,
+            mp_context=multiprocessing.get_context('fork')
+        )
+        self._extract_pid = os.getpid()
+        # With fork, the first task launches every worker process up front
+        self._extract_pool.submit(os.getpid).result()
+        logger.info(f"Started {self.extract_processes} extraction processes")
+
+    def _extract(self, html, url):
+        with self._lock:
+            pool = self._extract_pool
+        # No pool, or one inherited from a parent process (gunicorn --preload)
+        if pool is None or self._extract_pid != os.getpid():
+            return extract_article(html, url)
+        try:
+            return pool.submit(extract_article, html, url).result()
+        except BrokenProcessPool:
+            # Never re-fork from here: this process is running threads by now
+            logger.error("Extraction process pool broke, extracting inline from now on")
+            with self._lock:
+                if self._extract_pool is pool:
+                    self._extract_pool = None
+            return extract_article(html, url)
+
+    def _host_blocked(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            failures, blocked_until = self._host_failures.get(host, (0, 0))
+        return blocked_until > time.time()
+
+    def _record_host(self, url, ok):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if ok:
+                self._host_failures.pop(host, None)
+                return
+            failures, _ = self._host_failures.get(host, (0, 0))
+            failures += 1
+            blocked_until = time.time() + SCRAPE_NEGATIVE_TTL if failures >= SCRAPE_HOST_FAILURE_LIMIT else 0
+            self._host_failures[host] = (failures, blocked_until)
+        if blocked_until:
+            logger.warning(f"Skipping scrapes from {host} for {SCRAPE_NEGATIVE_TTL}s after {failures} failures")
+
+    def scrape(self, url, deadline=None):
+        """Return {'content', 'summary'} for a URL, or None if it cannot be scraped"""
+        if deadline is not None and time.monotonic() >= deadline:
+            return None
+        with ingest_metrics.stage('scrape'):
+            return self._scrape(url)
+
+    def _scrape(self, url):
+        entry = self.cache.get(url)
+        if entry and entry['expires_at'] > time.time():
+            ingest_metrics.count('scrape_cache_hits')
+            return entry['result']
+        if self._host_blocked(url):
+            ingest_metrics.count('scrape_hosts_skipped')
+            return None
+
+        # Revalidate an expired positive entry instead of downloading it again
+        headers = {}
+        if entry and entry['ok']:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = http_client.get(url, headers=headers, retries=1)
+        except Exception as e:
+            logger.error(f"Error scraping website {url}: {str(e)}")
+            ingest_metrics.count('scrape_failures')
+            self._record_host(url, False)
+            self.cache.put(url, None)
+            return None
+
+        if response.status_code == 304 and entry:
+            ingest_metrics.count('scrape_revalidated')
+            self._record_host(url, True)
+            return self.cache.touch(entry)['result']
+        if response.status_code != 200:
+            logger.warning(f"Error scraping website {url}: HTTP {response.status_code}")
+            ingest_metrics.count('scrape_failures')
+            self._record_host(url, response.status_code < 500 and response.status_code != 429)
+            self.cache.put(url, None)
+            return None
+
+        self._record_host(url, True)
+        ingest_metrics.count('scrape_downloads')
+        ingest_metrics.add_bytes(len(response.content))
+        try:
+            with ingest_metrics.stage('extract'):
+                result = self._extract(response.content, url)
+        except Exception as e:
+            logger.error(f"Error extracting content from {url}: {str(e)}")
+            result = None
+        self.cache.put(url, result, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return result
+
+    def submit(self, url, deadline=None):
+        """Scrape a URL on the download pool, returning a Future"""
+        return self._downloads().submit(self.scrape, url, deadline)
+
+scraper = Scraper()
@@ -0,0 +1,250 @@
+import os
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import text, inspect, case, Integer, Float
+from app import db
+from models import News
+from inverted_index import inverted_index, split_words
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Search settings
+SEARCH_RECENCY_DAYS = float(os.environ.get("SEARCH_RECENCY_DAYS", "7"))  # age at which a match's score is halved
+SEARCH_MAX_TERMS = int(os.environ.get("SEARCH_MAX_TERMS", "8"))
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "database").lower()  # database, or inverted for the in-process index
+
+# Language of the original title and summary; translations are indexed under their own codes
+ORIGINAL_LANGUAGE = "en"
+
+# PostgreSQL: one tsvector document per article and language in news_search,
+# kept current by triggers on news (the original) and news_translation
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS news_search (
+        news_id INTEGER NOT NULL REFERENCES news (id) ON DELETE CASCADE,
+        language VARCHAR(10) NOT NULL,
+        document TSVECTOR NOT NULL,
+        PRIMARY KEY (news_id, language)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_news_search_document ON news_search USING GIN (document)",
+    """
+    CREATE OR REPLACE FUNCTION news_search_refresh() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO news_search (news_id, language, document) VALUES (
+            NEW.id, 'en',
+            setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.summary, '')), 'B')
+        )
+        ON CONFLICT (news_id, language) DO UPDATE SET document = EXCLUDED.document;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS news_search_refresh ON news",
+    """
+    CREATE TRIGGER news_search_refresh
+    AFTER INSERT OR UPDATE OF title, summary ON news
+    FOR EACH ROW EXECUTE FUNCTION news_search_refresh()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION news_translation_search_refresh() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM news_search WHERE news_id = OLD.news_id AND language = OLD.lang;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO news_search (news_id, language, document) VALUES (
+                NEW.news_id, NEW.lang,
+                setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(NEW.summary, '')), 'B')
+            )
+            ON CONFLICT (news_id, language) DO UPDATE SET document = EXCLUDED.document;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS news_translation_search_refresh ON news_translation",
+    """
+    CREATE TRIGGER news_translation_search_refresh
+    AFTER INSERT OR UPDATE OR DELETE ON news_translation
+    FOR EACH ROW EXECUTE FUNCTION news_translation_search_refresh()
+    """
+]
+
+# SQLite: an FTS5 table with one row per article and language. The original's
+# row ID is the news ID and a translation's is minus its news_translation ID,
+# so each trigger touches exactly one row.
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+        title, summary, news_id UNINDEXED, language UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    # Title matches count twice as much as summary matches
+    "INSERT INTO news_fts (news_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0)')",
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_insert AFTER INSERT ON news BEGIN
+        INSERT INTO news_fts (rowid, title, summary, news_id, language)
+        VALUES (new.id, new.title, new.summary, new.id, 'en');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_update AFTER UPDATE OF title, summary ON news BEGIN
+        DELETE FROM news_fts WHERE rowid = old.id;
+        INSERT INTO news_fts (rowid, title, summary, news_id, language)
+        VALUES (new.id, new.title, new.summary, new.id, 'en');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_delete AFTER DELETE ON news BEGIN
+        DELETE FROM news_fts WHERE rowid = old.id;
+        DELETE FROM news_fts WHERE rowid IN (SELECT -id FROM news_translation WHERE news_id = old.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_translation_fts_insert AFTER INSERT ON news_translation BEGIN
+        INSERT INTO news_fts (rowid, title, summary, news_id, language)
+        VALUES (-new.id, new.title, new.summary, new.news_id, new.lang);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_translation_fts_update AFTER UPDATE ON news_translation BEGIN
+        DELETE FROM news_fts WHERE rowid = -old.id;
+        INSERT INTO news_fts (rowid, title, summary, news_id, language)
+        VALUES (-new.id, new.title, new.summary, new.news_id, new.lang);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_translation_fts_delete AFTER DELETE ON news_translation BEGIN
+        DELETE FROM news_fts WHERE rowid = -old.id;
+    END
+    """
+]
+
+# Rewriting every title re-runs the triggers, which indexes the existing archive
+BACKFILL = [
+    "UPDATE news SET title = title",
+    "UPDATE news_translation SET title = title"
+]
+
+POSTGRES_MATCHES = """
+    SELECT s.news_id AS news_id,
+           max(ts_rank_cd(s.document, to_tsquery('simple', :terms))
+               / (1 + extract(epoch FROM CAST(:now AS TIMESTAMP) - n.published_at) / (86400 * :recency_days))) AS score
+    FROM news_search s JOIN news n ON n.id = s.news_id
+    WHERE s.document @@ to_tsquery('simple', :terms) {language_filter}
+    GROUP BY s.news_id
+"""
+
+SQLITE_MATCHES = """
+    SELECT s.news_id AS news_id,
+           max(-s.rank / (1 + max(julianday(:now) - julianday(n.published_at), 0) / :recency_days)) AS score
+    FROM news_fts s JOIN news n ON n.id = s.news_id
+    WHERE s.news_fts MATCH :terms {language_filter}
+    GROUP BY s.news_id
+"""
+
+class SearchIndex:
+    """Full-text index over article titles and summaries, in the original and every translation
+
+    PostgreSQL keeps a tsvector per article and language behind a GIN index;
+    SQLite uses an FTS5 table. Both are maintained by database triggers on news
+    and news_translation, so bulk writes (such as translations copied to cluster
+    followers) are indexed too.
+    Other databases, or SEARCH_BACKEND=inverted, use the in-process index.
+    """
+
+    def install(self):
+        """Create the index and its triggers if missing, indexing existing articles"""
+        dialect = db.engine.dialect.name
+        if SEARCH_BACKEND != 'database':
+            inverted_index.watch_translations()
+            return False
+        if dialect == 'postgresql':
+            table, ddl = 'news_search', POSTGRES_DDL
+        elif dialect == 'sqlite':
+            table, ddl = 'news_fts', SQLITE_DDL
+        else:
+            logger.warning(f"No full-text search support for {dialect}, search uses the in-process index")
+            inverted_index.watch_translations()
+            return False
+        try:
+            created = not inspect(db.engine).has_table(table)
+            with db.engine.begin() as connection:
+                for statement in ddl:
+                    connection.execute(text(statement))
+                if created:
+                    for statement in BACKFILL:
+                        connection.execute(text(statement))
+            if created:
+                logger.info(f"Created full-text search index {table}")
+            return True
+        except Exception as e:
+            logger.error(f"Error creating full-text search index: {str(e)}")
+            return False
+
+    @staticmethod
+    def parse_terms(query):
+        """Normalized words of a search query (the last one is matched as a prefix)"""
+        return split_words(query)[:SEARCH_MAX_TERMS]
+
+    def matches(self, terms, language=None, as_of=None):
+        """Subquery of (news_id, score) for articles matching every term, aged as of a UTC time"""
+        dialect = db.engine.dialect.name if SEARCH_BACKEND == 'database' else None
+        language_filter = "AND s.language = :language" if language else ""
+        if dialect == 'postgresql':
+            sql = POSTGRES_MATCHES
+            match = ' & '.join(terms[:-1] + [f"{terms[-1]}:*"])
+        elif dialect == 'sqlite':
+            sql = SQLITE_MATCHES
+            match = ' '.join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+        else:
+            return None
+        as_of = as_of or datetime.utcnow()
+        params = {
+            'terms': match,
+            'recency_days': SEARCH_RECENCY_DAYS,
+            'now': as_of if dialect == 'postgresql' else as_of.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        if language:
+            params['language'] = language
+        return text(sql.format(language_filter=language_filter)).bindparams(**params).columns(
+            news_id=Integer, score=Float
+        ).subquery('matches')
+
+    def ranked(self, query, language=None, as_of=None):
+        """Published articles matching a query, and the (column, descending) keys ranking them
+
+        Scores fall with age, so pages of one result list must share as_of to
+        rank the same way (see keyset_pagination.py).
+        """
+        terms = self.parse_terms(query)
+        if not terms:
+            return News.query.filter(db.false()), ((News.id, True),)
+        matches = self.matches(terms, language, as_of)
+        if matches is None:
+            # No full-text support in the database: rank with the in-process index
+            now = (as_of or datetime.utcnow()).replace(tzinfo=timezone.utc).timestamp()
+            ranked = inverted_index.search(' '.join(terms), language, recency_days=SEARCH_RECENCY_DAYS, now=now)
+            if not ranked:
+                return News.query.filter(db.false()), ((News.id, True),)
+            order = {news_id: position for position, (news_id, _) in enumerate(ranked)}
+            return News.query.filter(News.id.in_(order), News.is_published == True), (
+                (case(order, value=News.id), False),
+                (News.id, False)
+            )
+        return News.query.join(matches, News.id == matches.c.news_id).filter(
+            News.is_published == True
+        ), ((matches.c.score, True), (News.id, True))
+
+    def search(self, query, language=None, as_of=None):
+        """Published articles matching a query, best match first (a query to paginate)"""
+        results, keys = self.ranked(query, language, as_of)
+        return results.order_by(*[column.desc() if descending else column.asc() for column, descending in keys])
+
+search_index = SearchIndex()
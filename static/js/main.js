@@ -43,6 +43,7 @@ document.addEventListener("DOMContentLoaded", function() {
 
 /**
  * Updates all local time elements based on country data attribute
+ * (pages are cached server-side, so the clocks are only ever rendered here)
  */
 function updateLocalTimes() {
     const timeElements = document.querySelectorAll('.local-time');
@@ -50,7 +51,7 @@ function updateLocalTimes() {
         timeElements.forEach(el => {
             const countryCode = el.getAttribute('data-country');
             if (countryCode) {
-                el.textContent = getLocalTime(countryCode);
+                el.textContent = getLocalTime(countryCode, el.getAttribute('data-timezone'));
             }
         });
     }
@@ -59,9 +60,10 @@ function updateLocalTimes() {
 /**
  * Get formatted local time for a given country code
  * @param {string} countryCode - The 2-letter country code
+ * @param {string} [countryTimezone] - The country's IANA timezone, if known
  * @return {string} Formatted time string
  */
-function getLocalTime(countryCode) {
+function getLocalTime(countryCode, countryTimezone) {
     const date = new Date();
     let options = { 
         hour: '2-digit', 
@@ -90,8 +92,14 @@ function getLocalTime(countryCode) {
             break;
     }
     
-    options.timeZone = timezone;
-    return date.toLocaleTimeString('en-US', options);
+    options.timeZone = countryTimezone || timezone;
+    try {
+        return date.toLocaleTimeString('en-US', options);
+    } catch (e) {
+        // Not a timezone the browser knows; fall back to the code's default
+        options.timeZone = timezone;
+        return date.toLocaleTimeString('en-US', options);
+    }
 }
 
 /**
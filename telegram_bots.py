@@ -5,9 +5,11 @@ import telegram
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Updater, CommandHandler, MessageHandler, Filters, CallbackContext, CallbackQueryHandler, ConversationHandler
 from app import db, scheduler
-from models import User, TelegramChat, News, Support, Role, Country
+from models import User, TelegramChat, News, NewsTranslation, Support, Role
 from utils import generate_unique_id, translate_text, get_random_profile_image
 from news_fetcher import fetch_all_news
+from reference_data import reference_data
+from translation_pipeline import COUNTRY_LANGUAGES
 from datetime import datetime
 from werkzeug.security import generate_password_hash
 import pytz
@@ -241,7 +243,7 @@ class RegistrationBot:
         db.session.commit()
 
         # Create keyboard with country options
-        countries = Country.query.all()
+        countries = reference_data.countries()
         keyboard = []
         row = []
         for i, country in enumerate(countries):
@@ -271,7 +273,7 @@ class RegistrationBot:
         country_id = int(query.data)
 
         # Get country name for display
-        country = Country.query.get(country_id)
+        country = reference_data.country(country_id)
 
         # Update temp data
         telegram_chat = TelegramChat.query.filter_by(chat_id=chat_id).first()
@@ -786,25 +788,19 @@ class NewsBot:
 
         # Send breaking news
         count = 0
+        # Translations into the reader's language, all articles in one query
+        language = COUNTRY_LANGUAGES.get(user.country.code) if user.country else None
+        translations = NewsTranslation.load([news.id for news in breaking_news], language)
         for news in breaking_news:
             try:
                 # Get translation if available and user is not from news country
                 translated = None
                 if user.country and news.country and user.country.id != news.country.id:
-                    if news.translations:
-                        translations = json.loads(news.translations)
-                        if user.country.code == 'IN':
-                            translated = translations.get('hi')  # Hindi
-                        elif user.country.code == 'PK':
-                            translated = translations.get('ur')  # Urdu
-                        elif user.country.code == 'SA':
-                            translated = translations.get('ar')  # Arabic
-                        elif user.country.code == 'LK':
-                            translated = translations.get('si')  # Sinhala
+                    translated = translations.get(news.id)
 
                 # Prepare message
-                title = translated.get('title') if translated else news.title
-                summary = translated.get('summary') if translated else news.summary
+                title = translated.title if translated else news.title
+                summary = translated.summary if translated else news.summary
 
                 message = f"*{title}*\n\n{summary}\n\n"
                 if news.source_url:
@@ -836,7 +832,7 @@ class NewsBot:
     def select_category(self, update: Update, context: CallbackContext):
         """Select news category"""
         # Get all categories
-        categories = Category.query.order_by(Category.name).all()
+        categories = sorted(reference_data.categories(), key=lambda category: category.name)
 
         # Create inline keyboard
         keyboard = []
@@ -921,24 +917,18 @@ class NewsBot:
 
             # Send news
             count = 0
+            # Translations into the reader's language, all articles in one query
+            language = COUNTRY_LANGUAGES.get(user.country.code) if user.country else None
+            translations = NewsTranslation.load([news.id for news in country_news], language)
             for news in country_news:
                 try:
                     # Get translation if available
                     translated = None
-                    if news.translations:
-                        translations = json.loads(news.translations)
-                        if user.country.code == 'IN':
-                            translated = translations.get('hi')  # Hindi
-                        elif user.country.code == 'PK':
-                            translated = translations.get('ur')  # Urdu
-                        elif user.country.code == 'SA':
-                            translated = translations.get('ar')  # Arabic
-                        elif user.country.code == 'LK':
-                            translated = translations.get('si')  # Sinhala
+                    translated = translations.get(news.id)
 
                     # Prepare message
-                    title = translated.get('title') if translated else news.title
-                    summary = translated.get('summary') if translated else news.summary
+                    title = translated.title if translated else news.title
+                    summary = translated.summary if translated else news.summary
 
                     message = f"*{title}*\n\n{summary}\n\n"
                     if news.source_url:
@@ -993,7 +983,7 @@ class NewsBot:
                 return 0
 
             # Get category name
-            category = Category.query.get(category_id)
+            category = reference_data.category(category_id)
 
             # Send category header
             bot = telegram.Bot(token=NEWS_BOT_TOKEN)
@@ -1005,25 +995,19 @@ class NewsBot:
 
             # Send news
             count = 0
+            # Translations into the reader's language, all articles in one query
+            language = COUNTRY_LANGUAGES.get(user.country.code) if user.country else None
+            translations = NewsTranslation.load([news.id for news in category_news], language)
             for news in category_news:
                 try:
                     # Get translation if available and user is not from news country
                     translated = None
                     if user.country and news.country and user.country.id != news.country.id:
-                        if news.translations:
-                            translations = json.loads(news.translations)
-                            if user.country.code == 'IN':
-                                translated = translations.get('hi')  # Hindi
-                            elif user.country.code == 'PK':
-                                translated = translations.get('ur')  # Urdu
-                            elif user.country.code == 'SA':
-                                translated = translations.get('ar')  # Arabic
-                            elif user.country.code == 'LK':
-                                translated = translations.get('si')  # Sinhala
+                        translated = translations.get(news.id)
 
                     # Prepare message
-                    title = translated.get('title') if translated else news.title
-                    summary = translated.get('summary') if translated else news.summary
+                    title = translated.title if translated else news.title
+                    summary = translated.summary if translated else news.summary
 
                     message = f"*{title}*\n\n{summary}\n\n"
                     if news.source_url:
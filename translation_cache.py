@@ -0,0 +1,214 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from flask import has_app_context
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Cache settings
+TRANSLATION_CACHE_MEMORY_CHARS = int(os.environ.get("TRANSLATION_CACHE_MEMORY_CHARS", "2000000"))  # in-process tier
+TRANSLATION_CACHE_DB_BYTES = int(os.environ.get("TRANSLATION_CACHE_DB_BYTES", "200000000"))  # persistent tier
+TRANSLATION_CACHE_PRUNE_EVERY = int(os.environ.get("TRANSLATION_CACHE_PRUNE_EVERY", "500"))  # writes between prunes
+
+def text_hash(text):
+    """Content address for a source string"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class TranslationCache:
+    """Two-tier translation memory: an in-process LRU in front of a DB table"""
+
+    def __init__(self, memory_chars=TRANSLATION_CACHE_MEMORY_CHARS, db_bytes=TRANSLATION_CACHE_DB_BYTES):
+        self.memory_chars = memory_chars
+        self.db_bytes = db_bytes
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._writes_since_prune = 0
+        self.stats = {
+            'memory_hits': 0,
+            'db_hits': 0,
+            'misses': 0,
+            'memory_evictions': 0,
+            'db_evictions': 0
+        }
+
+    def get_many(self, pairs):
+        """Look up (text, target_language) pairs, returning a dict of the ones found"""
+        found = {}
+        missing = {}
+        with self._lock:
+            for text, target_language in pairs:
+                key = (text_hash(text), target_language)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[(text, target_language)] = self._memory[key]
+                    self.stats['memory_hits'] += 1
+                else:
+                    missing[key] = (text, target_language)
+
+        if missing:
+            stored = self._load(list(missing))
+            with self._lock:
+                for key, pair in missing.items():
+                    if key in stored:
+                        found[pair] = stored[key]
+                        self._remember(key, stored[key])
+                        self.stats['db_hits'] += 1
+                    else:
+                        self.stats['misses'] += 1
+        return found
+
+    def get(self, text, target_language):
+        return self.get_many([(text, target_language)]).get((text, target_language))
+
+    def put_many(self, translations):
+        """Store a dict of (text, target_language) -> translated text in both tiers"""
+        entries = {(text_hash(text), target_language): translated
+                   for (text, target_language), translated in translations.items()}
+        with self._lock:
+            for key, translated in entries.items():
+                self._remember(key, translated)
+        self._store(entries)
+
+    def put(self, text, target_language, translated):
+        self.put_many({(text, target_language): translated})
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+
+    def snapshot(self):
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+            stats['memory_chars'] = self._memory_size
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['db_hits']) / lookups, 4) if lookups else None
+        return stats
+
+    def _remember(self, key, translated):
+        # Caller holds the lock
+        if key in self._memory:
+            self._memory_size -= len(self._memory.pop(key))
+        self._memory[key] = translated
+        self._memory_size += len(translated)
+        while self._memory_size > self.memory_chars and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self.stats['memory_evictions'] += 1
+
+    def _load(self, keys):
+        """Read keys from the persistent tier and bump their last-used time"""
+        if not has_app_context():
+            return {}
+        from sqlalchemy import select, update, tuple_
+        from app import db
+        from models import TranslationMemory
+        try:
+            with db.engine.begin() as connection:
+                rows = connection.execute(
+                    select(TranslationMemory.id, TranslationMemory.text_hash,
+                           TranslationMemory.target_language, TranslationMemory.translated_text)
+                    .where(tuple_(TranslationMemory.text_hash, TranslationMemory.target_language).in_(keys))
+                ).all()
+                if rows:
+                    connection.execute(
+                        update(TranslationMemory)
+                        .where(TranslationMemory.id.in_([row.id for row in rows]))
+                        .values(last_used_at=datetime.utcnow(), hits=TranslationMemory.hits + 1)
+                    )
+            return {(row.text_hash, row.target_language): row.translated_text for row in rows}
+        except Exception as e:
+            logger.error(f"Error reading translation cache: {str(e)}")
+            return {}
+
+    def _store(self, entries):
+        """Insert entries into the persistent tier, ignoring ones another worker already stored"""
+        if not entries or not has_app_context():
+            return
+        from app import db
+        from models import TranslationMemory
+        now = datetime.utcnow()
+        rows = [{
+            'text_hash': text_hash_value,
+            'target_language': target_language,
+            'translated_text': translated,
+            'size': len(translated.encode('utf-8')),
+            'hits': 0,
+            'created_at': now,
+            'last_used_at': now
+        } for (text_hash_value, target_language), translated in entries.items()]
+        try:
+            dialect = db.engine.dialect.name
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            elif dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                insert = None
+            with db.engine.begin() as connection:
+                if insert is not None:
+                    connection.execute(insert(TranslationMemory).on_conflict_do_nothing(), rows)
+                else:
+                    for row in rows:
+                        try:
+                            with connection.begin_nested():
+                                connection.execute(TranslationMemory.__table__.insert(), row)
+                        except Exception:
+                            pass
+        except Exception as e:
+            logger.error(f"Error writing translation cache: {str(e)}")
+            return
+
+        with self._lock:
+            self._writes_since_prune += len(rows)
+            prune = self._writes_since_prune >= TRANSLATION_CACHE_PRUNE_EVERY
+            if prune:
+                self._writes_since_prune = 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Evict least recently used rows until the persistent tier fits its size budget"""
+        if not has_app_context():
+            return 0
+        from sqlalchemy import select, delete, func
+        from app import db
+        from models import TranslationMemory
+        try:
+            with db.engine.begin() as connection:
+                total = connection.execute(select(func.coalesce(func.sum(TranslationMemory.size), 0))).scalar()
+                if total <= self.db_bytes:
+                    return 0
+                # Walk from least recently used, collecting rows until enough bytes are freed
+                excess = total - self.db_bytes
+                evict = []
+                freed = 0
+                result = connection.execute(
+                    select(TranslationMemory.id, TranslationMemory.size)
+                    .order_by(TranslationMemory.last_used_at, TranslationMemory.id)
+                )
+                for row in result:
+                    if freed >= excess:
+                        break
+                    evict.append(row.id)
+                    freed += row.size
+                result.close()
+                for start in range(0, len(evict), 500):
+                    connection.execute(delete(TranslationMemory).where(TranslationMemory.id.in_(evict[start:start + 500])))
+            with self._lock:
+                self.stats['db_evictions'] += len(evict)
+            logger.info(f"Evicted {len(evict)} translation cache entries ({freed} bytes)")
+            return len(evict)
+        except Exception as e:
+            logger.error(f"Error pruning translation cache: {str(e)}")
+            return 0
+
+translation_cache = TranslationCache()
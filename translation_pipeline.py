@@ -0,0 +1,274 @@
+import os
+import random
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import update, delete, insert, select, literal, or_, and_
+from sqlalchemy.orm import aliased
+from app import db
+from models import News, NewsTranslation
+from utils import translate_batch
+from ingest_metrics import ingest_metrics
+from job_queue import job_queue
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Languages every article is translated into: Hindi, Urdu, Arabic, Sinhala
+TRANSLATION_LANGUAGES = ['hi', 'ur', 'ar', 'si']
+
+# Language readers in each country get translations in (by country code)
+COUNTRY_LANGUAGES = {'IN': 'hi', 'PK': 'ur', 'SA': 'ar', 'LK': 'si'}
+
+# Pipeline settings
+TRANSLATION_MAX_ATTEMPTS = int(os.environ.get("TRANSLATION_MAX_ATTEMPTS", "5"))
+TRANSLATION_BACKOFF_BASE = int(os.environ.get("TRANSLATION_BACKOFF_BASE", "60"))  # seconds
+TRANSLATION_BACKOFF_MAX = int(os.environ.get("TRANSLATION_BACKOFF_MAX", "3600"))  # seconds
+TRANSLATION_LEASE = int(os.environ.get("TRANSLATION_LEASE", "600"))  # seconds a claimed row stays reserved
+TRANSLATION_SWEEP_BATCH = int(os.environ.get("TRANSLATION_SWEEP_BATCH", "100"))
+TRANSLATION_WORKER_BATCH = int(os.environ.get("TRANSLATION_WORKER_BATCH", "20"))  # articles per batched request and per job
+
+# Translation states stored in News.translation_status
+STATUS_PENDING = "pending"
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CLUSTERED = "clustered"  # near-duplicate waiting on its cluster lead's translations
+
+def backoff_delay(attempts):
+    """Exponential backoff with jitter for the given number of failed attempts"""
+    delay = min(TRANSLATION_BACKOFF_BASE * (2 ** max(attempts - 1, 0)), TRANSLATION_BACKOFF_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def build_translations(articles):
+    """Translate (title, summary) pairs into every configured language with batched requests"""
+    pairs = []
+    for title, summary in articles:
+        for lang_code in TRANSLATION_LANGUAGES:
+            pairs.append((title, lang_code))
+            pairs.append((summary, lang_code))
+    
+    translated = iter(translate_batch(pairs, raise_errors=True))
+    results = []
+    for _ in articles:
+        translations = {}
+        for lang_code in TRANSLATION_LANGUAGES:
+            translations[lang_code] = {
+                'title': next(translated),
+                'summary': next(translated)
+            }
+        results.append(translations)
+    return results
+
+class TranslationPipeline:
+    """Fills in article translations through translate jobs on the durable job queue
+
+    New articles are queued in batches by the ingestion writer, and a sweep job
+    picks up rows that are due for a retry or whose claim expired. The job
+    workers (job_worker.py) run both; the web processes only enqueue.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+
+    def init_app(self, app):
+        self.app = app
+
+    def enqueue(self, news_ids):
+        """Queue a translate job for news articles, in batches (the caller commits)"""
+        news_ids = list(news_ids)
+        for start in range(0, len(news_ids), TRANSLATION_WORKER_BATCH):
+            job_queue.enqueue('translate', {'news_ids': news_ids[start:start + TRANSLATION_WORKER_BATCH]})
+
+    def enqueue_due(self):
+        """Queue the sweep job for due and expired translations (scheduled job, runs every minute)"""
+        with self.app.app_context():
+            try:
+                # At most one sweep is queued or running at a time
+                job_queue.enqueue('translate', dedup_key='translate:due')
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error queueing the translation sweep: {str(e)}")
+            finally:
+                db.session.remove()
+
+    def translate_due(self):
+        """Translate rows whose translation is pending and due, including expired claims"""
+        now = datetime.utcnow()
+        due = db.session.query(News.id).filter(
+            News.translation_status.in_([STATUS_PENDING, STATUS_IN_PROGRESS]),
+            or_(News.translation_next_attempt_at.is_(None), News.translation_next_attempt_at <= now)
+        ).order_by(News.id).limit(TRANSLATION_SWEEP_BATCH).all()
+        due = [news_id for (news_id,) in due]
+        translated = 0
+        for start in range(0, len(due), TRANSLATION_WORKER_BATCH):
+            translated += self.translate_news(due[start:start + TRANSLATION_WORKER_BATCH])
+        if due:
+            logger.info(f"Translated {translated} of {len(due)} due articles")
+        self.sync_followers()
+        return translated
+
+    def claim(self, news_id):
+        """Atomically reserve a due row so only one worker (in any process) translates it"""
+        now = datetime.utcnow()
+        result = db.session.execute(
+            update(News)
+            .where(
+                News.id == news_id,
+                or_(
+                    and_(
+                        News.translation_status == STATUS_PENDING,
+                        or_(News.translation_next_attempt_at.is_(None), News.translation_next_attempt_at <= now)
+                    ),
+                    and_(
+                        News.translation_status == STATUS_IN_PROGRESS,
+                        News.translation_next_attempt_at <= now
+                    )
+                )
+            )
+            .values(
+                translation_status=STATUS_IN_PROGRESS,
+                translation_attempts=News.translation_attempts + 1,
+                translation_next_attempt_at=now + timedelta(seconds=TRANSLATION_LEASE)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def translate_news(self, news_ids):
+        """Translate a batch of news articles, recording retry and backoff state on failure"""
+        claimed = [news_id for news_id in news_ids if self.claim(news_id)]
+        if not claimed:
+            return 0
+
+        articles = News.query.filter(News.id.in_(claimed)).order_by(News.id).all()
+        try:
+            self.apply_translations(articles)
+            db.session.commit()
+            logger.info(f"Added translations for news IDs: {', '.join(str(news.id) for news in articles)}")
+            return len(articles)
+        except Exception as e:
+            db.session.rollback()
+            if len(claimed) == 1:
+                self.record_failure(claimed[0], e)
+                db.session.commit()
+                return 0
+
+        # The batch failed; translate one at a time so a bad article does not hold back the rest
+        translated = 0
+        for news_id in claimed:
+            news = db.session.get(News, news_id)
+            try:
+                self.apply_translations([news])
+                db.session.commit()
+                translated += 1
+            except Exception as e:
+                db.session.rollback()
+                self.record_failure(news_id, e)
+                db.session.commit()
+        return translated
+
+    def apply_translations(self, articles):
+        """Translate articles and mark them done (the caller commits)"""
+        with ingest_metrics.stage('translate', items=len(articles)):
+            results = build_translations([(news.title, news.summary) for news in articles])
+        for news, translations in zip(articles, results):
+            news.set_translations(translations)
+            news.translation_status = STATUS_DONE
+            news.translation_next_attempt_at = None
+            news.translation_error = None
+            self.copy_to_followers(news)
+
+    def copy_to_followers(self, lead):
+        """Give a lead's translations to the cluster followers waiting on it (the caller commits)"""
+        follower_ids = db.session.execute(
+            select(News.id).where(News.cluster_lead_id == lead.id, News.translation_status == STATUS_CLUSTERED)
+        ).scalars().all()
+        if not follower_ids:
+            return
+        self.copy_translations(lead.id, follower_ids)
+        db.session.execute(
+            update(News)
+            .where(News.id.in_(follower_ids), News.translation_status == STATUS_CLUSTERED)
+            .values(translation_status=STATUS_DONE)
+            .execution_options(synchronize_session=False)
+        )
+
+    def copy_translations(self, source_id, target_ids):
+        """Replace the translations of target articles with the source article's, in two statements"""
+        db.session.flush()
+        db.session.execute(
+            delete(NewsTranslation)
+            .where(NewsTranslation.news_id.in_(target_ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            insert(NewsTranslation).from_select(
+                ['news_id', 'lang', 'title', 'summary', 'updated_at'],
+                select(News.id, NewsTranslation.lang, NewsTranslation.title, NewsTranslation.summary,
+                       literal(datetime.utcnow(), db.DateTime))
+                .join_from(News, NewsTranslation, NewsTranslation.news_id == source_id)
+                .where(News.id.in_(target_ids))
+            )
+        )
+
+    def release_followers(self, lead_id):
+        """Let followers of a lead that could not be translated be translated on their own"""
+        db.session.execute(
+            update(News)
+            .where(News.cluster_lead_id == lead_id, News.translation_status == STATUS_CLUSTERED)
+            .values(translation_status=STATUS_PENDING, translation_next_attempt_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    def sync_followers(self):
+        """Catch followers stored after their lead finished, or whose lead gave up"""
+        lead = aliased(News)
+        rows = db.session.query(News.id, lead.id, lead.translation_status).join(
+            lead, News.cluster_lead_id == lead.id
+        ).filter(
+            News.translation_status == STATUS_CLUSTERED,
+            lead.translation_status.in_([STATUS_DONE, STATUS_FAILED])
+        ).limit(TRANSLATION_SWEEP_BATCH).all()
+        for news_id, lead_id, lead_status in rows:
+            if lead_status == STATUS_DONE:
+                self.copy_translations(lead_id, [news_id])
+                values = {'translation_status': STATUS_DONE}
+            else:
+                values = {'translation_status': STATUS_PENDING, 'translation_next_attempt_at': None}
+            db.session.execute(
+                update(News)
+                .where(News.id == news_id, News.translation_status == STATUS_CLUSTERED)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+        if rows:
+            logger.info(f"Updated translations for {len(rows)} clustered articles")
+        return len(rows)
+
+    def record_failure(self, news_id, error):
+        """Schedule a retry with backoff, or mark the row failed once attempts run out"""
+        news = db.session.get(News, news_id)
+        if not news:
+            return
+        attempts = news.translation_attempts or 0
+        news.translation_error = str(error)[:255]
+        if attempts >= TRANSLATION_MAX_ATTEMPTS:
+            news.translation_status = STATUS_FAILED
+            news.translation_next_attempt_at = None
+            self.release_followers(news_id)
+            logger.error(f"Giving up on translations for news ID {news_id} after {attempts} attempts: {str(error)}")
+        else:
+            news.translation_status = STATUS_PENDING
+            news.translation_next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_delay(attempts))
+            logger.warning(f"Translation attempt {attempts} failed for news ID {news_id}, will retry: {str(error)}")
+
+    def translate_now(self, news):
+        """Translate a single article synchronously, e.g. when staff regenerate translations"""
+        self.apply_translations([news])
+        db.session.commit()
+
+translation_pipeline = TranslationPipeline()
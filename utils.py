@@ -1,5 +1,8 @@
 import os
+import re
 import json
+import asyncio
+import inspect
 import requests
 import logging
 import uuid
@@ -8,6 +11,7 @@ import string
 from datetime import datetime
 from flask import flash, current_app
 from googletrans import Translator
+from translation_cache import translation_cache
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG)
@@ -16,23 +20,94 @@ logger = logging.getLogger(__name__)
 # Initialize translator
 translator = Translator()
 
+# googletrans 4.x exposes a coroutine API, older releases are synchronous
+TRANSLATOR_IS_ASYNC = inspect.iscoroutinefunction(Translator.translate)
+
+# Limits for a single batched translation request
+TRANSLATION_BATCH_MAX_ITEMS = int(os.environ.get("TRANSLATION_BATCH_MAX_ITEMS", "25"))
+TRANSLATION_BATCH_MAX_CHARS = int(os.environ.get("TRANSLATION_BATCH_MAX_CHARS", "4500"))
+
 def generate_unique_id(length=8):
     """Generate a unique ID of specified length"""
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
 
-def translate_text(text, target_language='en'):
+def translate_text(text, target_language='en', raise_errors=False):
     """Translate text to target language using Google Translate API or GPT-4"""
     if not text:
         return ""
+    
+    cached = translation_cache.get(text, target_language)
+    if cached is not None:
+        return cached
         
     try:
         # Using googletrans as a fallback free option
-        translation = translator.translate(text, dest=target_language)
+        translation = _translate_request(text, target_language)
+        translation_cache.put(text, target_language, translation.text)
         return translation.text
     except Exception as e:
         logger.error(f"Translation error: {str(e)}")
+        if raise_errors:
+            raise
         return text
 
+async def _translate_async(text, target_language):
+    async with Translator() as async_translator:
+        return await async_translator.translate(text, dest=target_language)
+
+def _translate_request(text, target_language):
+    """Send one translation request for a string or a list of strings"""
+    if TRANSLATOR_IS_ASYNC:
+        return asyncio.run(_translate_async(text, target_language))
+    return translator.translate(text, dest=target_language)
+
+def _chunk_texts(texts, max_items, max_chars):
+    """Split texts into request-sized chunks bounded by item count and total characters"""
+    chunk = []
+    chunk_chars = 0
+    for text in texts:
+        if chunk and (len(chunk) >= max_items or chunk_chars + len(text) > max_chars):
+            yield chunk
+            chunk = []
+            chunk_chars = 0
+        chunk.append(text)
+        chunk_chars += len(text)
+    if chunk:
+        yield chunk
+
+def translate_batch(pairs, raise_errors=False, max_items=None, max_chars=None):
+    """Translate many (text, target_language) pairs in as few requests as possible, in input order"""
+    max_items = max_items or TRANSLATION_BATCH_MAX_ITEMS
+    max_chars = max_chars or TRANSLATION_BATCH_MAX_CHARS
+    
+    # De-duplicate, then serve what we can from the translation memory
+    unique_pairs = list(dict.fromkeys(pair for pair in pairs if pair[0]))
+    translated = translation_cache.get_many(unique_pairs)
+    
+    # Group the remaining texts by target language
+    texts_by_language = {}
+    for text, target_language in unique_pairs:
+        if (text, target_language) not in translated:
+            texts_by_language.setdefault(target_language, []).append(text)
+    
+    for target_language, texts in texts_by_language.items():
+        for chunk in _chunk_texts(texts, max_items, max_chars):
+            try:
+                translations = _translate_request(chunk, target_language)
+                if len(translations) != len(chunk):
+                    raise ValueError(f"expected {len(chunk)} translations, got {len(translations)}")
+                results = {(source, target_language): translation.text for source, translation in zip(chunk, translations)}
+                translation_cache.put_many(results)
+                translated.update(results)
+            except Exception as e:
+                logger.error(f"Batch translation error ({target_language}, {len(chunk)} texts): {str(e)}")
+                if raise_errors:
+                    raise
+                for source in chunk:
+                    translated[(source, target_language)] = source
+    
+    return [translated.get((text, target_language), text) if text else "" for text, target_language in pairs]
+
 def get_local_time_for_country(country_code):
     """Get current local time for a country"""
     from datetime import datetime
@@ -73,6 +148,10 @@ def truncate_text(text, max_length=100):
         return text
     return text[:max_length] + "..."
 
+def escape_markdown(text):
+    """Escape text for Telegram's (legacy) Markdown parse mode"""
+    return re.sub(r'([_*`\[])', r'\\\1', text or '')
+
 def flash_form_errors(form):
     """Flash form errors"""
     for field, errors in form.errors.items():